@@ -1,7 +1,6 @@
 # backend/anomaly_detection.py - FIXED
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
 from datetime import datetime, timedelta
 import logging
 import sys
@@ -11,64 +10,326 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import config
+from model_registry import model_registry
+from features import feature_engine
+from market_data import MarketDataGenerator
+from metrics import stage_seconds
 
 logger = logging.getLogger(__name__)
 
+class DetectorEngine:
+    """Scores trades for anomalies; subclasses register in DETECTOR_ENGINES and are selected by name"""
+    name = None
+
+    def __init__(self, detector):
+        self.detector = detector
+
+    def score(self, data):
+        """New frame with anomaly_score in [0, 1] and an is_anomaly flag; data itself is left untouched"""
+        raise NotImplementedError
+
+    def version(self):
+        """Identifies the model behind stored results, so re-running it upserts rather than duplicates"""
+        return self.name
+
+class IsolationForestEngine(DetectorEngine):
+    """The registry's pre-trained IsolationForest over the rolling feature set"""
+    name = 'isolation_forest'
+
+    def score(self, data):
+        return self.detector._detect_forest(data)
+
+    def version(self):
+        return f'{self.name}:{self.detector.model_version}'
+
+class StatisticalEngine(DetectorEngine):
+    """Per-ticker statistics of log returns and log volume, each row judged only on the rows before it
+
+    Every statistic is a rolling or exponentially weighted one, so a streaming consumer needs only a
+    small per-ticker state; batches are computed with grouped pandas operations in one pass.
+    """
+    threshold = None
+
+    def strength(self, frame, returns, volume):
+        """Non-negative outlier strength per row of a ticker/time-sorted frame; >= threshold is anomalous"""
+        raise NotImplementedError
+
+    def score(self, data):
+        n = len(data)
+        if n == 0:
+            return data.assign(anomaly_score=pd.Series(dtype=float), is_anomaly=pd.Series(dtype=bool))
+
+        time_column = feature_engine._time_column(data)
+        frame = pd.DataFrame({
+            'ticker': data['ticker'].values,
+            'price': data['price'].values.astype(float),
+            'volume': data['volume'].values.astype(float),
+            '_pos': np.arange(n)
+        })
+        if time_column:
+            frame[time_column] = data[time_column].values
+        frame = frame.sort_values(['ticker', time_column] if time_column else ['ticker'], kind='stable')
+        frame = frame.reset_index(drop=True)
+
+        grouped_price = frame['price'].groupby(frame['ticker'], sort=False)
+        returns = np.log(frame['price'] / grouped_price.shift(1)).fillna(0.0)
+        volume = np.log1p(frame['volume'])
+        with stage_seconds.time(component='detector', stage=self.name):
+            strength = np.nan_to_num(np.asarray(self.strength(frame, returns, volume), dtype=float))
+
+        values = np.empty(n)
+        values[frame['_pos'].values] = strength
+        # Halves the distance to 1 for every threshold's worth of strength: 0.5 right at the threshold
+        return data.assign(anomaly_score=1 - 0.5 ** (values / self.threshold), is_anomaly=values >= self.threshold)
+
+    def _prior(self, frame, series, window_stat):
+        """A grouped window statistic as of the previous row, so a row never sits in its own baseline"""
+        by_ticker = series.groupby(frame['ticker'], sort=False)
+        current = window_stat(by_ticker).reset_index(level=0, drop=True).sort_index()
+        return current.groupby(frame['ticker'], sort=False).shift(1)
+
+class MADEngine(StatisticalEngine):
+    """Robust z-score: distance from the rolling median in units of rolling median absolute deviation"""
+    name = 'mad'
+
+    def __init__(self, detector, window=None, threshold=None):
+        super().__init__(detector)
+        self.window = window or config.DETECTOR_MAD_WINDOW
+        self.threshold = threshold or config.DETECTOR_MAD_THRESHOLD
+
+    def robust_z(self, frame, series):
+        window = self.window
+        median = self._prior(frame, series, lambda g: g.rolling(window, min_periods=5).median())
+        deviation = (series - median).abs()
+        mad = self._prior(frame, deviation, lambda g: g.rolling(window, min_periods=5).median())
+        # 0.6745 makes MAD comparable to a standard deviation for normal data
+        return 0.6745 * deviation / mad.clip(lower=1e-9)
+
+    def strength(self, frame, returns, volume):
+        return np.fmax(self.robust_z(frame, returns), self.robust_z(frame, volume))
+
+class EWMAEngine(StatisticalEngine):
+    """Distance from an exponentially weighted mean in exponentially weighted standard deviations"""
+    name = 'ewma'
+
+    def __init__(self, detector, span=None, threshold=None):
+        super().__init__(detector)
+        self.span = span or config.DETECTOR_EWMA_SPAN
+        self.threshold = threshold or config.DETECTOR_EWMA_THRESHOLD
+
+    def standardized(self, frame, series):
+        """Signed (x - mean) / std against the EWMA state before each row"""
+        span = self.span
+        mean = self._prior(frame, series, lambda g: g.ewm(span=span, min_periods=5).mean())
+        std = self._prior(frame, series, lambda g: g.ewm(span=span, min_periods=5).std())
+        return (series - mean) / std.clip(lower=1e-9)
+
+    def strength(self, frame, returns, volume):
+        return np.fmax(self.standardized(frame, returns).abs(), self.standardized(frame, volume).abs())
+
+class CUSUMEngine(EWMAEngine):
+    """Two-sided CUSUM of EWMA-standardized returns plus upward CUSUM of volume: catches sustained drifts"""
+    name = 'cusum'
+    CLIP = 3.0
+
+    def __init__(self, detector, span=None, drift=None, threshold=None):
+        super().__init__(detector, span, threshold or config.DETECTOR_CUSUM_THRESHOLD)
+        self.drift = config.DETECTOR_CUSUM_DRIFT if drift is None else drift
+
+    def cusum(self, frame, z):
+        """S_t = max(0, S_t-1 + z_t - k) per ticker, via its closed form C_t - min(0, min C_s)"""
+        # Winsorized so one huge outlier can't hold the sum above threshold for hundreds of rows
+        steps = z.fillna(0.0).clip(-self.CLIP, self.CLIP) - self.drift
+        total = steps.groupby(frame['ticker'], sort=False).cumsum()
+        floor = total.groupby(frame['ticker'], sort=False).cummin().clip(upper=0.0)
+        return total - floor
+
+    def strength(self, frame, returns, volume):
+        z_returns = self.standardized(frame, returns)
+        return np.fmax(np.fmax(self.cusum(frame, z_returns), self.cusum(frame, -z_returns)),
+                       self.cusum(frame, self.standardized(frame, volume)))
+
+class CascadeEngine(DetectorEngine):
+    """A cheap statistical screen over every row; only its candidates are re-scored by the IsolationForest"""
+    name = 'cascade'
+
+    def score(self, data):
+        screened = self.detector.engine(config.DETECTOR_CASCADE_SCREEN).score(data)
+        candidates = screened['is_anomaly'].values
+        if not candidates.any():
+            return screened
+
+        artifact = self.detector.registry.require()
+        # Features need each ticker's history, so they cover every row; the forest only sees candidates
+        features = feature_engine.ensure(data, artifact['features'])[artifact['features']].values[candidates]
+        with stage_seconds.time(component='detector', stage='cascade_review'):
+            raw_scores = artifact['model'].decision_function(features)
+
+        scores = screened['anomaly_score'].values.copy()
+        flags = np.zeros(len(data), dtype=bool)
+        scores[candidates] = np.fmax(scores[candidates], self.detector.calibrate_scores(raw_scores, artifact))
+        flags[candidates] = raw_scores < 0
+        return data.assign(anomaly_score=scores, is_anomaly=flags)
+
+    def version(self):
+        return f'{self.name}:{config.DETECTOR_CASCADE_SCREEN}:{self.detector.model_version}'
+
+DETECTOR_ENGINES = {engine.name: engine for engine in
+                    (IsolationForestEngine, MADEngine, EWMAEngine, CUSUMEngine, CascadeEngine)}
+
+def register_engine(engine_class):
+    """Make another detector engine selectable by name"""
+    DETECTOR_ENGINES[engine_class.name] = engine_class
+    return engine_class
+
 class AnomalyDetector:
-    def __init__(self):
-        self.model = IsolationForest(contamination=0.1, random_state=42)
-        self.is_trained = False
+    def __init__(self, registry=None):
+        self.registry = registry or model_registry
+        # Thresholds sorted ascending so a whole score array can be binned with one searchsorted
+        risk_items = sorted(config.ANOMALY_THRESHOLDS.items(), key=lambda item: item[1])
+        self.risk_thresholds = np.array([threshold for _, threshold in risk_items])
+        self.risk_levels = np.array([level for level, _ in risk_items] + ['Critical'], dtype=object)
+        self._engines = {}
+    
+    def engine(self, name):
+        """Engine instance by name (see DETECTOR_ENGINES)"""
+        engine = self._engines.get(name)
+        if engine is None:
+            if name not in DETECTOR_ENGINES:
+                raise ValueError(f'Unknown detector engine {name!r}; expected one of {sorted(DETECTOR_ENGINES)}')
+            engine = self._engines[name] = DETECTOR_ENGINES[name](self)
+        return engine
+    
+    def engine_for(self, ticker):
+        """Engine configured for a ticker: its DETECTOR_ENGINE_BY_TICKER override, else DETECTOR_ENGINE"""
+        return config.DETECTOR_ENGINE_BY_TICKER.get(ticker, config.DETECTOR_ENGINE)
+    
+    @property
+    def model(self):
+        artifact = self.registry.active
+        return artifact['model'] if artifact else None
+    
+    @property
+    def model_version(self):
+        artifact = self.registry.active
+        return artifact['version'] if artifact else None
     
-    def generate_sample_data(self):
+    def model_versions(self, tickers, engine=None):
+        """Version stamp of the engine that scores each ticker (see DetectorEngine.version)"""
+        return {ticker: self.engine(engine or self.engine_for(ticker)).version() for ticker in tickers}
+    
+    @property
+    def is_trained(self):
+        return self.registry.active is not None
+    
+    def generate_sample_data(self, seed=None):
         """Generate sample stock data for demonstration"""
-        dates = pd.date_range(end=datetime.now(), periods=90, freq='D')
-        tickers = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN']
-        
-        data = []
-        for ticker in tickers:
-            base_price = np.random.uniform(100, 500)
-            for date in dates:
-                price = base_price * (1 + np.random.normal(0, 0.02))
-                volume = np.random.randint(1000000, 5000000)
-                data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'ticker': ticker,
-                    'price': round(price, 2),
-                    'volume': volume
-                })
-        
-        return pd.DataFrame(data)
+        seed = config.SAMPLE_DATA_SEED if seed is None else seed
+        data = MarketDataGenerator(seed).generate(
+            ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN'], periods=90, freq='D',
+            end=pd.Timestamp.now().normalize(), anomaly_rate=0.01
+        )
+        return pd.DataFrame({
+            'date': data['timestamp'].dt.strftime('%Y-%m-%d'),
+            'ticker': data['ticker'],
+            'price': data['price'],
+            'volume': data['volume']
+        })
     
     def train_model(self, data):
-        """Train anomaly detection model"""
+        """Train a new model version and hot-swap it into the registry"""
         try:
-            features = data[['price', 'volume']].values
-            self.model.fit(features)
-            self.is_trained = True
+            self.registry.train_and_register(data)
             return True
         except Exception as e:
             logger.error(f"Error training model: {e}")
             return False
     
-    def detect_anomalies(self, data):
-        """Detect anomalies in stock data"""
-        if not self.is_trained:
-            self.train_model(data)
-        
-        features = data[['price', 'volume']].values
-        anomalies = self.model.predict(features)
-        scores = self.model.decision_function(features)
+    def detect_anomalies(self, data, engine=None):
+        """Detect anomalies with the named engine, or each ticker's configured one"""
+        if engine is None:
+            if not config.DETECTOR_ENGINE_BY_TICKER or data.empty:
+                return self.engine(config.DETECTOR_ENGINE).score(data)
+            engines = data['ticker'].map({ticker: self.engine_for(ticker) for ticker in data['ticker'].unique()})
+            if engines.nunique() == 1:
+                return self.engine(engines.iloc[0]).score(data)
+            return self._detect_mixed(data, engines.values)
+        return self.engine(engine).score(data)
+    
+    def _detect_mixed(self, data, engines):
+        """Score each engine's tickers separately and stitch the results back into row order"""
+        scores = np.empty(len(data))
+        flags = np.zeros(len(data), dtype=bool)
+        for name in np.unique(engines):
+            positions = np.flatnonzero(engines == name)
+            part = self.engine(name).score(data.iloc[positions])
+            scores[positions] = part['anomaly_score'].values
+            flags[positions] = part['is_anomaly'].values
+        return data.assign(anomaly_score=scores, is_anomaly=flags)
+    
+    def _detect_forest(self, data):
+        """Detect anomalies in stock data with the active pre-trained model"""
+        # Take one reference so a concurrent hot-swap can't mix two models in a call
+        artifact = self.registry.require()
         
-        data['anomaly_score'] = 1 - (scores - scores.min()) / (scores.max() - scores.min())
-        data['is_anomaly'] = anomalies == -1
+        model = artifact['model']
+        if data.empty:
+            return data.assign(anomaly_score=pd.Series(dtype=float), is_anomaly=pd.Series(dtype=bool))
+        with stage_seconds.time(component='detector', stage='features'):
+            data = feature_engine.ensure(data, artifact['features'])
+            features = data[artifact['features']].values
+        # predict() is just decision_function() < 0, so score once and derive both
+        with stage_seconds.time(component='detector', stage='score'):
+            scores = model.decision_function(features)
         
-        return data
+        with stage_seconds.time(component='detector', stage='apply_scores'):
+            return self.apply_scores(data, scores, artifact)
+    
+    def apply_scores(self, data, scores, artifact=None):
+        """Return a new frame with calibrated anomaly scores and flags; the caller's frame is left untouched"""
+        # Calibrated like the stream and tick paths, so a row's score never depends on the rest of its batch
+        return data.assign(
+            anomaly_score=self.calibrate_scores(scores, artifact),
+            is_anomaly=scores < 0
+        )
+    
+    def calibrate_scores(self, raw_scores, artifact=None):
+        """Map raw decision scores onto [0, 1] against the model's training distribution"""
+        artifact = artifact or self.registry.active
+        reference = artifact['reference_scores']
+        # Share of training rows scoring at least as anomalous; stable regardless of batch contents
+        rank = np.interp(raw_scores, reference, np.linspace(0, 1, len(reference)))
+        return 1 - rank
     
     def get_risk_level(self, score):
         """Get risk level based on anomaly score"""
-        for level, threshold in config.ANOMALY_THRESHOLDS.items():
+        for level, threshold in zip(self.risk_levels, self.risk_thresholds):
             if score <= threshold:
                 return level
         return 'Critical'
+    
+    def get_risk_levels(self, scores):
+        """Vectorized get_risk_level over an array of scores"""
+        # side='left' gives the first threshold with score <= threshold, matching get_risk_level
+        idx = np.searchsorted(self.risk_thresholds, np.asarray(scores, dtype=float), side='left')
+        return self.risk_levels[idx]
+    
+    def score_batch(self, data, engine=None):
+        """Detect anomalies and attach risk levels for the whole batch in one pass"""
+        scored = self.detect_anomalies(data, engine)
+        with stage_seconds.time(component='detector', stage='risk_levels'):
+            scored['risk_level'] = self.get_risk_levels(scored['anomaly_score'].values)
+        return scored
+    
+    def build_payload(self, scored, columns, orient='records', timestamp=None):
+        """Serialize scored rows for a JSON response as records or as columnar lists"""
+        with stage_seconds.time(component='detector', stage='payload'):
+            payload = scored[columns].assign(
+                anomaly_score=scored['anomaly_score'].round(4),
+                timestamp=timestamp or datetime.now().isoformat()
+            )
+            if orient == 'columns':
+                return {column: payload[column].tolist() for column in payload.columns}
+            return payload.to_dict('records')
 
 anomaly_detector = AnomalyDetector()
\ No newline at end of file
@@ -0,0 +1,109 @@
+# backend/anomaly_store.py
+import sys
+import os
+import time
+import uuid
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import get_db_connection
+from features import feature_engine
+from stats_cache import stats_cache
+from metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# One row per (ticker, trade_time, model_version); a rerun only touches rows whose result changed,
+# so unchanged rows fire no triggers and leave the report cache's data version alone
+UPSERT_SQL = '''
+    INSERT INTO anomalies (ticker, anomaly_score, risk_level, timestamp, trade_time, price, volume,
+                           model_version, run_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (ticker, trade_time, model_version) DO UPDATE SET
+        anomaly_score = excluded.anomaly_score,
+        risk_level = excluded.risk_level,
+        price = excluded.price,
+        volume = excluded.volume,
+        run_id = excluded.run_id
+    WHERE anomaly_score IS NOT excluded.anomaly_score
+       OR risk_level IS NOT excluded.risk_level
+       OR price IS NOT excluded.price
+       OR volume IS NOT excluded.volume
+'''
+
+class AnomalyStore:
+    """Writes scored detection runs into the anomalies table that stats, events and reports read"""
+
+    def new_run_id(self):
+        return uuid.uuid4().hex
+
+    def format_times(self, values):
+        """SQLite datetime text; sub-second digits only where present, so a given time always keys the same"""
+        times = pd.to_datetime(values, format='mixed')
+        micros = times.dt.microsecond.values
+        text = times.dt.strftime('%Y-%m-%d %H:%M:%S').values.astype(object)
+        fractional = micros > 0
+        if fractional.any():
+            text[fractional] += np.char.mod('.%06d', micros[fractional]).astype(object)
+        return text
+
+    def _rows(self, flagged, versions, run_id):
+        """Parameter tuples built column-wise; executemany consumes them lazily"""
+        time_column = feature_engine._time_column(flagged)
+        if time_column:
+            trade_times = self.format_times(flagged[time_column])
+        else:
+            # No trade time: each run stands on its own, and each row gets its own microsecond after the run's
+            # start so flagged rows of one ticker never collide on the (ticker, trade_time) key
+            now = pd.Timestamp.now('UTC').tz_localize(None).floor('us')
+            trade_times = self.format_times(pd.Series(now + pd.to_timedelta(np.arange(len(flagged)), unit='us')))
+        scores = flagged['anomaly_score'].values.astype(float).round(4).tolist()
+        prices = flagged['price'].values.astype(float).tolist()
+        volumes = flagged['volume'].values.astype(np.int64).tolist()
+        return zip(flagged['ticker'].values.tolist(), scores, flagged['risk_level'].values.tolist(),
+                   trade_times.tolist(), trade_times.tolist(), prices, volumes,
+                   flagged['ticker'].map(versions).values.tolist(), [run_id] * len(flagged))
+
+    def save(self, scored, versions, run_id=None, sample=False):
+        """Upsert the flagged rows of a scored frame in one transaction; versions maps ticker -> model version
+
+        The anomaly's timestamp is its trade time, so stats by day and report periods follow the market
+        data rather than when detection ran. sample=True marks generated demo data, which is only stored
+        when SAMPLE_DATA_SEED makes it reproducible. Returns the run id with row counts.
+        """
+        run_id = run_id or self.new_run_id()
+        result = {'run_id': run_id, 'rows': 0, 'written': 0}
+        if not config.ANOMALY_PERSIST or (sample and config.SAMPLE_DATA_SEED is None):
+            # Unseeded demo data differs on every call; storing it would only inflate the counts
+            result['run_id'] = None
+            return result
+        flagged = scored[scored['is_anomaly'].values] if 'is_anomaly' in scored.columns else scored
+        result['rows'] = len(flagged)
+        if flagged.empty:
+            return result
+
+        started = time.perf_counter()
+        conn = get_db_connection()
+        try:
+            with stage_seconds.time(component='anomaly_store', stage='upsert'):
+                cursor = conn.executemany(UPSERT_SQL, self._rows(flagged, versions, run_id))
+                # Inserted plus changed rows; trigger writes are not counted and unchanged rows are skipped
+                result['written'] = cursor.rowcount
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        stats_cache.invalidate()
+        logger.info(f"Run {run_id}: stored {result['written']} of {result['rows']} flagged rows "
+                    f"in {time.perf_counter() - started:.3f}s")
+        return result
+
+anomaly_store = AnomalyStore()
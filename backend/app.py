@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Blueprint, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import json
@@ -11,23 +11,38 @@ import logging
 import io
 import sqlite3
 from functools import wraps
+import threading
+import time
 # Add these imports at the top if not present
 from datetime import datetime, timedelta
 import logging
 # Import local modules
 from config import config
-from database import get_db_connection, init_database
+from database import db_connection, init_database
 from auth import auth_system
-from anomaly_detection import anomaly_detector
+from anomaly_detection import anomaly_detector, DETECTOR_ENGINES
+from anomaly_store import anomaly_store
+from model_registry import model_registry, ModelNotReadyError
+from stream_detection import stream_detector
+from parallel_detection import parallel_detector
+from stats_cache import stats_cache
+from ingestion import trade_store
+from tick_store import tick_store
 from audit_trail import audit_trail
+from jobs import job_manager, JobLimitError
+from reports import report_engine, report_cache
+from events import event_broadcaster, stream_slots, CHANNELS
 from ekyc import ekyc_verifier
+from identity_index import identity_index
+from document_pipeline import document_pipeline
+from metrics import metrics, SamplingProfiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)
+# Every route lives on this blueprint; create_app() builds the Flask app around it
+api = Blueprint('api', __name__)
 
 # Authentication decorator
 def token_required(f):
@@ -46,7 +61,63 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
-@app.route('/api/health', methods=['GET'])
+def stream_token_required(f):
+    """token_required for EventSource endpoints, which can't send headers and pass ?token= instead"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if token and 'Authorization' not in request.headers:
+            user_data = auth_system.verify_token(token)
+            if not user_data:
+                return jsonify({'error': 'Token is invalid'}), 401
+            request.user = user_data
+            return f(*args, **kwargs)
+        return token_required(f)(*args, **kwargs)
+    return decorated
+
+request_seconds = metrics.histogram(
+    'brokermint_http_request_seconds', 'Time to produce a response (streamed bodies excluded)',
+    ['method', 'endpoint', 'status'])
+request_errors = metrics.counter(
+    'brokermint_http_errors', 'Responses with a 5xx status', ['method', 'endpoint'])
+
+@api.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if config.PROFILING_ENABLED and (request.args.get('profile') or request.headers.get('X-Profile')):
+        g.profiler = SamplingProfiler().start()
+
+@api.after_app_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    # Route templates, not raw paths, so ids in URLs don't explode the label set
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_seconds.observe(elapsed, method=request.method, endpoint=endpoint, status=str(response.status_code))
+    
+    if response.status_code >= 500:
+        request_errors.inc(method=request.method, endpoint=endpoint)
+        body = None if response.is_streamed else response.get_json(silent=True)
+        logger.error(f"{request.method} {request.path} -> {response.status_code}: {(body or {}).get('error')}")
+    elif elapsed >= config.SLOW_REQUEST_SECONDS:
+        logger.warning(f"Slow request {request.method} {request.path}: {elapsed:.3f}s")
+    
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        # Stacks can reveal internals, so only admins get them back
+        if getattr(request, 'user', {}).get('role') == 'admin':
+            response = Response(profiler.folded(), mimetype='text/plain')
+            response.headers['X-Profile-Samples'] = str(profiler.samples)
+            response.headers['X-Profile-Seconds'] = f'{profiler.duration:.4f}'
+    return response
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    if config.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {config.METRICS_TOKEN}':
+        return jsonify({'error': 'Metrics token is invalid'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -54,7 +125,7 @@ def health_check():
         'service': 'BrokerMint API'
     })
 
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -67,10 +138,11 @@ def register():
         )
         
         if user_id:
-            user = get_db_connection().execute(
-                'SELECT id, username, email, full_name, role FROM users WHERE id = ?',
-                (user_id,)
-            ).fetchone()
+            with db_connection() as conn:
+                user = conn.execute(
+                    'SELECT id, username, email, full_name, role FROM users WHERE id = ?',
+                    (user_id,)
+                ).fetchone()
             
             token = auth_system.generate_token(dict(user))
             audit_trail.record_action(user_id, 'user_registration')
@@ -86,7 +158,7 @@ def register():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -113,26 +185,34 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/dashboard', methods=['GET'])
+@api.route('/api/auth/logout', methods=['POST'])
+@token_required
+def logout():
+    try:
+        auth_system.revoke_token(request.headers['Authorization'][7:])
+        audit_trail.record_action(request.user['user_id'], 'user_logout')
+        return jsonify({'message': 'Logged out'})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/dashboard', methods=['GET'])
 @token_required
 def get_dashboard():
     try:
         # Generate sample anomalies
         sample_data = anomaly_detector.generate_sample_data()
-        anomalies_data = anomaly_detector.detect_anomalies(sample_data)
+        versions = anomaly_detector.model_versions(sample_data['ticker'].unique())
+        anomalies_data = anomaly_detector.score_batch(sample_data)
+        # Persisted (when the demo data is seeded) so /api/dashboard/stats and reports count what it shows
+        anomaly_store.save(anomalies_data, versions, sample=True)
         
         # Get recent anomalies
         recent_anomalies = anomalies_data[anomalies_data['is_anomaly']].nlargest(5, 'anomaly_score')
         
         # Prepare response
-        anomalies = []
-        for _, row in recent_anomalies.iterrows():
-            anomalies.append({
-                'ticker': row['ticker'],
-                'anomaly_score': round(row['anomaly_score'], 4),
-                'risk_level': anomaly_detector.get_risk_level(row['anomaly_score']),
-                'timestamp': datetime.now().isoformat()
-            })
+        anomalies = anomaly_detector.build_payload(recent_anomalies, ['ticker', 'anomaly_score', 'risk_level'])
+        high_risk_count = int(recent_anomalies['risk_level'].isin(['High', 'Critical']).sum())
         
         audit_trail.record_action(request.user['user_id'], 'dashboard_view')
         
@@ -150,49 +230,335 @@ def get_dashboard():
             'stats': {
                 'total_checks': len(sample_data),
                 'anomalies_found': len(anomalies),
-                'high_risk_count': sum(1 for a in anomalies if a['risk_level'] in ['High', 'Critical'])
+                'high_risk_count': high_risk_count
             }
         })
         
+    except ModelNotReadyError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/anomalies/detect', methods=['POST'])
+def detection_params(data):
+    """Validated run_detection params built from a request body; raises ValueError on bad input"""
+    params = {
+        'tickers': data.get('tickers', ['AAPL', 'GOOGL', 'MSFT']),
+        'start_date': data.get('start_date'),
+        'end_date': data.get('end_date'),
+        'format': data.get('format', 'records'),
+        # None: each ticker's configured engine
+        'engine': data.get('engine')
+    }
+    if not isinstance(params['tickers'], list) or not all(isinstance(ticker, str) for ticker in params['tickers']):
+        raise ValueError('tickers must be a list of ticker symbols')
+    if params['engine'] is not None and params['engine'] not in DETECTOR_ENGINES:
+        raise ValueError(f"engine must be one of {sorted(DETECTOR_ENGINES)}")
+    return params
+
+@api.route('/api/anomalies/detect', methods=['POST'])
 @token_required
 def detect_anomalies():
     try:
-        data = request.get_json()
-        tickers = data.get('tickers', ['AAPL', 'GOOGL', 'MSFT'])
+        data = request.get_json() or {}
+        params = detection_params(data)
+        
+        if data.get('async'):
+            return submit_job('anomaly_detection', params)
+        
+        return jsonify(run_detection(params, request.user['user_id']))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ModelNotReadyError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def detection_window(tickers, start_date=None, end_date=None):
+    """(start_date, end_date) to score; without a start, the last DETECTION_DEFAULT_DAYS of ingested data"""
+    if start_date is None:
+        end = end_date or trade_store.latest_date(tickers)
+        if end:
+            start = datetime.strptime(end[:10], '%Y-%m-%d') - timedelta(days=config.DETECTION_DEFAULT_DAYS - 1)
+            start_date = start.strftime('%Y-%m-%d')
+    return start_date, end_date
+
+def run_detection(params, user_id, job=None):
+    """Score the requested tickers; shared by the synchronous route and the background job"""
+    tickers = params['tickers']
+    start_date, end_date = detection_window(tickers, params.get('start_date'), params.get('end_date'))
+    
+    # Read only the date/ticker partitions needed from ingested trades
+    trade_data = trade_store.read(tickers, start_date, end_date)
+    sample = trade_data.empty
+    if sample:
         # Generate sample data for requested tickers
-        sample_data = anomaly_detector.generate_sample_data()
-        sample_data = sample_data[sample_data['ticker'].isin(tickers)]
-        
-        anomalies_data = anomaly_detector.detect_anomalies(sample_data)
-        anomalies = anomalies_data[anomalies_data['is_anomaly']]
-        
-        results = []
-        for _, row in anomalies.iterrows():
-            results.append({
-                'ticker': row['ticker'],
-                'anomaly_score': round(row['anomaly_score'], 4),
-                'risk_level': anomaly_detector.get_risk_level(row['anomaly_score']),
-                'price': row['price'],
-                'volume': row['volume'],
-                'timestamp': datetime.now().isoformat()
-            })
+        trade_data = anomaly_detector.generate_sample_data()
+        trade_data = trade_data[trade_data['ticker'].isin(tickers)]
+    if job:
+        job.progress(0.3, f'Loaded {len(trade_data)} rows')
+    
+    # Taken before scoring so a model hot-swap mid-run can't mislabel the stored rows
+    versions = anomaly_detector.model_versions(trade_data['ticker'].unique(), params.get('engine'))
+    # Large universes are sharded by ticker across the detection process pool
+    anomalies_data = parallel_detector.score_batch(trade_data, params.get('engine'))
+    anomalies = anomalies_data[anomalies_data['is_anomaly']]
+    if job:
+        job.progress(0.9, f'Found {len(anomalies)} anomalies')
+    stored = anomaly_store.save(anomalies, versions, sample=sample)
+    
+    # 'columns' returns one list per field instead of one object per row
+    results = anomaly_detector.build_payload(
+        anomalies,
+        ['ticker', 'anomaly_score', 'risk_level', 'price', 'volume'],
+        orient=params.get('format', 'records')
+    )
+    
+    audit_trail.record_action(user_id, 'anomaly_detection', {
+        'tickers': tickers,
+        'start_date': start_date,
+        'end_date': end_date,
+        'anomalies_found': len(anomalies),
+        'run_id': stored['run_id'],
+        'rows_written': stored['written']
+    })
+    
+    return results
+
+@api.route('/api/ticks/<ticker>/anomalies', methods=['GET'])
+@token_required
+def detect_tick_anomalies(ticker):
+    try:
+        # Scores a memory-mapped ticker/time range chunk by chunk; only flagged ticks are materialized
+        anomalies = tick_store.detect_range(ticker.upper(), request.args.get('start'), request.args.get('end'))
+        limit = request.args.get('limit', 1000, type=int)
         
-        audit_trail.record_action(request.user['user_id'], 'anomaly_detection', {
-            'tickers': tickers,
-            'anomalies_found': len(results)
-        })
+        top = anomalies.sort_values('anomaly_score', ascending=False).head(limit)
+        results = anomaly_detector.build_payload(
+            top.assign(trade_time=top['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f')),
+            ['ticker', 'trade_time', 'anomaly_score', 'risk_level', 'price', 'volume'],
+            orient=request.args.get('format', 'records')
+        )
+        
+        return jsonify({'total': len(anomalies), 'anomalies': results})
+        
+    except ModelNotReadyError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/anomalies/stream', methods=['POST'])
+@token_required
+def stream_ticks():
+    try:
+        data = request.get_json() or {}
+        ticks = data.get('ticks', [])
         
-        return jsonify(results)
+        for tick in ticks:
+            if not tick.get('ticker') or not isinstance(tick.get('price'), (int, float)) \
+                    or not isinstance(tick.get('volume'), (int, float)):
+                return jsonify({'error': 'Each tick needs ticker, numeric price and volume'}), 400
+        
+        accepted = stream_detector.submit(ticks, timeout=1)
+        status = 202 if accepted == len(ticks) else 503
+        
+        return jsonify({
+            'accepted': accepted,
+            'rejected': len(ticks) - accepted,
+            'stats': stream_detector.stats
+        }), status
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/ekyc/verify', methods=['POST'])
+@api.route('/api/models', methods=['GET'])
+@token_required
+def get_models():
+    return jsonify(dict(
+        model_registry.describe(),
+        engines=sorted(DETECTOR_ENGINES),
+        default_engine=config.DETECTOR_ENGINE,
+        engine_overrides=config.DETECTOR_ENGINE_BY_TICKER
+    ))
+
+@api.route('/api/models/train', methods=['POST'])
+@token_required
+def train_model():
+    try:
+        if request.user.get('role') != 'admin':
+            return jsonify({'error': 'Admin role required'}), 403
+        
+        started = model_registry.train_in_background(anomaly_detector.generate_sample_data)
+        if not started:
+            return jsonify({'error': 'Training already in progress'}), 409
+        
+        audit_trail.record_action(request.user['user_id'], 'model_training_started')
+        return jsonify({'message': 'Model training started'}), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/models/activate', methods=['POST'])
+@token_required
+def activate_model():
+    try:
+        if request.user.get('role') != 'admin':
+            return jsonify({'error': 'Admin role required'}), 403
+        
+        version = (request.get_json() or {}).get('version')
+        if version not in model_registry.list_versions():
+            return jsonify({'error': 'Unknown model version'}), 404
+        
+        model_registry.load(version)
+        audit_trail.record_action(request.user['user_id'], 'model_activated', {'version': version})
+        return jsonify(model_registry.describe())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def submit_job(kind, params):
+    """Queue a background job for the current user and answer 202 with its id"""
+    try:
+        job, created = job_manager.submit(kind, params, request.user['user_id'])
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    
+    if created:
+        audit_trail.record_action(request.user['user_id'], 'job_submitted', {'job_id': job['id'], 'kind': kind})
+    return jsonify({'job_id': job['id'], 'status': job['status'], 'deduplicated': not created}), 202
+
+# Job kinds users may submit through /api/jobs; each one's params are rebuilt server-side in create_job
+USER_JOB_KINDS = ('anomaly_detection', 'report', 'report_export')
+
+def can_access_job(job):
+    """Jobs (and their results) are visible to the submitter and to admins"""
+    return job['user_id'] == request.user['user_id'] or request.user.get('role') == 'admin'
+
+@api.route('/api/jobs', methods=['POST'])
+@token_required
+def create_job():
+    try:
+        data = request.get_json() or {}
+        # Internal kinds (document_extraction) are only queued by their own routes with server-built params
+        if data.get('kind') not in USER_JOB_KINDS:
+            return jsonify({'error': f"kind must be one of {sorted(USER_JOB_KINDS)}"}), 400
+        
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+        if data['kind'] == 'anomaly_detection':
+            params = detection_params(params)
+        elif data['kind'] == 'report':
+            params = {
+                'report_type': params.get('report_type', 'compliance'),
+                'user': {key: request.user[key] for key in ('user_id', 'username', 'role')}
+            }
+        elif data['kind'] == 'report_export':
+            if params.get('format', 'csv') not in report_engine.FORMATS:
+                return jsonify({'error': f'format must be one of {sorted(report_engine.FORMATS)}'}), 400
+            params = {
+                'format': params.get('format', 'csv'),
+                'start_date': params.get('start_date'),
+                'end_date': params.get('end_date'),
+                'user': {key: request.user[key] for key in ('user_id', 'username', 'role')}
+            }
+        return submit_job(data['kind'], params)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/jobs', methods=['GET'])
+@token_required
+def list_jobs():
+    try:
+        # Admins see everyone's jobs, other users only their own
+        user_id = None if request.user.get('role') == 'admin' else request.user['user_id']
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        return jsonify(job_manager.list_jobs(user_id, limit))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    try:
+        job = job_manager.get(job_id, include_result=True)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if not can_access_job(job):
+            return jsonify({'error': 'Only the submitter or an admin can view a job'}), 403
+        return jsonify(job)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_job(job_id):
+    try:
+        job = job_manager.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if not can_access_job(job):
+            return jsonify({'error': 'Only the submitter or an admin can cancel a job'}), 403
+        
+        if not job_manager.cancel(job_id):
+            return jsonify({'error': f"Job already {job['status']}"}), 409
+        
+        audit_trail.record_action(request.user['user_id'], 'job_cancelled', {'job_id': job_id})
+        return jsonify(job_manager.get(job_id))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def event_stream_response(body):
+    """SSE response holding one of this process's stream slots (see EVENTS_MAX_STREAMS) until it closes"""
+    response = Response(stream_with_context(body), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(stream_slots.release)
+    return response
+
+STREAMS_BUSY = 'Too many open event streams on this server; retry shortly'
+
+@api.route('/api/jobs/<job_id>/events', methods=['GET'])
+@stream_token_required
+def job_events(job_id):
+    """Server-sent events with the job's status and progress until it finishes"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not can_access_job(job):
+        return jsonify({'error': 'Only the submitter or an admin can view a job'}), 403
+    if not stream_slots.acquire():
+        return jsonify({'error': STREAMS_BUSY}), 503
+    
+    def stream():
+        for job in job_manager.watch(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(job, default=str)}\n\n"
+    
+    return event_stream_response(stream())
+
+@api.route('/api/events', methods=['GET'])
+@stream_token_required
+def stream_events():
+    """Server-sent anomalies, stat deltas and audit events, produced once and shared by every client"""
+    channels = [c for c in request.args.get('channels', ','.join(CHANNELS)).split(',') if c in CHANNELS]
+    if not channels:
+        return jsonify({'error': f'channels must be a subset of {list(CHANNELS)}'}), 400
+    
+    if not stream_slots.acquire():
+        return jsonify({'error': STREAMS_BUSY}), 503
+    subscriber = event_broadcaster.subscribe(channels)
+    if subscriber is None:
+        stream_slots.release()
+        return jsonify({'error': 'Too many event stream clients'}), 503
+    
+    return event_stream_response(event_broadcaster.stream(subscriber))
+
+@api.route('/api/ekyc/verify', methods=['POST'])
 @token_required
 def verify_identity():
     try:
@@ -214,42 +580,123 @@ def verify_identity():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/audit/trail', methods=['GET'])
+@api.route('/api/ekyc/documents', methods=['POST'])
+@token_required
+def upload_document():
+    """Upload a document image for OCR-based verification (multipart: file, document_type, number)"""
+    try:
+        upload = request.files.get('file')
+        document_type = request.form.get('document_type')
+        if not upload or document_type not in ekyc_verifier.document_patterns:
+            return jsonify({'error': f'file and document_type ({sorted(ekyc_verifier.document_patterns)}) are required'}), 400
+        
+        path, file_hash = document_pipeline.store_upload(upload.stream, upload.filename)
+        # Only the stored file name travels; the path and hash are re-derived from it when the job runs
+        params = {
+            'file': os.path.basename(path),
+            'document_type': document_type,
+            'number': request.form.get('number')
+        }
+        
+        if document_pipeline.cached(file_hash) is None:
+            # OCR runs in the pool behind a job so neither this thread nor the client waits on it
+            return submit_job('document_extraction', params)
+        
+        return jsonify(run_document_verification(params, request.user['user_id']))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_document_verification(params, user_id, job=None):
+    path, file_hash = document_pipeline.resolve_upload(params['file'])
+    analysis = document_pipeline.analyze(path, file_hash, params['document_type'], params.get('number'), job)
+    result = ekyc_verifier.verify_extraction(user_id, params['document_type'], analysis)
+    
+    audit_trail.record_action(user_id, 'ekyc_document_verification', {
+        'document_type': params['document_type'],
+        'status': result['status'],
+        'cached': result['cached']
+    })
+    return result
+
+@api.route('/api/ekyc/verify/bulk', methods=['POST'])
+@token_required
+def verify_identities_bulk():
+    try:
+        documents = (request.get_json() or {}).get('documents')
+        if not isinstance(documents, list) or not documents:
+            return jsonify({'error': 'documents must be a non-empty list'}), 400
+        if len(documents) > config.EKYC_BATCH_MAX:
+            return jsonify({'error': f'At most {config.EKYC_BATCH_MAX} documents per request'}), 413
+        
+        results = ekyc_verifier.verify_documents(request.user['user_id'], documents)
+        counts = {}
+        for result in results:
+            key = result.get('status', 'error')
+            counts[key] = counts.get(key, 0) + 1
+        
+        audit_trail.record_action(request.user['user_id'], 'ekyc_bulk_verification', {
+            'documents': len(documents),
+            'counts': counts
+        })
+        
+        return jsonify({'total': len(results), 'counts': counts, 'results': results})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/ekyc/shared-identities', methods=['GET'])
+@token_required
+def get_shared_identities():
+    try:
+        if request.user.get('role') != 'admin':
+            return jsonify({'error': 'Admin role required'}), 403
+        
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        identities = identity_index.shared_identities(request.args.get('document_type'), limit)
+        return jsonify({'identities': identities, 'total': len(identities)})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/audit/trail', methods=['GET'])
 @token_required
 def get_audit_trail():
     try:
-        limit = request.args.get('limit', 50, type=int)
-        logs = audit_trail.get_audit_log(limit)
-        return jsonify({'entries': logs, 'total': len(logs)})
+        limit = max(1, min(request.args.get('limit', 50, type=int), 1000))
+        page = audit_trail.get_audit_page(
+            limit,
+            cursor=request.args.get('cursor'),
+            user_id=request.args.get('user_id', type=int),
+            action_type=request.args.get('action_type'),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        return jsonify({
+            'entries': page['entries'],
+            'total': len(page['entries']),
+            'next_cursor': page['next_cursor']
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reports/compliance', methods=['GET'])
+@api.route('/api/reports/compliance', methods=['GET'])
 @token_required
 def generate_report():
     try:
-        # Generate a simple text report
-        report_content = f"""
-        BROKERMINT COMPLIANCE REPORT
-        Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        Generated by: {request.user['username']}
-        
-        SUMMARY:
-        - Total compliance checks: 150
-        - Anomalies detected: 12
-        - High-risk transactions: 3
-        - Pending actions: 2
-        
-        RECOMMENDATIONS:
-        1. Review high-risk transactions
-        2. Complete pending compliance actions
-        3. Schedule next audit cycle
-        """
-        
-        audit_trail.record_action(request.user['user_id'], 'report_generated')
+        # Served from the report cache until the anomalies change
+        user = {key: request.user[key] for key in ('user_id', 'username', 'role')}
+        report = build_report('compliance', user)
+        
+        audit_trail.record_action(request.user['user_id'], 'report_generated', {'cached': report['cached']})
         
         return jsonify({
-            'report': report_content,
+            'report': report['report'],
+            'cached': report['cached'],
             'filename': f'compliance_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
         })
         
@@ -257,35 +704,49 @@ def generate_report():
         return jsonify({'error': str(e)}), 500
 # Add these new routes to your backend app.py
 
-@app.route('/api/dashboard/stats', methods=['GET'])
+@api.route('/api/dashboard/stats', methods=['GET'])
 @token_required
 def get_dashboard_stats():
     """Get dynamic dashboard statistics"""
     try:
-        conn = get_db_connection()
-        
-        # Get real counts from database
-        total_checks = conn.execute('SELECT COUNT(*) FROM anomalies').fetchone()[0]
-        anomalies_found = conn.execute('SELECT COUNT(*) FROM anomalies WHERE risk_level IN ("High", "Critical")').fetchone()[0]
-        high_risk_count = conn.execute('SELECT COUNT(*) FROM anomalies WHERE risk_level = "High"').fetchone()[0]
+        # Counts come from the trigger-maintained summary table behind a short TTL cache
+        summary = stats_cache.summary()
+        by_risk = summary['by_risk_level']
+        total_checks = summary['total']
+        anomalies_found = by_risk['High'] + by_risk['Critical']
+        high_risk_count = by_risk['High']
         
         # Calculate compliance score (mock logic - replace with real logic)
         compliance_score = max(0, min(100, 100 - (high_risk_count * 5)))
         
-        conn.close()
-        
         return jsonify({
             'total_checks': total_checks,
             'anomalies_found': anomalies_found,
             'high_risk_count': high_risk_count,
-            'compliance_score': compliance_score
+            'compliance_score': compliance_score,
+            'by_risk_level': by_risk
         })
         
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
         return jsonify({'error': 'Failed to fetch dashboard stats'}), 500
 
-@app.route('/api/compliance/requirements', methods=['GET'])
+@api.route('/api/dashboard/stats/breakdown', methods=['GET'])
+@token_required
+def get_dashboard_stats_breakdown():
+    """Anomaly counts per ticker and per day"""
+    try:
+        days = max(1, min(request.args.get('days', 30, type=int), 366))
+        return jsonify({
+            'by_ticker': stats_cache.by_ticker(),
+            'by_day': stats_cache.by_day(days)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error fetching stats breakdown: {str(e)}")
+        return jsonify({'error': 'Failed to fetch stats breakdown'}), 500
+
+@api.route('/api/compliance/requirements', methods=['GET'])
 @token_required
 def get_compliance_requirements():
     """Get dynamic compliance requirements"""
@@ -324,27 +785,43 @@ def get_compliance_requirements():
         logger.error(f"Error fetching compliance requirements: {str(e)}")
         return jsonify({'error': 'Failed to fetch compliance requirements'}), 500
 
-@app.route('/api/reports/generate', methods=['POST'])
+@api.route('/api/reports/generate', methods=['POST'])
 @token_required
 def generate_dynamic_report():
     """Generate dynamic compliance report"""
     try:
         data = request.get_json() or {}
         report_type = data.get('report_type', 'compliance')
+        # The report names its author, so identical requests only dedupe (and cache) per user
+        user = {key: request.user[key] for key in ('user_id', 'username', 'role')}
         
-        conn = get_db_connection()
+        if data.get('async'):
+            return submit_job('report', {'report_type': report_type, 'user': user})
         
-        # Get real data for report
-        total_anomalies = conn.execute('SELECT COUNT(*) FROM anomalies').fetchone()[0]
-        high_risk_anomalies = conn.execute('SELECT COUNT(*) FROM anomalies WHERE risk_level = "High"').fetchone()[0]
-        recent_anomalies = conn.execute('''
-            SELECT ticker, anomaly_score, risk_level, timestamp 
-            FROM anomalies 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''').fetchall()
+        return jsonify(build_report(report_type, user))
         
-        conn.close()
+    except Exception as e:
+        logger.error(f"Error generating report: {str(e)}")
+        return jsonify({'error': 'Failed to generate report'}), 500
+
+def build_report(report_type, user, job=None):
+    """Return the stored report for this data version, generating it only on a cache miss"""
+    def build(cache_key):
+        # Read past the stats TTL so content is never older than the data-version stamp in the key
+        summary = stats_cache.summary(fresh=True)
+        total_anomalies = summary['total']
+        high_risk_anomalies = summary['by_risk_level']['High']
+        
+        with db_connection() as conn:
+            # Get real data for report
+            recent_anomalies = conn.execute('''
+                SELECT ticker, anomaly_score, risk_level, timestamp 
+                FROM anomalies 
+                ORDER BY timestamp DESC 
+                LIMIT 10
+            ''').fetchall()
+        if job:
+            job.progress(0.5, 'Collected report data')
         
         # Generate dynamic report content
         report_content = generate_report_content(
@@ -352,23 +829,103 @@ def generate_dynamic_report():
             total_anomalies=total_anomalies,
             high_risk_anomalies=high_risk_anomalies,
             recent_anomalies=recent_anomalies,
-            user=request.user
+            user=user,
+            by_risk_level=summary['by_risk_level']
         )
         
-        # Save report to database (optional)
-        save_report_to_db(request.user['user_id'], report_type, report_content)
+        return save_report_to_db(user['user_id'], report_type, report_content, cache_key)
+    
+    report_id, cached = report_cache.get_or_create('text', {'report_type': report_type, 'user': user}, build)
+    with db_connection() as conn:
+        report = conn.execute('SELECT content, generated_at FROM reports WHERE id = ?', (report_id,)).fetchone()
+    
+    return {
+        'message': 'Report generated successfully',
+        'report': report['content'],
+        'report_id': report_id,
+        'cached': cached,
+        'generated_at': report['generated_at'],
+        'filename': f"{report_type}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    }
+
+@api.route('/api/reports/export', methods=['POST'])
+@token_required
+def export_report():
+    """Full-period anomaly export as a CSV, Parquet or PDF artifact"""
+    try:
+        data = request.get_json() or {}
+        fmt = data.get('format', 'csv')
+        start_date, end_date = data.get('start_date'), data.get('end_date')
+        if fmt not in report_engine.FORMATS:
+            return jsonify({'error': f'format must be one of {sorted(report_engine.FORMATS)}'}), 400
         
-        return jsonify({
-            'message': 'Report generated successfully',
-            'report': report_content,
-            'filename': f"{report_type}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        })
+        if data.get('stream') and fmt == 'csv':
+            # Straight to the client chunk by chunk, nothing stored
+            audit_trail.record_action(request.user['user_id'], 'report_exported', {'format': fmt, 'stream': True})
+            filename = f"anomalies_{start_date or 'all'}_{end_date or 'now'}.csv"
+            return Response(stream_with_context(report_engine.iter_csv(start_date, end_date)), mimetype='text/csv',
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        
+        user = {key: request.user[key] for key in ('user_id', 'username', 'role')}
+        params = {'format': fmt, 'start_date': start_date, 'end_date': end_date, 'user': user}
+        if data.get('async'):
+            return submit_job('report_export', params)
+        
+        report = run_export(params)
+        return jsonify(report), 201
         
     except Exception as e:
-        logger.error(f"Error generating report: {str(e)}")
-        return jsonify({'error': 'Failed to generate report'}), 500
+        logger.error(f"Error exporting report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-def generate_report_content(report_type, total_anomalies, high_risk_anomalies, recent_anomalies, user):
+def run_export(params, job=None):
+    def build(cache_key):
+        return report_engine.export(params['format'], params['user'], params.get('start_date'),
+                                    params.get('end_date'), job, cache_key)['id']
+    
+    report_id, cached = report_cache.get_or_create('export', params, build)
+    report = dict(report_engine.get(report_id), cached=cached)
+    audit_trail.record_action(params['user']['user_id'], 'report_exported', {
+        'report_id': report['id'],
+        'format': report['format'],
+        'rows': report['row_count'],
+        'cached': cached
+    })
+    return report
+
+@api.route('/api/reports', methods=['GET'])
+@token_required
+def list_reports():
+    try:
+        user_id = None if request.user.get('role') == 'admin' else request.user['user_id']
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        return jsonify(report_engine.list_reports(user_id, limit))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/reports/<int:report_id>/download', methods=['GET'])
+@stream_token_required
+def download_report(report_id):
+    try:
+        report = report_engine.get(report_id)
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+        if report['user_id'] != request.user['user_id'] and request.user.get('role') != 'admin':
+            return jsonify({'error': 'Report belongs to another user'}), 403
+        
+        path = report_engine.artifact_path(report)
+        if not path:
+            return jsonify({'error': 'Report has no downloadable artifact'}), 404
+        
+        # send_file streams the artifact from disk rather than loading it
+        return send_file(path, mimetype=report_engine.FORMATS[report['format']], as_attachment=True,
+                         download_name=os.path.basename(path), conditional=True)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def generate_report_content(report_type, total_anomalies, high_risk_anomalies, recent_anomalies, user, by_risk_level):
     """Generate dynamic report content based on real data"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
@@ -386,10 +943,10 @@ EXECUTIVE SUMMARY:
 DETAILED ANALYSIS:
 
 1. ANOMALY DISTRIBUTION:
-   - Critical Risk: {len([a for a in recent_anomalies if a['risk_level'] == 'Critical'])}
-   - High Risk: {len([a for a in recent_anomalies if a['risk_level'] == 'High'])}
-   - Medium Risk: {len([a for a in recent_anomalies if a['risk_level'] == 'Medium'])}
-   - Low Risk: {len([a for a in recent_anomalies if a['risk_level'] == 'Low'])}
+   - Critical Risk: {by_risk_level['Critical']}
+   - High Risk: {by_risk_level['High']}
+   - Medium Risk: {by_risk_level['Medium']}
+   - Low Risk: {by_risk_level['Low']}
 
 2. RECENT ANOMALIES (Last 10):
 {chr(10).join([f'   - {a["ticker"]}: {a["anomaly_score"]:.4f} ({a["risk_level"]})' for a in recent_anomalies])}
@@ -421,29 +978,62 @@ def get_recommended_actions(high_risk_count):
     else:
         return "Standard monitoring procedures sufficient. Continue regular compliance checks."
 
-def save_report_to_db(user_id, report_type, content):
-    """Save generated report to database"""
-    try:
-        conn = get_db_connection()
-        conn.execute('''
-            INSERT INTO reports (user_id, report_type, content, generated_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (user_id, report_type, content))
+def save_report_to_db(user_id, report_type, content, cache_key=None):
+    """Save generated report to database; returns the new report id"""
+    with db_connection() as conn:
+        cursor = conn.execute('''
+            INSERT INTO reports (user_id, report_type, content, cache_key, generated_at, last_accessed_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        ''', (user_id, report_type, content, cache_key))
         conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error(f"Error saving report to DB: {str(e)}")
-        return False
-    return True
+        return cursor.lastrowid
 
-# In backend/app.py, change the last few lines:
-if __name__ == '__main__':
+job_manager.register('anomaly_detection', lambda params, job: run_detection(params, job.user_id, job))
+job_manager.register('report', lambda params, job: build_report(params['report_type'], params['user'], job))
+job_manager.register('report_export', lambda params, job: run_export(params, job))
+job_manager.register('document_extraction', lambda params, job: run_document_verification(params, job.user_id, job))
+
+def warm_up(background=False):
+    """Load the anomaly model (and with it scikit-learn) and the duplicate-identity filter"""
+    if background:
+        # Dev server: serve immediately; early requests load a saved model or get 503 until one is trained
+        threading.Thread(target=warm_up, name='app-warm-up', daemon=True).start()
+        return
+    started = time.perf_counter()
+    model_registry.bootstrap(anomaly_detector.generate_sample_data)
+    identity_index.warm()
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+def create_app(warm=False):
+    """Build the Flask app; migrations run once here, and the model loads on first use unless warm is set"""
     init_database()
+    model_registry.defer_bootstrap(anomaly_detector.generate_sample_data)
+    
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES
+    CORS(app)
+    app.register_blueprint(api)
+    
+    if warm:
+        warm_up()
+    return app
+
+def __getattr__(name):
+    # `from app import app` and `gunicorn app:app` keep working; the app is only built on first access
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+if __name__ == '__main__':
+    app = create_app()
+    warm_up(background=True)
     print("Starting BrokerMint Compliance Server...")
     print(f"API URL: http://{config.API_HOST}:{config.API_PORT}")
     print("Default admin credentials: admin/admin")
+    print("For production use: python serve.py --workers N")
     app.run(
         host=config.API_HOST,
         port=config.API_PORT,
         debug=config.DEBUG
-    )
\ No newline at end of file
+    )
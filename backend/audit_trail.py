@@ -1,38 +1,238 @@
 # backend/audit_trail.py - FIXED
 from datetime import datetime
 import json
+import base64
 import sys
 import os
+import time
+import queue
+import atexit
+import logging
+import threading
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_db_connection
+from config import config
+from database import get_db_connection, db_connection
+
+logger = logging.getLogger(__name__)
+
+class _Flush:
+    """Queue marker asking the writer to flush and signal when done; ok is False if the flush's write failed"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = True
+
+_STOP = object()
+
+class AuditWriter:
+    """Background thread that writes queued audit events in batched transactions"""
+
+    def __init__(self, batch_size=None, flush_interval=None, queue_size=None, enqueue_timeout=None, spill_path=None):
+        self.batch_size = batch_size or config.AUDIT_BATCH_SIZE
+        self.flush_interval = flush_interval or config.AUDIT_FLUSH_INTERVAL
+        self.enqueue_timeout = config.AUDIT_ENQUEUE_TIMEOUT if enqueue_timeout is None else enqueue_timeout
+        # Bounded so a stalled database pushes back on callers instead of growing memory
+        self.queue = queue.Queue(maxsize=queue_size or config.AUDIT_QUEUE_SIZE)
+        self.spill_path = spill_path or config.AUDIT_SPILL_PATH
+        self._thread = None
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, event):
+        """Queue an event; if the queue stays full past the timeout, write it synchronously"""
+        self.start()
+        try:
+            self.queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning("Audit queue full, writing event synchronously")
+            self._write([event])
+
+    def _write(self, events):
+        """Write a batch; if the database keeps failing, spill it to AUDIT_SPILL_PATH and return False"""
+        if not self._insert(events):
+            self._spill(events)
+            return False
+        # The database is writable again: bring back anything spilled earlier
+        return self._replay_spill()
+
+    def _insert(self, events):
+        """Insert a batch in one transaction, retrying briefly so a locked database doesn't drop events"""
+        for attempt in range(3):
+            try:
+                with db_connection() as conn:
+                    conn.executemany('''
+                        INSERT INTO audit_trail (user_id, action_type, details, timestamp)
+                        VALUES (?, ?, ?, ?)
+                    ''', events)
+                    conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Error writing {len(events)} audit events (attempt {attempt + 1}): {e}")
+                time.sleep(0.1 * (attempt + 1))
+        return False
+
+    def _spill(self, events):
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, 'a') as f:
+                    for event in events:
+                        f.write(json.dumps(event) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                logger.warning(f"Spilled {len(events)} audit events to {self.spill_path} for replay")
+            except OSError as e:
+                logger.critical(f"Lost {len(events)} audit events: database and spill file both failed ({e})")
+
+    def _replay_spill(self):
+        """Insert spilled events in one transaction and remove the file; False if they are still pending"""
+        if not os.path.exists(self.spill_path):
+            return True
+        with self._spill_lock:
+            try:
+                with open(self.spill_path) as f:
+                    # A torn last line (crash mid-append) is skipped rather than blocking the replay
+                    events = [tuple(json.loads(line)) for line in f if line.endswith('\n')]
+            except FileNotFoundError:
+                return True
+            if events and not self._insert(events):
+                return False
+            os.remove(self.spill_path)
+        logger.info(f"Replayed {len(events)} spilled audit events")
+        return True
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _Flush) or item is _STOP:
+                # An empty batch still retries any spilled events, so a flush reports whether they are in
+                item_ok = self._write(batch) if batch else self._replay_spill()
+                batch = []
+                if item is _STOP:
+                    return
+                item.ok = item_ok
+                item.done.set()
+                continue
+
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def flush(self, timeout=5):
+        """Wait until everything queued so far has been written; False on a timeout or a failed (spilled) write"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self.queue.put(marker, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # A full queue means the writer is behind or stalled; readers get a possibly stale view instead of hanging
+            logger.warning("Audit queue full, reading without flushing pending events")
+            return False
+        return marker.done.wait(timeout) and marker.ok
+
+    def stop(self, timeout=5):
+        """Write out pending events and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.warning("Audit queue full, writer not stopped cleanly")
+                return
+            self._thread.join(timeout)
 
 class AuditTrail:
+    def __init__(self, writer=None):
+        self.writer = writer or AuditWriter()
+    
     def record_action(self, user_id, action_type, details=None):
-        conn = get_db_connection()
-        try:
-            conn.execute('''
-                INSERT INTO audit_trail (user_id, action_type, details)
-                VALUES (?, ?, ?)
-            ''', (user_id, action_type, json.dumps(details) if details else None))
-            conn.commit()
-        finally:
-            conn.close()
+        # Stamp at enqueue time (same format as CURRENT_TIMESTAMP) so batching doesn't shift event times
+        event = (user_id, action_type, json.dumps(details) if details else None,
+                 datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+        if config.AUDIT_ASYNC:
+            self.writer.enqueue(event)
+        else:
+            self.writer._write([event])
     
     def get_audit_log(self, limit=100):
+        return self.get_audit_page(limit)['entries']
+    
+    def encode_cursor(self, entry):
+        raw = json.dumps([entry['timestamp'], entry['id']]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+    
+    def decode_cursor(self, cursor):
+        try:
+            timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return str(timestamp), int(entry_id)
+        except Exception:
+            raise ValueError('Invalid cursor')
+    
+    def get_audit_page(self, limit=100, cursor=None, user_id=None, action_type=None, start=None, end=None):
+        """One page of the audit trail, newest first, using keyset pagination on (timestamp, id)"""
+        # Read-your-writes: include events still sitting in the queue
+        self.writer.flush()
+        
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if action_type:
+            conditions.append('action_type = ?')
+            params.append(action_type)
+        if start:
+            conditions.append('timestamp >= ?')
+            params.append(start.replace('T', ' '))
+        if end:
+            conditions.append('timestamp <= ?')
+            params.append(end.replace('T', ' '))
+        if cursor:
+            # Seek past the last row of the previous page instead of OFFSET, so every page costs the same
+            conditions.append('(timestamp, id) < (?, ?)')
+            params.extend(self.decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
         conn = get_db_connection()
         try:
-            results = conn.execute('''
+            # Page over audit_trail alone (index-ordered), then join users for just those rows
+            results = conn.execute(f'''
                 SELECT a.*, u.username 
-                FROM audit_trail a 
+                FROM (
+                    SELECT * FROM audit_trail 
+                    {where} 
+                    ORDER BY timestamp DESC, id DESC 
+                    LIMIT ?
+                ) a 
                 LEFT JOIN users u ON a.user_id = u.id 
-                ORDER BY a.timestamp DESC 
-                LIMIT ?
-            ''', (limit,)).fetchall()
-            return [dict(row) for row in results]
+                ORDER BY a.timestamp DESC, a.id DESC
+            ''', (*params, limit + 1)).fetchall()
+            entries = [dict(row) for row in results]
         finally:
             conn.close()
+        
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        return {
+            'entries': entries,
+            'next_cursor': self.encode_cursor(entries[-1]) if has_more else None
+        }
 
-audit_trail = AuditTrail()
\ No newline at end of file
+audit_trail = AuditTrail()
+atexit.register(audit_trail.writer.stop)
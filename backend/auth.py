@@ -5,19 +5,73 @@ from datetime import datetime, timedelta
 import sqlite3
 import sys
 import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import get_db_connection
 from config import config
+from metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+class TokenCache:
+    """LRU of verified JWT payloads keyed by token digest; entries expire with the token's exp"""
+    
+    def __init__(self, max_size=None):
+        self.max_size = max_size or config.TOKEN_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload
+    
+    def put(self, digest, payload, expires_at):
+        with self._lock:
+            self._entries[digest] = (payload, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
 
 class AuthSystem:
+    def __init__(self):
+        self.token_cache = TokenCache()
+        # digest -> exp of revoked tokens, mirrored from the revoked_tokens table
+        self.revoked = {}
+        self._revocations_checked = 0.0
+        self._revocation_lock = threading.Lock()
+    
     def hash_password(self, password):
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)).decode('utf-8')
     
     def verify_password(self, password, hashed_password):
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        with stage_seconds.time(component='auth', stage='bcrypt_check'):
+            return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    
+    def needs_rehash(self, hashed_password):
+        # bcrypt hashes look like $2b$<cost>$<salt+hash>
+        try:
+            return int(hashed_password.split('$')[2]) != config.BCRYPT_ROUNDS
+        except (IndexError, ValueError):
+            return True
     
     def create_user(self, username, email, password, full_name, role='user'):
         conn = get_db_connection()
@@ -44,6 +98,11 @@ class AuthSystem:
             ).fetchone()
             
             if user and self.verify_password(password, user['password_hash']):
+                if self.needs_rehash(user['password_hash']):
+                    # Move the stored hash to the configured cost while we have the plaintext
+                    conn.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                                 (self.hash_password(password), user['id']))
+                    conn.commit()
                 return dict(user)
             return None
         finally:
@@ -58,13 +117,79 @@ class AuthSystem:
         }
         return jwt.encode(payload, config.JWT_SECRET_KEY, algorithm='HS256')
     
+    def token_digest(self, token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def _refresh_revocations(self):
+        """Reload revocations made by other worker processes, at most every TOKEN_REVOCATION_REFRESH seconds"""
+        now = time.monotonic()
+        if now - self._revocations_checked < config.TOKEN_REVOCATION_REFRESH:
+            return
+        with self._revocation_lock:
+            if now - self._revocations_checked < config.TOKEN_REVOCATION_REFRESH:
+                return
+            conn = get_db_connection()
+            try:
+                rows = conn.execute('SELECT token_digest, expires_at FROM revoked_tokens WHERE expires_at > ?',
+                                    (time.time(),)).fetchall()
+            finally:
+                conn.close()
+            # Merged rather than replaced: a revoke_token() that committed after the SELECT above must not be
+            # dropped; entries leave only once the token has expired anyway
+            wall_now = time.time()
+            for digest in [digest for digest, exp in self.revoked.items() if exp <= wall_now]:
+                del self.revoked[digest]
+            for row in rows:
+                self.revoked[row['token_digest']] = row['expires_at']
+                self.token_cache.discard(row['token_digest'])
+            self._revocations_checked = now
+    
     def verify_token(self, token):
+        digest = self.token_digest(token)
         try:
-            payload = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
-            return payload
+            self._refresh_revocations()
+        except Exception as e:
+            logger.error(f"Error refreshing token revocations: {e}")
+        if digest in self.revoked:
+            return None
+        
+        payload = self.token_cache.get(digest)
+        if payload is not None:
+            return dict(payload)
+        
+        try:
+            with stage_seconds.time(component='auth', stage='jwt_decode'):
+                payload = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        
+        self.token_cache.put(digest, payload, payload['exp'])
+        return dict(payload)
+    
+    def revoke_token(self, token):
+        """Invalidate a token (e.g. on logout) until it would have expired anyway"""
+        try:
+            payload = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'],
+                                 options={'verify_exp': False})
+        except jwt.InvalidTokenError:
+            return False
+        
+        digest = self.token_digest(token)
+        conn = get_db_connection()
+        try:
+            conn.execute('INSERT OR REPLACE INTO revoked_tokens (token_digest, expires_at) VALUES (?, ?)',
+                         (digest, payload['exp']))
+            conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (time.time(),))
+            conn.commit()
+        finally:
+            conn.close()
+        
+        # Persisted first, and added under the refresh lock so a concurrent refresh can't drop it
+        with self._revocation_lock:
+            self.revoked[digest] = payload['exp']
+        self.token_cache.discard(digest)
+        return True
 
-auth_system = AuthSystem()
\ No newline at end of file
+auth_system = AuthSystem()
@@ -13,18 +13,60 @@ class Config:
     # API Settings
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 5000))
+    # serve.py: pre-forked worker processes, each with a pool of request threads
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', os.cpu_count() or 1))
+    SERVE_THREADS = int(os.getenv('SERVE_THREADS', 8))
     
     # Database
-    DATABASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'shared_data', 'brokermint.db')
+    DATABASE_PATH = os.getenv('DATABASE_PATH', os.path.join(os.path.dirname(__file__), '..', 'shared_data', 'brokermint.db'))
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_PATH}'
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 16))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 64 * 1024))
+    
+    # Audit trail writer
+    AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'True').lower() == 'true'
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 200))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 0.5))
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_ENQUEUE_TIMEOUT = float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', 0.5))
+    # Batches the database keeps rejecting are appended here and replayed after the next successful write
+    AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', f'{DATABASE_PATH}.audit-spill.jsonl')
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+    TOKEN_REVOCATION_REFRESH = float(os.getenv('TOKEN_REVOCATION_REFRESH', 5))
+    
+    # Instrumentation: /api/metrics is open unless METRICS_TOKEN is set; profiling is opt-in per request
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1.0))
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+    
+    # Password hashing cost (log2 rounds); existing hashes are upgraded on next login
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
     
     # Paths
     DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'shared_data')
     UPLOAD_FOLDER = os.path.join(DATA_DIR, 'uploads')
+    TRADE_STORE_DIR = os.getenv('TRADE_STORE_DIR', os.path.join(DATA_DIR, 'trades'))
+    TICK_STORE_DIR = os.getenv('TICK_STORE_DIR', os.path.join(DATA_DIR, 'ticks'))
+    REPORT_DIR = os.getenv('REPORT_DIR', os.path.join(DATA_DIR, 'reports'))
+    
+    # Bulk trade ingestion
+    INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', 500000))
+    
+    # Synthetic market data (market_data.py); set a seed for reproducible demo data, which is then also stored
+    MARKET_DATA_CHUNK_ROWS = int(os.getenv('MARKET_DATA_CHUNK_ROWS', 1000000))
+    SAMPLE_DATA_SEED = int(os.getenv('SAMPLE_DATA_SEED')) if os.getenv('SAMPLE_DATA_SEED') else None
+    
+    # Memory-mapped tick store; rows scored per chunk bound detection memory
+    TICK_SCORE_CHUNK_ROWS = int(os.getenv('TICK_SCORE_CHUNK_ROWS', 262144))
     
     # Anomaly Detection
     ANOMALY_THRESHOLDS = {
@@ -33,5 +75,85 @@ class Config:
         'High': 0.8,
         'Critical': 0.95
     }
+    
+    # Features fed to the anomaly model (see features.FeatureEngine)
+    FEATURE_WINDOW = int(os.getenv('FEATURE_WINDOW', 20))
+    ANOMALY_FEATURES = ['price', 'volume', 'return_1', 'rolling_return', 'volatility',
+                        'volume_zscore', 'vwap_deviation']
+    
+    # Detector engines: isolation_forest, mad, ewma, cusum, or cascade (a cheap screen reviewed by the forest)
+    DETECTOR_ENGINE = os.getenv('DETECTOR_ENGINE', 'isolation_forest')
+    # Per-ticker overrides, e.g. "AAPL=mad,TSLA=cascade"
+    DETECTOR_ENGINE_BY_TICKER = dict(
+        item.strip().split('=', 1) for item in os.getenv('DETECTOR_ENGINE_BY_TICKER', '').split(',') if '=' in item
+    )
+    DETECTOR_CASCADE_SCREEN = os.getenv('DETECTOR_CASCADE_SCREEN', 'mad')
+    DETECTOR_MAD_WINDOW = int(os.getenv('DETECTOR_MAD_WINDOW', 50))
+    DETECTOR_MAD_THRESHOLD = float(os.getenv('DETECTOR_MAD_THRESHOLD', 5.0))
+    DETECTOR_EWMA_SPAN = int(os.getenv('DETECTOR_EWMA_SPAN', 30))
+    DETECTOR_EWMA_THRESHOLD = float(os.getenv('DETECTOR_EWMA_THRESHOLD', 4.0))
+    DETECTOR_CUSUM_DRIFT = float(os.getenv('DETECTOR_CUSUM_DRIFT', 1.0))
+    DETECTOR_CUSUM_THRESHOLD = float(os.getenv('DETECTOR_CUSUM_THRESHOLD', 5.0))
+    
+    # Flagged rows from detection runs are upserted into the anomalies table
+    ANOMALY_PERSIST = os.getenv('ANOMALY_PERSIST', 'True').lower() == 'true'
+    
+    # Dashboard statistics cache
+    STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 5))
+    
+    # Model registry
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(DATA_DIR, 'models'))
+    MODEL_KEEP_VERSIONS = int(os.getenv('MODEL_KEEP_VERSIONS', 5))
+    MODEL_WARMUP_ROWS = int(os.getenv('MODEL_WARMUP_ROWS', 256))
+    
+    # Parallel detection
+    DETECTION_WORKERS = int(os.getenv('DETECTION_WORKERS', os.cpu_count() or 1))
+    PARALLEL_MIN_ROWS = int(os.getenv('PARALLEL_MIN_ROWS', 50000))
+    PARALLEL_SCRATCH_DIR = os.getenv('PARALLEL_SCRATCH_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+    # Detection requests without a start_date score this many days of ingested trades, ending at end_date
+    # or the newest partition, instead of loading every partition of the tickers at once
+    DETECTION_DEFAULT_DAYS = int(os.getenv('DETECTION_DEFAULT_DAYS', 30))
+    
+    # Streaming detection
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+    STREAM_FLUSH_INTERVAL = float(os.getenv('STREAM_FLUSH_INTERVAL', 1.0))
+    STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 10000))
+    STREAM_WINDOW = int(os.getenv('STREAM_WINDOW', 100))
+    STREAM_MAX_TICKERS = int(os.getenv('STREAM_MAX_TICKERS', 10000))
+    
+    # Background jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_MAX_PER_USER = int(os.getenv('JOB_MAX_PER_USER', 5))
+    JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', 0.5))
+    JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', 7))
+    
+    # eKYC
+    EKYC_BATCH_MAX = int(os.getenv('EKYC_BATCH_MAX', 10000))
+    IDENTITY_HASH_KEY = os.getenv('IDENTITY_HASH_KEY', SECRET_KEY)
+    IDENTITY_BLOOM_CAPACITY = int(os.getenv('IDENTITY_BLOOM_CAPACITY', 2000000))
+    IDENTITY_BLOOM_ERROR_RATE = float(os.getenv('IDENTITY_BLOOM_ERROR_RATE', 0.001))
+    IDENTITY_REFRESH_INTERVAL = float(os.getenv('IDENTITY_REFRESH_INTERVAL', 1.0))
+    
+    # Document OCR
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'tesseract')
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+    OCR_TIMEOUT = float(os.getenv('OCR_TIMEOUT', 120))
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    
+    # Report exports
+    REPORT_CHUNK_ROWS = int(os.getenv('REPORT_CHUNK_ROWS', 5000))
+    REPORT_CACHE_MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', 200))
+    REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+    
+    # Server-sent events
+    EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', 1.0))
+    EVENTS_CLIENT_BUFFER = int(os.getenv('EVENTS_CLIENT_BUFFER', 256))
+    EVENTS_MAX_CLIENTS = int(os.getenv('EVENTS_MAX_CLIENTS', 200))
+    # Open SSE responses (/api/events and job event streams) per process. Each one holds a request thread
+    # for as long as it is open, so under serve.py this must stay well below SERVE_THREADS;
+    # 0 means SERVE_THREADS // 2. Size SERVE_THREADS at about twice the streams a worker should carry.
+    EVENTS_MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', 0))
+    EVENTS_MAX_BATCH = int(os.getenv('EVENTS_MAX_BATCH', 500))
+    EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', 15))
 
 config = Config()
\ No newline at end of file
@@ -1,7 +1,13 @@
 # backend/database.py - FIXED
 import sqlite3
 import os
+import re
 import sys
+import time
+import queue
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
 
 import bcrypt
 
@@ -9,12 +15,25 @@ import bcrypt
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import config
+from metrics import metrics
+
+_initialized = set()
 
 def init_database():
-    """Initialize the database with required tables"""
-    os.makedirs(os.path.dirname(config.DATABASE_PATH), exist_ok=True)
+    """Create the tables, apply pending migrations and seed the admin account of a fresh database.
+    Run once at startup (not on import); a database already at the latest schema version is left as is."""
+    path = os.path.abspath(config.DATABASE_PATH)
+    if path in _initialized:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = sqlite3.connect(path)
+    # WAL is persistent in the file, so pooled connections all inherit it
+    conn.execute('PRAGMA journal_mode=WAL')
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= MIGRATIONS[-1][0]:
+        conn.close()
+        _initialized.add(path)
+        return
     cursor = conn.cursor()
     
     # Users table
@@ -80,22 +99,387 @@ def init_database():
         )
     ''')
     
-    password = "admin"
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # Only a database without accounts gets the default admin, so restarts never pay for a bcrypt hash
+    if cursor.execute('SELECT 1 FROM users LIMIT 1').fetchone() is None:
+        password = "admin"
+        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)).decode('utf-8')
 
-    cursor.execute('''
-        INSERT OR IGNORE INTO users (username, email, password_hash, full_name, role)
-        VALUES (?, ?, ?, ?, ?)
-    ''', ('admin', 'admin@brokermint.com', hashed_password, 'System Administrator', 'admin'))
+        cursor.execute('''
+            INSERT OR IGNORE INTO users (username, email, password_hash, full_name, role)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ('admin', 'admin@brokermint.com', hashed_password, 'System Administrator', 'admin'))
     
     conn.commit()
+    apply_migrations(conn)
     conn.close()
+    _initialized.add(path)
+
+# Schema migrations, applied in order on top of the base tables and tracked in PRAGMA user_version.
+# Each step is a SQL string or a callable taking the cursor; never edit a released migration, append one.
+MIGRATIONS = [
+    (1, 'audit_trail indexes for time-ordered and filtered keyset pagination', [
+        'CREATE INDEX IF NOT EXISTS idx_audit_trail_timestamp ON audit_trail (timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_trail_user_timestamp ON audit_trail (user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_trail_action_timestamp ON audit_trail (action_type, timestamp)',
+    ]),
+    (2, 'anomaly summary tables kept current by triggers', [
+        '''CREATE TABLE IF NOT EXISTS anomaly_stats_risk (
+            risk_level TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS anomaly_stats_ticker (
+            ticker TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ticker, risk_level)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS anomaly_stats_daily (
+            day TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, risk_level)
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_anomalies_stats_insert AFTER INSERT ON anomalies
+        BEGIN
+            INSERT INTO anomaly_stats_risk (risk_level, count) VALUES (NEW.risk_level, 1)
+                ON CONFLICT (risk_level) DO UPDATE SET count = count + 1;
+            INSERT INTO anomaly_stats_ticker (ticker, risk_level, count) VALUES (NEW.ticker, NEW.risk_level, 1)
+                ON CONFLICT (ticker, risk_level) DO UPDATE SET count = count + 1;
+            INSERT INTO anomaly_stats_daily (day, risk_level, count)
+                VALUES (COALESCE(date(NEW.timestamp), 'unknown'), NEW.risk_level, 1)
+                ON CONFLICT (day, risk_level) DO UPDATE SET count = count + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_anomalies_stats_delete AFTER DELETE ON anomalies
+        BEGIN
+            UPDATE anomaly_stats_risk SET count = count - 1 WHERE risk_level = OLD.risk_level;
+            UPDATE anomaly_stats_ticker SET count = count - 1
+                WHERE ticker = OLD.ticker AND risk_level = OLD.risk_level;
+            UPDATE anomaly_stats_daily SET count = count - 1
+                WHERE day = COALESCE(date(OLD.timestamp), 'unknown') AND risk_level = OLD.risk_level;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_anomalies_stats_update AFTER UPDATE OF ticker, risk_level, timestamp ON anomalies
+        BEGIN
+            UPDATE anomaly_stats_risk SET count = count - 1 WHERE risk_level = OLD.risk_level;
+            UPDATE anomaly_stats_ticker SET count = count - 1
+                WHERE ticker = OLD.ticker AND risk_level = OLD.risk_level;
+            UPDATE anomaly_stats_daily SET count = count - 1
+                WHERE day = COALESCE(date(OLD.timestamp), 'unknown') AND risk_level = OLD.risk_level;
+            INSERT INTO anomaly_stats_risk (risk_level, count) VALUES (NEW.risk_level, 1)
+                ON CONFLICT (risk_level) DO UPDATE SET count = count + 1;
+            INSERT INTO anomaly_stats_ticker (ticker, risk_level, count) VALUES (NEW.ticker, NEW.risk_level, 1)
+                ON CONFLICT (ticker, risk_level) DO UPDATE SET count = count + 1;
+            INSERT INTO anomaly_stats_daily (day, risk_level, count)
+                VALUES (COALESCE(date(NEW.timestamp), 'unknown'), NEW.risk_level, 1)
+                ON CONFLICT (day, risk_level) DO UPDATE SET count = count + 1;
+        END''',
+        # Keeps the "most recent anomalies" lookups alongside the summaries off a full sort
+        'CREATE INDEX IF NOT EXISTS idx_anomalies_timestamp ON anomalies (timestamp)',
+        # Backfill from rows inserted before the triggers existed
+        '''INSERT OR REPLACE INTO anomaly_stats_risk (risk_level, count)
+            SELECT risk_level, COUNT(*) FROM anomalies GROUP BY risk_level''',
+        '''INSERT OR REPLACE INTO anomaly_stats_ticker (ticker, risk_level, count)
+            SELECT ticker, risk_level, COUNT(*) FROM anomalies GROUP BY ticker, risk_level''',
+        '''INSERT OR REPLACE INTO anomaly_stats_daily (day, risk_level, count)
+            SELECT COALESCE(date(timestamp), 'unknown'), risk_level, COUNT(*) FROM anomalies
+            GROUP BY COALESCE(date(timestamp), 'unknown'), risk_level''',
+    ]),
+    (3, 'revoked JWTs shared across worker processes', [
+        '''CREATE TABLE IF NOT EXISTS revoked_tokens (
+            token_digest TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens (expires_at)',
+    ]),
+    (4, 'background jobs with status, progress and results', [
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            dedup_key TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            user_id INTEGER,
+            pid INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )''',
+        # At most one in-flight job per key, enforced across worker processes
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup_active ON jobs (dedup_key)
+            WHERE status IN ('queued', 'running')''',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)',
+    ]),
+    (5, 'report artifact metadata; large exports live on disk instead of in content', [
+        'ALTER TABLE reports ADD COLUMN format TEXT',
+        'ALTER TABLE reports ADD COLUMN file_path TEXT',
+        'ALTER TABLE reports ADD COLUMN row_count INTEGER',
+        'ALTER TABLE reports ADD COLUMN size_bytes INTEGER',
+        'ALTER TABLE reports ADD COLUMN period_start TEXT',
+        'ALTER TABLE reports ADD COLUMN period_end TEXT',
+        'ALTER TABLE reports ADD COLUMN summary TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_reports_user_generated ON reports (user_id, generated_at)',
+    ]),
+    (6, 'report cache keys and an anomalies revision counter for data-version stamps', [
+        'ALTER TABLE reports ADD COLUMN cache_key TEXT',
+        'ALTER TABLE reports ADD COLUMN last_accessed_at TIMESTAMP',
+        'ALTER TABLE reports ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 0',
+        'CREATE INDEX IF NOT EXISTS idx_reports_cache_key ON reports (cache_key)',
+        '''CREATE TABLE IF NOT EXISTS data_revisions (
+            name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )''',
+        "INSERT OR IGNORE INTO data_revisions (name, revision) VALUES ('anomalies', 0)",
+        # Inserts already move MAX(id)/COUNT(*); only in-place changes and deletes need counting
+        '''CREATE TRIGGER IF NOT EXISTS trg_anomalies_revision_update AFTER UPDATE ON anomalies
+        BEGIN
+            UPDATE data_revisions SET revision = revision + 1 WHERE name = 'anomalies';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_anomalies_revision_delete AFTER DELETE ON anomalies
+        BEGIN
+            UPDATE data_revisions SET revision = revision + 1 WHERE name = 'anomalies';
+        END''',
+    ]),
+    (7, 'OCR extraction results cached by uploaded file hash', [
+        '''CREATE TABLE IF NOT EXISTS document_extractions (
+            file_hash TEXT PRIMARY KEY,
+            backend TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ]),
+    (8, 'keyed hash of the normalized document number for duplicate-identity checks', [
+        'ALTER TABLE ekyc_verifications ADD COLUMN document_hash TEXT',
+        # Covers both the per-document lookup and the shared-identity GROUP BY
+        '''CREATE INDEX IF NOT EXISTS idx_ekyc_document_hash
+            ON ekyc_verifications (document_hash, user_id, document_type)''',
+    ]),
+    (9, 'detection run results: trade fields, run id and a natural key for idempotent upserts', [
+        'ALTER TABLE anomalies ADD COLUMN run_id TEXT',
+        'ALTER TABLE anomalies ADD COLUMN price REAL',
+        'ALTER TABLE anomalies ADD COLUMN volume INTEGER',
+        'ALTER TABLE anomalies ADD COLUMN trade_time TEXT',
+        'ALTER TABLE anomalies ADD COLUMN model_version TEXT',
+        # Older rows have NULL trade_time/model_version, and NULLs never collide in a unique index
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_anomalies_natural_key
+            ON anomalies (ticker, trade_time, model_version)''',
+        'CREATE INDEX IF NOT EXISTS idx_anomalies_run_id ON anomalies (run_id)',
+    ]),
+]
+
+def apply_migrations(conn):
+    """Run every migration newer than the database's user_version, each in its own transaction"""
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        try:
+            # Explicit BEGIN: the sqlite3 module would otherwise autocommit each DDL statement
+            cursor.execute('BEGIN')
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+statement_seconds = metrics.histogram(
+    'brokermint_db_statement_seconds', 'SQLite statement execution time', ['operation', 'table'])
+rows_affected = metrics.counter(
+    'brokermint_db_rows_affected', 'Rows changed by INSERT/UPDATE/DELETE statements', ['operation', 'table'])
+rows_fetched = metrics.counter(
+    'brokermint_db_rows_fetched', 'Rows returned to callers by fetchone/fetchmany/fetchall', ['table'])
+
+_STATEMENT_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE(?: IF (?:NOT )?EXISTS)?|INDEX .+? ON)\s+(\w+)', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def describe_statement(sql):
+    """(operation, table) labels for a statement; bounded so metrics never key on raw SQL"""
+    words = sql.split(None, 1)
+    operation = words[0].upper() if words else ''
+    match = _STATEMENT_TABLE.search(sql)
+    return operation, match.group(1) if match else ''
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records per-statement latency and row counts"""
+    _labels = ('', '')
+
+    def execute(self, sql, parameters=()):
+        self._labels = describe_statement(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._labels = describe_statement(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(start)
+
+    def _record(self, start):
+        operation, table = self._labels
+        statement_seconds.observe(time.perf_counter() - start, operation=operation, table=table)
+        if self.rowcount > 0:
+            rows_affected.inc(self.rowcount, operation=operation, table=table)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            rows_fetched.inc(table=self._labels[1])
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        rows_fetched.inc(len(rows), table=self._labels[1])
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        rows_fetched.inc(len(rows), table=self._labels[1])
+        return rows
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including the execute() shortcuts) are instrumented"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3's shortcuts bypass Python-level cursor methods, so route them explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT"""
+
+class PooledConnection:
+    """A pooled sqlite3 connection; close() hands it back to the pool instead of closing it"""
+    
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+    
+    def __del__(self):
+        # Paths that forget close() still give the connection back once the wrapper is dropped
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Thread-safe pool of WAL-mode SQLite connections"""
+    
+    def __init__(self, path, size=None, timeout=None):
+        self.path = path
+        self.size = size or config.DB_POOL_SIZE
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+    
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=InstrumentedConnection if config.METRICS_ENABLED else sqlite3.Connection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA mmap_size={int(config.DB_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA cache_size=-{int(config.DB_CACHE_SIZE_KB)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhaustedError(f'No database connection available after {self.timeout}s')
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+        return PooledConnection(self, conn)
+    
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error:
+            # Broken connection: drop it, a fresh one is opened on demand
+            conn.close()
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def connection(self):
+        """Request-scoped connection that always goes back to the pool"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide connection pool, rebuilt after a fork or a database path change"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid() or _pool.path != config.DATABASE_PATH:
+            _pool = ConnectionPool(config.DATABASE_PATH)
+        return _pool
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get a pooled database connection (close() returns it to the pool)"""
+    return get_pool().acquire()
 
-# Initialize database on import
-init_database()
\ No newline at end of file
+def db_connection():
+    """Context manager for a pooled connection with guaranteed return"""
+    return get_pool().connection()
@@ -0,0 +1,126 @@
+# backend/document_pipeline.py
+import sys
+import os
+import re
+import json
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+from ocr import process_document, score_extraction, IMAGE_EXTENSIONS, TEXT_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+class DocumentPipeline:
+    """Upload -> decode/OCR -> field extraction in a process pool, with results cached by file hash"""
+    EXTENSIONS = IMAGE_EXTENSIONS | TEXT_EXTENSIONS
+
+    def __init__(self, upload_dir=None, workers=None, backend=None):
+        self.upload_dir = upload_dir or config.UPLOAD_FOLDER
+        self.workers = workers or config.OCR_WORKERS
+        self.backend = backend or config.OCR_BACKEND
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def store_upload(self, stream, filename):
+        """Save an upload under its content hash; returns (path, file_hash)"""
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension not in self.EXTENSIONS:
+            raise ValueError(f'Unsupported file type {extension or "(none)"}; expected one of {sorted(self.EXTENSIONS)}')
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+            file_hash = digest.hexdigest()
+            path = self.path_for(file_hash, extension)
+            # Identical uploads collapse onto one file
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path, file_hash
+
+    def path_for(self, file_hash, extension):
+        return os.path.join(self.upload_dir, f'{file_hash}{extension}')
+
+    def resolve_upload(self, name):
+        """Path and hash of a stored upload named <sha256><ext>; the file's content must still match the name"""
+        match = re.fullmatch(r'([0-9a-f]{64})(\.[a-z]+)', name or '')
+        if not match or match.group(2) not in self.EXTENSIONS:
+            raise ValueError('Not a stored upload')
+        path = self.path_for(*match.groups())
+        if not os.path.isfile(path):
+            raise ValueError('Upload not found')
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != match.group(1):
+            raise ValueError('Upload content does not match its hash')
+        return path, match.group(1)
+
+    def cached(self, file_hash):
+        with db_connection() as conn:
+            row = conn.execute('SELECT result FROM document_extractions WHERE file_hash = ?', (file_hash,)).fetchone()
+        return json.loads(row['result']) if row else None
+
+    def _store(self, file_hash, extraction):
+        with db_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO document_extractions (file_hash, backend, result, created_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (file_hash, extraction['backend'], json.dumps(extraction)))
+            conn.commit()
+
+    def extract(self, path, file_hash, job=None):
+        """Fields for a stored upload, from the cache or by OCR in the worker pool"""
+        extraction = self.cached(file_hash)
+        if extraction is not None:
+            return dict(extraction, cached=True)
+
+        if job:
+            job.progress(0.1, 'Running OCR')
+        # The calling thread only waits; decode and OCR run in another process
+        extraction = self._get_executor().submit(process_document, path, self.backend).result(
+            timeout=config.OCR_TIMEOUT)
+        self._store(file_hash, extraction)
+        return dict(extraction, cached=False)
+
+    def analyze(self, path, file_hash, document_type, declared_number=None, job=None):
+        """Extract fields and score them against the claimed document type and number"""
+        extraction = self.extract(path, file_hash, job)
+        return dict(extraction, file_hash=file_hash, document_type=document_type, declared_number=declared_number,
+                    score=score_extraction(extraction['fields'], document_type, declared_number))
+
+document_pipeline = DocumentPipeline()
+atexit.register(document_pipeline.shutdown)
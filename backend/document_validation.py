@@ -0,0 +1,77 @@
+# backend/document_validation.py
+import re
+
+# Kept free of database/app imports so process-pool workers can import it cheaply
+
+# Verhoeff checksum tables (dihedral group D5), used by Aadhaar's last digit
+VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8],
+    [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2],
+    [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+]
+VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0],
+    [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5],
+    [7, 0, 4, 6, 9, 1, 3, 2, 5, 8]
+]
+
+# Patterns for finding document numbers in free text (e.g. OCR output)
+DOCUMENT_PATTERNS = {
+    'aadhaar': re.compile(r'\b\d{4}\s\d{4}\s\d{4}\b'),
+    'pan': re.compile(r'[A-Z]{5}\d{4}[A-Z]{1}'),
+    'passport': re.compile(r'[A-Z]{1}\d{7}')
+}
+
+# Full-match rules applied to a normalized number
+DOCUMENT_RULES = {
+    # 12 digits, never starting with 0 or 1
+    'aadhaar': re.compile(r'[2-9]\d{11}'),
+    # 4th character is the holder type (P person, C company, H HUF, F firm, ...)
+    'pan': re.compile(r'[A-Z]{3}[ABCFGHJLPT][A-Z]\d{4}[A-Z]'),
+    # Indian passports: letter (not Q, X or Z), 7 digits, neither the first nor the last is 0
+    'passport': re.compile(r'[A-PR-WY][1-9]\d{5}[1-9]')
+}
+
+_SEPARATORS = re.compile(r'[\s\-]')
+
+def verhoeff_valid(number):
+    """True if the digit string's trailing Verhoeff check digit is correct"""
+    check = 0
+    for position, digit in enumerate(reversed(number)):
+        check = VERHOEFF_D[check][VERHOEFF_P[position % 8][ord(digit) - 48]]
+    return check == 0
+
+def normalize_number(document_type, number):
+    """Canonical form of a document number: separators removed, letters upper-cased"""
+    return _SEPARATORS.sub('', str(number or '')).upper()
+
+def validate_document(document_type, number):
+    """Validate one document number; returns (normalized, errors)"""
+    rule = DOCUMENT_RULES.get(document_type)
+    if rule is None:
+        return None, [f'Unsupported document type: {document_type}']
+
+    normalized = normalize_number(document_type, number)
+    if not normalized:
+        return None, ['Document number is missing']
+    if not rule.fullmatch(normalized):
+        return normalized, [f'Malformed {document_type} number']
+    if document_type == 'aadhaar' and not verhoeff_valid(normalized):
+        return normalized, ['Aadhaar checksum (Verhoeff) failed']
+    return normalized, []
+
+def validate_batch(items):
+    """Validate a list of (document_type, number) pairs"""
+    return [validate_document(document_type, number) for document_type, number in items]
@@ -0,0 +1,186 @@
+# backend/events.py
+import sys
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from itertools import count
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+from stats_cache import RISK_LEVELS
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('anomalies', 'stats', 'audit')
+
+class Subscriber:
+    """One connected client: a bounded buffer that drops its oldest events when the client falls behind"""
+
+    def __init__(self, channels, buffer_size=None):
+        self.channels = set(channels)
+        self.queue = queue.Queue(maxsize=buffer_size or config.EVENTS_CLIENT_BUFFER)
+        self.dropped = 0
+
+    def offer(self, event):
+        if event['event'] not in self.channels and event['event'] != 'resync':
+            return
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+class EventBroadcaster:
+    """Single producer that tails new anomalies, stat changes and audit events and fans them out to subscribers"""
+
+    def __init__(self, poll_interval=None, max_clients=None):
+        self.poll_interval = poll_interval or config.EVENTS_POLL_INTERVAL
+        self.max_clients = max_clients or config.EVENTS_MAX_CLIENTS
+        self.subscribers = set()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._cursors = None
+        self._stats = None
+
+    def subscribe(self, channels=CHANNELS):
+        with self._lock:
+            if len(self.subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(channels)
+            self.subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-broadcaster', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event_type, data):
+        event = {'id': next(self._ids), 'event': event_type, 'data': data}
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.offer(event)
+
+    def _run(self):
+        # Start from the current high-water marks so clients only get what happens after they connect
+        try:
+            self._cursors = self._high_water_marks()
+            self._stats = self._risk_counts()
+        except Exception as e:
+            logger.error(f"Event broadcaster failed to start: {e}")
+            return
+
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self.subscribers:
+                    # Idle producers exit; the next subscribe() starts a fresh one
+                    self._thread = None
+                    return
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f"Error polling for events: {e}")
+
+    def _high_water_marks(self):
+        with db_connection() as conn:
+            return {
+                'anomalies': conn.execute('SELECT COALESCE(MAX(id), 0) FROM anomalies').fetchone()[0],
+                'audit': conn.execute('SELECT COALESCE(MAX(id), 0) FROM audit_trail').fetchone()[0]
+            }
+
+    def _risk_counts(self):
+        with db_connection() as conn:
+            rows = conn.execute('SELECT risk_level, count FROM anomaly_stats_risk').fetchall()
+        counts = {level: 0 for level in RISK_LEVELS}
+        counts.update({row['risk_level']: row['count'] for row in rows})
+        return counts
+
+    def _poll(self):
+        """One round of queries per interval, however many clients are connected"""
+        limit = config.EVENTS_MAX_BATCH
+        with db_connection() as conn:
+            anomalies = conn.execute('''
+                SELECT id, ticker, anomaly_score, risk_level, timestamp FROM anomalies
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (self._cursors['anomalies'], limit)).fetchall()
+            audit = conn.execute('''
+                SELECT a.id, a.user_id, a.action_type, a.details, a.timestamp, u.username
+                FROM audit_trail a LEFT JOIN users u ON a.user_id = u.id
+                WHERE a.id > ? ORDER BY a.id LIMIT ?
+            ''', (self._cursors['audit'], limit)).fetchall()
+
+        if anomalies:
+            self._cursors['anomalies'] = anomalies[-1]['id']
+            self.publish('anomalies', [dict(row) for row in anomalies])
+            if len(anomalies) == limit:
+                # Too many to stream one by one; clients should refetch instead
+                self._cursors['anomalies'] = self._high_water_marks()['anomalies']
+                self.publish('resync', {'channel': 'anomalies'})
+        if audit:
+            self._cursors['audit'] = audit[-1]['id']
+            self.publish('audit', [dict(row) for row in audit])
+
+        counts = self._risk_counts()
+        if counts != self._stats:
+            delta = {level: counts[level] - self._stats.get(level, 0) for level in counts}
+            self._stats = counts
+            self.publish('stats', {'total': sum(counts.values()), 'by_risk_level': counts, 'delta': delta})
+
+    def stream(self, subscriber):
+        """SSE text for one subscriber, with keepalive comments so dead connections get noticed"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscriber.queue.get(timeout=config.EVENTS_HEARTBEAT)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if subscriber.dropped:
+                    # Events were lost while this client lagged; tell it to refetch
+                    subscriber.dropped = 0
+                    yield f"event: resync\ndata: {json.dumps({'channel': 'all'})}\n\n"
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+class StreamSlots:
+    """Per-process cap on open SSE responses, so long-lived streams can't occupy every request thread"""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def max_streams(self):
+        return self.limit or config.EVENTS_MAX_STREAMS or max(1, config.SERVE_THREADS // 2)
+
+    def acquire(self):
+        with self._lock:
+            if self.open >= self.max_streams():
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+event_broadcaster = EventBroadcaster()
+stream_slots = StreamSlots()
@@ -0,0 +1,122 @@
+# backend/features.py
+import sys
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class FeatureEngine:
+    """Per-ticker rolling-window features computed with vectorized groupby/rolling operations"""
+    FEATURES = ['return_1', 'rolling_return', 'volatility', 'volume_zscore', 'vwap_deviation']
+
+    def __init__(self, window=None):
+        self.window = window or config.FEATURE_WINDOW
+        # Last `window` raw rows per ticker, enough history to extend every rolling window
+        self.tails = {}
+
+    def _time_column(self, data):
+        for column in ('timestamp', 'date'):
+            if column in data.columns:
+                return column
+        return None
+
+    def compute(self, data):
+        """Return a copy of data with feature columns added, in the original row order"""
+        n = len(data)
+        result = data.copy()
+        if n == 0:
+            for feature in self.FEATURES:
+                result[feature] = pd.Series(dtype=float)
+            return result
+
+        time_column = self._time_column(data)
+        sort_by = ['ticker', time_column] if time_column else ['ticker']
+        frame = pd.DataFrame({
+            'ticker': data['ticker'].values,
+            'price': data['price'].values.astype(float),
+            'volume': data['volume'].values.astype(float),
+            '_pos': np.arange(n)
+        })
+        if time_column:
+            frame[time_column] = data[time_column].values
+        # Stable sort keeps arrival order for ties, so each ticker's history is contiguous
+        frame = frame.sort_values(sort_by, kind='stable').reset_index(drop=True)
+
+        features = self._features(frame)
+        for feature in self.FEATURES:
+            values = np.empty(n)
+            values[frame['_pos'].values] = features[feature]
+            result[feature] = values
+        return result
+
+    def _features(self, frame):
+        """Feature arrays for a frame already sorted by ticker then time"""
+        w = self.window
+        grouped = frame.groupby('ticker', sort=False)
+        price = frame['price']
+        volume = frame['volume']
+
+        def rolling(series, stat):
+            # groupby().rolling() runs per ticker in compiled code; drop the ticker index level to realign
+            rolled = series.groupby(frame['ticker'], sort=False).rolling(w, min_periods=1)
+            return getattr(rolled, stat)().reset_index(level=0, drop=True).sort_index()
+
+        prev_price = grouped['price'].shift(1)
+        return_1 = (price / prev_price - 1).fillna(0.0)
+        log_return = np.log(price / prev_price).fillna(0.0)
+
+        volume_mean = rolling(volume, 'mean')
+        volume_std = rolling(volume, 'std')
+        vwap = rolling(price * volume, 'sum') / rolling(volume, 'sum')
+
+        return {
+            'return_1': return_1.values,
+            'rolling_return': rolling(log_return, 'sum').values,
+            'volatility': rolling(return_1, 'std').fillna(0.0).values,
+            'volume_zscore': ((volume - volume_mean) / volume_std.replace(0, np.nan)).fillna(0.0).values,
+            'vwap_deviation': (price / vwap - 1).fillna(0.0).values
+        }
+
+    def update(self, new_rows):
+        """Features for newly arrived rows only, continuing each ticker's cached window"""
+        if len(new_rows) == 0:
+            return self.compute(new_rows)
+
+        new_rows = new_rows.reset_index(drop=True)
+        tickers = new_rows['ticker'].unique()
+        tails = [self.tails[t] for t in tickers if t in self.tails]
+        history = pd.concat(tails, ignore_index=True) if tails else new_rows.iloc[:0]
+
+        # Prepend cached history, compute in one vectorized pass, keep only the new rows
+        combined = pd.concat([history.assign(_new=False), new_rows.assign(_new=True)], ignore_index=True)
+        computed = self.compute(combined)
+        result = computed[computed['_new'].values].drop(columns='_new').reset_index(drop=True)
+
+        raw_columns = [c for c in new_rows.columns if c in combined.columns]
+        time_column = self._time_column(combined)
+        sort_by = ['ticker', time_column] if time_column else ['ticker']
+        latest = combined[raw_columns].sort_values(sort_by, kind='stable').groupby('ticker', sort=False).tail(self.window)
+        for ticker, tail in latest.groupby('ticker', sort=False):
+            self.tails[ticker] = tail.reset_index(drop=True)
+
+        return result
+
+    def forget(self, ticker):
+        """Drop cached history for a ticker"""
+        self.tails.pop(ticker, None)
+
+    def ensure(self, data, columns):
+        """Return data with every requested column present, computing features only if some are missing"""
+        if all(column in data.columns for column in columns):
+            return data
+        return self.compute(data)
+
+feature_engine = FeatureEngine()
@@ -0,0 +1,139 @@
+# backend/identity_index.py
+import sys
+import os
+import hmac
+import math
+import time
+import hashlib
+import logging
+import threading
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over keyed digests; bit positions are sliced from the digest itself"""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, min(8, round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        # A 32-byte HMAC gives up to eight independent 4-byte slices
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:i * 4 + 4], 'big') % self.size
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+class IdentityIndex:
+    """Duplicate-identity checks over keyed hashes of normalized document numbers"""
+
+    def __init__(self, capacity=None, error_rate=None):
+        self.capacity = capacity or config.IDENTITY_BLOOM_CAPACITY
+        self.error_rate = error_rate or config.IDENTITY_BLOOM_ERROR_RATE
+        self.bloom = None
+        self._last_id = 0
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def digest(self, document_type, normalized):
+        """HMAC rather than a bare hash: a 12-digit Aadhaar space is small enough to brute-force"""
+        message = f'{document_type}:{normalized}'.encode('utf-8')
+        return hmac.new(config.IDENTITY_HASH_KEY.encode('utf-8'), message, hashlib.sha256).digest()
+
+    def document_hash(self, document_type, normalized):
+        return self.digest(document_type, normalized).hex()
+
+    def warm(self, force=False):
+        """Load every stored document hash into a fresh Bloom filter (once, unless forced)"""
+        started = time.perf_counter()
+        with self._lock:
+            if self.bloom is not None and not force:
+                return 0
+            self.bloom = BloomFilter(self.capacity, self.error_rate)
+            self._last_id = 0
+            count = self._load_new()
+        logger.info(f"Identity index warmed with {count} documents in {time.perf_counter() - started:.2f}s")
+        return count
+
+    def _load_new(self):
+        """Add hashes written since the last load (including by other worker processes)"""
+        with db_connection() as conn:
+            cursor = conn.execute('''
+                SELECT id, document_hash FROM ekyc_verifications
+                WHERE id > ? AND document_hash IS NOT NULL ORDER BY id
+            ''', (self._last_id,))
+            count = 0
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for row in rows:
+                    self.bloom.add(bytes.fromhex(row['document_hash']))
+                self._last_id = rows[-1]['id']
+                count += len(rows)
+        self._refreshed = time.monotonic()
+        return count
+
+    def _ensure_current(self):
+        if self.bloom is None:
+            self.warm()
+        elif time.monotonic() - self._refreshed >= config.IDENTITY_REFRESH_INTERVAL:
+            with self._lock:
+                self._load_new()
+
+    def add(self, document_hash):
+        self._ensure_current()
+        with self._lock:
+            self.bloom.add(bytes.fromhex(document_hash))
+
+    def shared_with(self, document_hash, user_id, conn=None):
+        """Other user ids already verified with this document; the Bloom filter answers most misses in memory"""
+        self._ensure_current()
+        if bytes.fromhex(document_hash) not in self.bloom:
+            return []
+
+        def query(conn):
+            rows = conn.execute('''
+                SELECT DISTINCT user_id FROM ekyc_verifications
+                WHERE document_hash = ? AND user_id IS NOT ?
+            ''', (document_hash, user_id)).fetchall()
+            return [row['user_id'] for row in rows]
+
+        if conn is not None:
+            return query(conn)
+        with db_connection() as conn:
+            return query(conn)
+
+    def shared_identities(self, document_type=None, limit=1000):
+        """Every document number verified by more than one user, from one pass over the covering index"""
+        with db_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT document_hash, document_type, COUNT(DISTINCT user_id) AS user_count,
+                       GROUP_CONCAT(DISTINCT user_id) AS user_ids
+                FROM ekyc_verifications INDEXED BY idx_ekyc_document_hash
+                WHERE document_hash IS NOT NULL {'AND document_type = ?' if document_type else ''}
+                GROUP BY document_hash
+                HAVING COUNT(DISTINCT user_id) > 1
+                ORDER BY user_count DESC
+                LIMIT ?
+            ''', ((document_type, limit) if document_type else (limit,))).fetchall()
+        return [{
+            'document_hash': row['document_hash'],
+            'document_type': row['document_type'],
+            'user_count': row['user_count'],
+            'user_ids': [int(user_id) for user_id in row['user_ids'].split(',')]
+        } for row in rows]
+
+identity_index = IdentityIndex()
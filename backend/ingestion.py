@@ -0,0 +1,216 @@
+# backend/ingestion.py
+import sys
+import os
+import glob
+import time
+import shutil
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class TradeStore:
+    """Columnar trade store partitioned as <root>/date=YYYY-MM-DD/ticker=SYM/part-<id>/<column>.npy"""
+    COLUMNS = {
+        'timestamp': np.int64,  # nanoseconds since epoch, UTC
+        'price': np.float64,
+        'volume': np.int64
+    }
+
+    def __init__(self, root=None):
+        self.root = root or config.TRADE_STORE_DIR
+
+    def _partition_dir(self, date, ticker):
+        return os.path.join(self.root, f'date={date}', f'ticker={ticker}')
+
+    def write_part(self, date, ticker, columns, part_id):
+        """Write one part; it only becomes visible to readers once complete"""
+        partition = self._partition_dir(date, ticker)
+        os.makedirs(partition, exist_ok=True)
+        tmp_dir = os.path.join(partition, f'.part-{part_id}.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, dtype in self.COLUMNS.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(columns[name], dtype=dtype))
+        os.replace(tmp_dir, os.path.join(partition, f'part-{part_id}'))
+
+    def partitions(self, tickers=None, start_date=None, end_date=None):
+        """(date, ticker, path) for partitions matching the filters, decided from directory names alone"""
+        tickers = set(tickers) if tickers else None
+        result = []
+        for date_dir in sorted(glob.glob(os.path.join(self.root, 'date=*'))):
+            date = os.path.basename(date_dir)[len('date='):]
+            if (start_date and date < start_date) or (end_date and date > end_date):
+                continue
+            for ticker_dir in sorted(glob.glob(os.path.join(date_dir, 'ticker=*'))):
+                ticker = os.path.basename(ticker_dir)[len('ticker='):]
+                if tickers is None or ticker in tickers:
+                    result.append((date, ticker, ticker_dir))
+        return result
+
+    def _parts(self, partition_path):
+        return sorted(glob.glob(os.path.join(partition_path, 'part-*')))
+
+    def read_partition(self, partition_path, mmap_mode=None):
+        """Concatenated column arrays for one partition"""
+        parts = self._parts(partition_path)
+        columns = {}
+        for name in self.COLUMNS:
+            arrays = [np.load(os.path.join(part, f'{name}.npy'), mmap_mode=mmap_mode) for part in parts]
+            columns[name] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays) if arrays else np.empty(0, self.COLUMNS[name])
+        return columns
+
+    def read(self, tickers=None, start_date=None, end_date=None):
+        """Load matching partitions into a DataFrame (ticker, timestamp, date, price, volume)"""
+        frames = []
+        for date, ticker, path in self.partitions(tickers, start_date, end_date):
+            columns = self.read_partition(path)
+            n = len(columns['price'])
+            frames.append(pd.DataFrame({
+                'ticker': np.full(n, ticker, dtype=object),
+                'timestamp': pd.to_datetime(columns['timestamp'], unit='ns'),
+                'date': date,
+                'price': columns['price'],
+                'volume': columns['volume']
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['ticker', 'timestamp', 'date', 'price', 'volume'])
+        return pd.concat(frames, ignore_index=True)
+
+    def latest_date(self, tickers=None):
+        """Newest partition date (YYYY-MM-DD) holding any of the tickers, or None"""
+        partitions = self.partitions(tickers)
+        return partitions[-1][0] if partitions else None
+
+    def has_data(self, tickers=None):
+        return bool(self.partitions(tickers))
+
+    def compact(self):
+        """Merge each partition's parts into a single part, sorted by timestamp"""
+        compacted = 0
+        for date, ticker, path in self.partitions():
+            parts = self._parts(path)
+            if len(parts) < 2:
+                continue
+            columns = self.read_partition(path)
+            order = np.argsort(columns['timestamp'], kind='stable')
+            self.write_part(date, ticker, {name: values[order] for name, values in columns.items()},
+                            f'{time.time_ns()}-compacted')
+            for part in parts:
+                shutil.rmtree(part, ignore_errors=True)
+            compacted += 1
+        return compacted
+
+class TradeIngestor:
+    """Streams CSV/Parquet trade files in chunks, validates them and writes them to a TradeStore"""
+    REQUIRED = ['timestamp', 'ticker', 'price', 'volume']
+
+    def __init__(self, store=None, chunk_rows=None, column_map=None, tick_store=None):
+        self.store = store or trade_store
+        self.chunk_rows = chunk_rows or config.INGEST_CHUNK_ROWS
+        # Source column name -> canonical name, e.g. {'symbol': 'ticker', 'qty': 'volume'}
+        self.column_map = column_map or {}
+        # Optional TickStore that also receives every clean row, for memory-mapped detection
+        self.tick_store = tick_store
+
+    def iter_chunks(self, path):
+        """Yield DataFrames of at most chunk_rows rows without loading the whole file"""
+        source_columns = [src for src, dst in self.column_map.items()] + \
+            [c for c in self.REQUIRED if c not in self.column_map.values()]
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError('Parquet ingestion requires pyarrow (pip install pyarrow)')
+            parquet = pq.ParquetFile(path)
+            for batch in parquet.iter_batches(batch_size=self.chunk_rows, columns=source_columns):
+                yield batch.to_pandas().rename(columns=self.column_map)
+        else:
+            for chunk in pd.read_csv(path, chunksize=self.chunk_rows, usecols=source_columns,
+                                     dtype={src: str for src in source_columns}):
+                yield chunk.rename(columns=self.column_map)
+
+    def validate(self, chunk):
+        """Convert to typed columns and drop invalid rows; returns (clean frame, rejected count)"""
+        ticker = chunk['ticker'].astype(str).str.strip().str.upper()
+        price = pd.to_numeric(chunk['price'], errors='coerce')
+        volume = pd.to_numeric(chunk['volume'], errors='coerce')
+        timestamp = pd.to_datetime(chunk['timestamp'], errors='coerce', utc=True)
+
+        valid = (
+            ticker.str.len().gt(0) & ticker.ne('NAN')
+            & np.isfinite(price) & price.gt(0)
+            & np.isfinite(volume) & volume.ge(0)
+            & timestamp.notna()
+        )
+        timestamp = timestamp[valid].dt.tz_convert(None)
+        clean = pd.DataFrame({
+            'ticker': ticker[valid].values,
+            'timestamp': timestamp.values.astype('datetime64[ns]').astype(np.int64),
+            'date': timestamp.dt.strftime('%Y-%m-%d').values,
+            'price': price[valid].values.astype(np.float64),
+            'volume': volume[valid].values.astype(np.int64)
+        })
+        return clean, int((~valid).sum())
+
+    def ingest(self, path):
+        """Ingest a file chunk by chunk; returns row counts and throughput"""
+        started = time.perf_counter()
+        stats = {'rows': 0, 'rejected': 0, 'chunks': 0, 'partitions': set()}
+        for chunk_number, chunk in enumerate(self.iter_chunks(path)):
+            clean, rejected = self.validate(chunk)
+            stats['rejected'] += rejected
+            stats['chunks'] += 1
+            if clean.empty:
+                continue
+
+            clean = clean.sort_values(['date', 'ticker', 'timestamp'], kind='stable')
+            part_id = f'{time.time_ns()}-{os.getpid()}-{chunk_number:06d}'
+            for (date, ticker), rows in clean.groupby(['date', 'ticker'], sort=False):
+                self.store.write_part(date, ticker, {
+                    'timestamp': rows['timestamp'].values,
+                    'price': rows['price'].values,
+                    'volume': rows['volume'].values
+                }, part_id)
+                stats['partitions'].add((date, ticker))
+            if self.tick_store is not None:
+                for ticker, rows in clean.groupby('ticker', sort=False):
+                    self.tick_store.append(ticker, rows['timestamp'].values, rows['price'].values, rows['volume'].values)
+            stats['rows'] += len(clean)
+
+        seconds = time.perf_counter() - started
+        stats['partitions'] = len(stats['partitions'])
+        stats['seconds'] = round(seconds, 3)
+        stats['rows_per_second'] = round(stats['rows'] / seconds) if seconds > 0 else 0
+        logger.info(f"Ingested {stats['rows']} rows from {path} ({stats['rows_per_second']} rows/s, "
+                    f"{stats['rejected']} rejected)")
+        return stats
+
+trade_store = TradeStore()
+trade_ingestor = TradeIngestor(trade_store)
+
+if __name__ == '__main__':
+    # python ingestion.py trades.csv [more.parquet ...] [--chunk-rows N] [--compact] [--ticks]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Ingest trade files into the partitioned trade store')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    parser.add_argument('--compact', action='store_true', help='merge small parts after ingesting')
+    parser.add_argument('--ticks', action='store_true', help='also append rows to the memory-mapped tick store')
+    args = parser.parse_args()
+
+    tick_store = None
+    if args.ticks:
+        from tick_store import tick_store
+    ingestor = TradeIngestor(trade_store, chunk_rows=args.chunk_rows, tick_store=tick_store)
+    for path in args.paths:
+        print(path, ingestor.ingest(path))
+    if args.compact:
+        print(f"Compacted {trade_store.compact()} partitions")
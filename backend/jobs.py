@@ -0,0 +1,252 @@
+# backend/jobs.py
+import sys
+import os
+import json
+import time
+import uuid
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+TERMINAL_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+class JobLimitError(Exception):
+    """Raised when a user already has JOB_MAX_PER_USER jobs in flight"""
+
+class Job:
+    """Handle given to a running handler for progress reporting and cooperative cancellation"""
+
+    def __init__(self, manager, job_id, user_id, params):
+        self.manager = manager
+        self.id = job_id
+        self.user_id = user_id
+        self.params = params
+        self._last_write = 0.0
+
+    def check_cancelled(self):
+        if self.id in self.manager._cancelled:
+            raise JobCancelled(self.id)
+
+    def progress(self, fraction, message=None):
+        """Record progress (throttled) and stop the handler if the job was cancelled meanwhile"""
+        self.check_cancelled()
+        now = time.monotonic()
+        if fraction < 1 and now - self._last_write < config.JOB_PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        with db_connection() as conn:
+            # The status guard doubles as a cancellation check for cancels made by other processes
+            updated = conn.execute(
+                "UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = 'running'",
+                (round(float(fraction), 4), message, self.id)
+            ).rowcount
+            conn.commit()
+        if not updated:
+            raise JobCancelled(self.id)
+
+class JobManager:
+    """SQLite-backed job queue executed by a bounded thread pool"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or config.JOB_WORKERS
+        self.handlers = {}
+        self._cancelled = set()
+        self._executor = None
+        self._pid = None
+        self._recovered = False
+        self._lock = threading.Lock()
+
+    def register(self, kind, handler):
+        """handler(params, job) -> JSON-serializable result"""
+        self.handlers[kind] = handler
+
+    def _get_executor(self):
+        # A forked worker inherits the parent's executor object but none of its threads
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+                self._pid = os.getpid()
+            return self._executor
+
+    def dedup_key(self, kind, params, user_id=None):
+        # Scoped to the submitter: another user's identical request must never be handed their job
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f'{kind}:{user_id}:{canonical}'.encode('utf-8')).hexdigest()
+
+    def submit(self, kind, params, user_id=None):
+        """Queue a job; returns (job, created), where the user's identical in-flight job is returned instead of a new one"""
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        if not self._recovered:
+            self.recover()
+
+        key = self.dedup_key(kind, params, user_id)
+        job_id = uuid.uuid4().hex
+        with db_connection() as conn:
+            existing = self._find_active(conn, key)
+            if existing:
+                return existing, False
+
+            in_flight = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN ('queued', 'running')",
+                (user_id,)
+            ).fetchone()[0]
+            if in_flight >= config.JOB_MAX_PER_USER:
+                raise JobLimitError(f'At most {config.JOB_MAX_PER_USER} jobs may be in flight per user')
+
+            try:
+                conn.execute('''
+                    INSERT INTO jobs (id, kind, params, dedup_key, status, user_id, pid)
+                    VALUES (?, ?, ?, ?, 'queued', ?, ?)
+                ''', (job_id, kind, json.dumps(params, default=str), key, user_id, os.getpid()))
+                conn.commit()
+            except sqlite3.IntegrityError:
+                # Lost a race with another process submitting the same job
+                conn.rollback()
+                return self._find_active(conn, key), False
+
+        self._get_executor().submit(self._run, job_id)
+        return self.get(job_id), True
+
+    def _find_active(self, conn, key):
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')", (key,)
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def _run(self, job_id):
+        with db_connection() as conn:
+            started = conn.execute('''
+                UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'queued'
+            ''', (job_id,)).rowcount
+            conn.commit()
+            row = conn.execute('SELECT kind, params, user_id FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if not started:
+            # Cancelled before a worker picked it up
+            self._cancelled.discard(job_id)
+            return
+
+        job = Job(self, job_id, row['user_id'], json.loads(row['params']))
+        try:
+            result = self.handlers[row['kind']](job.params, job)
+            self._finish(job_id, 'succeeded', result=json.dumps(result, default=str))
+        except JobCancelled:
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Job {job_id} ({row['kind']}) failed: {e}")
+            self._finish(job_id, 'failed', error=str(e))
+        finally:
+            self._cancelled.discard(job_id)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with db_connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                    progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END
+                WHERE id = ? AND status = 'running'
+            ''', (status, result, error, status, job_id))
+            conn.commit()
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; running handlers stop at their next progress() call"""
+        with db_connection() as conn:
+            cancelled = conn.execute('''
+                UPDATE jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ('queued', 'running')
+            ''', (job_id,)).rowcount
+            conn.commit()
+        if cancelled:
+            self._cancelled.add(job_id)
+        return bool(cancelled)
+
+    def _to_dict(self, row, include_result=False):
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job.pop('dedup_key', None)
+        job.pop('pid', None)
+        result = job.pop('result', None)
+        if include_result:
+            job['result'] = json.loads(result) if result else None
+        return job
+
+    def get(self, job_id, include_result=False):
+        with db_connection() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row, include_result) if row else None
+
+    def list_jobs(self, user_id=None, limit=50):
+        """Most recent jobs, optionally for one user, without their results"""
+        with db_connection() as conn:
+            if user_id is None:
+                rows = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+            else:
+                rows = conn.execute('SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?',
+                                    (user_id, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def watch(self, job_id, interval=0.5, timeout=3600):
+        """Yield the job each time its status, progress or message changes, until it finishes"""
+        last = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.get(job_id, include_result=False)
+            if job is None:
+                return
+            state = (job['status'], job['progress'], job['message'])
+            if state != last:
+                last = state
+                yield job
+            if job['status'] in TERMINAL_STATUSES:
+                return
+            time.sleep(interval)
+
+    def recover(self):
+        """Fail in-flight jobs whose owning process has died, and drop old finished jobs"""
+        self._recovered = True
+        with db_connection() as conn:
+            rows = conn.execute("SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            orphaned = [row['id'] for row in rows if not self._pid_alive(row['pid'])]
+            conn.executemany('''
+                UPDATE jobs SET status = 'failed', error = 'Interrupted: worker process exited',
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ('queued', 'running')
+            ''', [(job_id,) for job_id in orphaned])
+            conn.execute(f"DELETE FROM jobs WHERE status IN {TERMINAL_STATUSES} AND finished_at < datetime('now', ?)",
+                         (f'-{config.JOB_RETENTION_DAYS} days',))
+            conn.commit()
+        if orphaned:
+            logger.warning(f"Marked {len(orphaned)} orphaned jobs as failed")
+
+    def _pid_alive(self, pid):
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+job_manager = JobManager()
+atexit.register(job_manager.shutdown)
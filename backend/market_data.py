@@ -0,0 +1,209 @@
+# backend/market_data.py
+import sys
+import os
+import time
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_KINDS = ('spike', 'volume_burst', 'pump_and_dump')
+
+class MarketDataGenerator:
+    """Synthetic trades built in whole-array passes: per-ticker random walks, volatility regimes and labeled anomalies"""
+    # Multipliers on each ticker's base volatility; volatile stretches also trade more volume
+    REGIMES = {'calm': 0.5, 'normal': 1.0, 'volatile': 3.0}
+    PUMP_ROWS = 8
+    DUMP_ROWS = 3
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def tickers(self, tickers):
+        """A list of symbols as given, or that many generated ones (T0000, T0001, ...)"""
+        if isinstance(tickers, int):
+            return [f'T{i:04d}' for i in range(tickers)]
+        return list(tickers)
+
+    def _state(self, n_tickers, volatility):
+        """Per-ticker constants, drawn once so streamed chunks continue the same series"""
+        return {
+            'log_price': np.log(self.rng.uniform(20, 500, n_tickers)),
+            'volatility': volatility * self.rng.uniform(0.5, 1.5, n_tickers),
+            'volume': self.rng.uniform(1_000_000, 5_000_000, n_tickers),
+            'regime': self.rng.integers(len(self.REGIMES), size=n_tickers)
+        }
+
+    def _regimes(self, n_tickers, periods, regime_length, state):
+        """Regime index per (ticker, period): switch with probability 1/regime_length at each step"""
+        switches = self.rng.random((n_tickers, periods)) < 1.0 / max(regime_length, 1)
+        blocks = np.cumsum(switches, axis=1)
+        choices = self.rng.integers(len(self.REGIMES), size=(n_tickers, periods + 1))
+        # Block 0 continues the regime the previous chunk ended in
+        choices[:, 0] = state['regime']
+        regime = np.take_along_axis(choices, blocks, axis=1)
+        state['regime'] = regime[:, -1]
+        return regime
+
+    def _inject(self, price, volume, rate, kinds):
+        """Apply anomaly shapes in place at random (ticker, period) positions; returns the per-row kind labels"""
+        n_tickers, periods = price.shape
+        labels = np.zeros(price.shape, dtype=np.int8)
+        count = self.rng.binomial(n_tickers * periods, rate) if rate > 0 else 0
+        if count == 0:
+            return labels
+        rows = self.rng.integers(n_tickers, size=count)
+        starts = self.rng.integers(periods, size=count)
+        kind = self.rng.choice([ANOMALY_KINDS.index(k) for k in kinds], size=count)
+        sign = self.rng.choice([-1.0, 1.0], size=count)
+
+        def window(mask, length):
+            # (events, length) column indices clipped to the chunk, plus which of them are in range
+            cols = starts[mask, None] + np.arange(length)
+            valid = cols < periods
+            return rows[mask, None].repeat(length, axis=1)[valid], np.minimum(cols, periods - 1)[valid], valid
+
+        spike = kind == 0
+        r, c, _ = window(spike, 1)
+        price[r, c] *= 1 + sign[spike] * self.rng.uniform(0.08, 0.25, spike.sum())
+        labels[r, c] = 1
+
+        burst = kind == 1
+        r, c, valid = window(burst, 3)
+        factor = self.rng.uniform(5, 15, burst.sum())[:, None].repeat(3, axis=1)[valid]
+        volume[r, c] *= factor
+        labels[r, c] = 2
+
+        pump = kind == 2
+        length = self.PUMP_ROWS + self.DUMP_ROWS
+        # Gradual climb on rising volume, then a collapse back below the starting price
+        shape = np.r_[np.linspace(0, 1, self.PUMP_ROWS + 1)[1:], np.linspace(0.5, -0.1, self.DUMP_ROWS)]
+        height = self.rng.uniform(0.15, 0.4, pump.sum())
+        r, c, valid = window(pump, length)
+        price[r, c] *= (1 + height[:, None] * shape)[valid]
+        volume[r, c] *= (1 + 4 * np.abs(shape))[None, :].repeat(pump.sum(), axis=0)[valid]
+        labels[r, c] = 3
+        return labels
+
+    def _block(self, tickers, timestamps, step_days, volatility, regime_length, anomaly_rate, kinds, state):
+        """One chunk of consecutive periods for every ticker, continuing from state"""
+        n_tickers, periods = len(tickers), len(timestamps)
+        multipliers = np.array(list(self.REGIMES.values()))
+        regime = multipliers[self._regimes(n_tickers, periods, regime_length, state)]
+
+        sigma = state['volatility'][:, None] * np.sqrt(step_days) * regime
+        steps = self.rng.standard_normal((n_tickers, periods)) * sigma - 0.5 * sigma ** 2
+        log_price = state['log_price'][:, None] + np.cumsum(steps, axis=1)
+        state['log_price'] = log_price[:, -1]
+        price = np.exp(log_price)
+
+        volume = state['volume'][:, None] * step_days * np.sqrt(regime) * \
+            self.rng.lognormal(0.0, 0.3, (n_tickers, periods))
+        labels = self._inject(price, volume, anomaly_rate, kinds)
+
+        kind_names = np.array([''] + list(ANOMALY_KINDS), dtype=object)
+        return pd.DataFrame({
+            'ticker': np.repeat(np.array(tickers, dtype=object), periods),
+            'timestamp': np.tile(timestamps, n_tickers),
+            # Long walks can decay towards zero; keep every price a valid tick
+            'price': np.maximum(price.ravel().round(2), 0.01),
+            'volume': np.maximum(volume.ravel().round(), 1).astype(np.int64),
+            'is_injected': labels.ravel() > 0,
+            'anomaly_kind': kind_names[labels.ravel()]
+        })
+
+    def iter_chunks(self, tickers=5, periods=90, freq='D', start=None, end=None, volatility=0.02,
+                    regime_length=50, anomaly_rate=0.0, anomaly_kinds=ANOMALY_KINDS, chunk_rows=None):
+        """Yield frames of about chunk_rows rows covering `periods` timestamps for every ticker
+
+        volatility is daily and scaled to the frequency; anomaly_rate is the chance each row starts an
+        injected anomaly. Rows are ticker-major within a chunk; a given seed and chunk size reproduce the data.
+        """
+        tickers = self.tickers(tickers)
+        unknown = set(anomaly_kinds) - set(ANOMALY_KINDS)
+        if unknown:
+            raise ValueError(f'Unknown anomaly kinds {sorted(unknown)}; expected some of {list(ANOMALY_KINDS)}')
+        if start is None and end is None:
+            end = pd.Timestamp.now().floor('s')
+        index = pd.date_range(start=start, end=None if start is not None else end, periods=periods, freq=freq)
+        step = index[1] - index[0] if len(index) > 1 else pd.Timedelta(days=1)
+        step_days = step.total_seconds() / 86400
+
+        chunk_periods = max(1, (chunk_rows or config.MARKET_DATA_CHUNK_ROWS) // max(len(tickers), 1))
+        state = self._state(len(tickers), volatility)
+        for offset in range(0, periods, chunk_periods):
+            yield self._block(tickers, index.values[offset:offset + chunk_periods], step_days, volatility,
+                              regime_length, anomaly_rate, anomaly_kinds, state)
+
+    def generate(self, tickers=5, periods=90, freq='D', **kwargs):
+        """The whole data set as one frame (single chunk)"""
+        kwargs.setdefault('chunk_rows', len(self.tickers(tickers)) * periods)
+        return pd.concat(list(self.iter_chunks(tickers, periods, freq, **kwargs)), ignore_index=True)
+
+    def write(self, path, **kwargs):
+        """Stream chunks to a CSV or Parquet file (readable by TradeIngestor); returns row counts and timing"""
+        started = time.perf_counter()
+        stats = {'path': path, 'rows': 0, 'injected_rows': 0}
+        tmp_path = f'{path}.tmp'
+        writer = None
+        try:
+            for chunk in self.iter_chunks(**kwargs):
+                stats['rows'] += len(chunk)
+                stats['injected_rows'] += int(chunk['is_injected'].sum())
+                if path.endswith('.parquet'):
+                    writer = self._write_parquet_chunk(writer, tmp_path, chunk)
+                else:
+                    chunk.to_csv(tmp_path, mode='a' if stats['rows'] > len(chunk) else 'w',
+                                 header=stats['rows'] == len(chunk), index=False, date_format='%Y-%m-%dT%H:%M:%S')
+            if writer is not None:
+                writer.close()
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        stats['rows_per_second'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] > 0 else 0
+        return stats
+
+    def _write_parquet_chunk(self, writer, path, chunk):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow)')
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema, compression='snappy')
+        # One row group per chunk keeps memory bounded
+        writer.write_table(table)
+        return writer
+
+if __name__ == '__main__':
+    # python market_data.py trades.csv --tickers 500 --periods 20000 --freq 1s --anomaly-rate 0.0005 --seed 7
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Write synthetic trades with labeled injected anomalies')
+    parser.add_argument('path', help='output .csv or .parquet file')
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--periods', type=int, default=10000)
+    parser.add_argument('--freq', default='1min', help="pandas frequency, 'D' down to '1s'")
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--volatility', type=float, default=0.02, help='daily volatility')
+    parser.add_argument('--regime-length', type=int, default=50, help='mean periods between regime switches')
+    parser.add_argument('--anomaly-rate', type=float, default=0.001)
+    parser.add_argument('--anomaly-kinds', nargs='+', default=list(ANOMALY_KINDS), choices=ANOMALY_KINDS)
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    print(MarketDataGenerator(args.seed).write(
+        args.path, tickers=args.tickers, periods=args.periods, freq=args.freq, start=args.start,
+        volatility=args.volatility, regime_length=args.regime_length, anomaly_rate=args.anomaly_rate,
+        anomaly_kinds=args.anomaly_kinds, chunk_rows=args.chunk_rows))
@@ -0,0 +1,238 @@
+# backend/model_registry.py
+import os
+import sys
+import glob
+import logging
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from features import feature_engine
+from metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+class ModelNotReadyError(RuntimeError):
+    """No model is active yet; the caller should retry once loading or background training finishes"""
+
+class ModelRegistry:
+    """Versioned store of pre-trained anomaly models under shared_data/models"""
+    FEATURES = config.ANOMALY_FEATURES
+
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir or config.MODEL_DIR
+        # The active artifact is swapped as a single reference so readers never see a half-updated model
+        self._active = None
+        self._train_lock = threading.Lock()
+        self._training_thread = None
+        self._training_thread_lock = threading.Lock()
+        self._bootstrap_fn = None
+        self._bootstrap_lock = threading.Lock()
+
+    @property
+    def active(self):
+        """Currently active model artifact; loaded on first access after defer_bootstrap(), else None if nothing is loaded"""
+        artifact = self._active
+        if artifact is None and self._bootstrap_fn is not None:
+            artifact = self._load_deferred()
+        return artifact
+
+    def require(self):
+        """The active artifact, or ModelNotReadyError while none is loaded"""
+        artifact = self.active
+        if artifact is None:
+            if self._training_thread and self._training_thread.is_alive():
+                raise ModelNotReadyError('The anomaly model is still being trained; retry shortly')
+            raise ModelNotReadyError('No trained anomaly model is loaded')
+        return artifact
+
+    def _model_path(self, version):
+        return os.path.join(self.model_dir, f'isolation_forest_{version}.joblib')
+
+    def _pointer_path(self):
+        return os.path.join(self.model_dir, 'LATEST')
+
+    def list_versions(self):
+        """List saved model versions, oldest first"""
+        paths = glob.glob(os.path.join(self.model_dir, 'isolation_forest_*.joblib'))
+        versions = [os.path.basename(p)[len('isolation_forest_'):-len('.joblib')] for p in paths]
+        return sorted(versions)
+
+    def latest_version(self):
+        """Version named by the LATEST pointer, falling back to the newest file"""
+        try:
+            with open(self._pointer_path()) as f:
+                version = f.read().strip()
+            if version and os.path.exists(self._model_path(version)):
+                return version
+        except FileNotFoundError:
+            pass
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def train(self, data, features=None):
+        """Fit a new IsolationForest and wrap it in an (unsaved) artifact"""
+        # Imported here so processes that only serve a saved model skip it until unpickling needs it
+        from sklearn.ensemble import IsolationForest
+
+        features = list(features or self.FEATURES)
+        with stage_seconds.time(component='registry', stage='features'):
+            X = feature_engine.ensure(data, features)[features].values
+        model = IsolationForest(contamination=0.1, random_state=42)
+        with stage_seconds.time(component='registry', stage='fit'):
+            model.fit(X)
+
+        return {
+            'version': datetime.utcnow().strftime('%Y%m%d%H%M%S%f'),
+            'model': model,
+            'features': features,
+            'trained_at': datetime.utcnow().isoformat(),
+            'n_samples': len(X),
+            'warmup_sample': X[:config.MODEL_WARMUP_ROWS].copy(),
+            'reference_scores': self.reference_scores(model, X)
+        }
+
+    def reference_scores(self, model, X):
+        """Quantiles of the training decision scores, used to calibrate scores independently of the batch"""
+        with stage_seconds.time(component='registry', stage='reference_scores'):
+            return np.quantile(model.decision_function(X), np.linspace(0, 1, 1001))
+
+    def save(self, artifact):
+        """Persist an artifact and point LATEST at it, both via atomic renames"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self._model_path(artifact['version'])
+        tmp_path = f'{path}.tmp'
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+
+        pointer = self._pointer_path()
+        with open(f'{pointer}.tmp', 'w') as f:
+            f.write(artifact['version'])
+        os.replace(f'{pointer}.tmp', pointer)
+
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Drop the oldest versions beyond MODEL_KEEP_VERSIONS"""
+        versions = self.list_versions()
+        active_version = self._active['version'] if self._active else None
+        for version in versions[:-config.MODEL_KEEP_VERSIONS]:
+            if version == active_version:
+                continue
+            try:
+                os.remove(self._model_path(version))
+            except OSError as e:
+                logger.warning(f"Could not remove model {version}: {e}")
+
+    def warm_up(self, artifact):
+        """Run a throwaway prediction so the first real request pays no lazy-init cost"""
+        sample = artifact.get('warmup_sample')
+        if sample is not None and len(sample):
+            artifact['model'].decision_function(sample)
+
+    def activate(self, artifact):
+        """Warm up an artifact and hot-swap it in as the active model"""
+        self.warm_up(artifact)
+        if 'reference_scores' not in artifact:
+            # Artifacts saved before calibration existed only carry the warm-up rows
+            artifact['reference_scores'] = self.reference_scores(artifact['model'], artifact['warmup_sample'])
+        self._active = artifact
+        logger.info(f"Activated anomaly model {artifact['version']}")
+        return artifact
+
+    def load(self, version=None):
+        """Load a saved version (default: latest) and make it active"""
+        version = version or self.latest_version()
+        if not version:
+            return None
+        artifact = joblib.load(self._model_path(version))
+        return self.activate(artifact)
+
+    def train_and_register(self, data, features=None, activate=True):
+        """Train, save and (optionally) activate a new model version"""
+        with self._train_lock:
+            artifact = self.train(data, features)
+            self.save(artifact)
+        if activate:
+            self.activate(artifact)
+        return artifact
+
+    def train_in_background(self, data_fn, features=None):
+        """Train a new version on a background thread; returns False if one is already running"""
+        def run():
+            try:
+                self.train_and_register(data_fn(), features)
+            except Exception as e:
+                logger.error(f"Background model training failed: {e}")
+
+        with self._training_thread_lock:
+            if self._training_thread and self._training_thread.is_alive():
+                return False
+            self._training_thread = threading.Thread(target=run, name='model-training', daemon=True)
+            self._training_thread.start()
+        return True
+
+    def bootstrap(self, data_fn):
+        """Load the latest model at startup, training one first if none is registered"""
+        with self._bootstrap_lock:
+            # Concurrent first requests under lazy loading: only one of them loads
+            if self._active is not None:
+                return self._active
+            try:
+                if self.load():
+                    return self._active
+            except Exception as e:
+                logger.error(f"Error loading saved model, retraining: {e}")
+        # Train outside the lock so request threads get ModelNotReadyError meanwhile instead of waiting on
+        # it; the shared training thread (possibly already started by a request) publishes via activate()
+        logger.info("No saved anomaly model found, training initial version")
+        self.train_in_background(data_fn)
+        self._training_thread.join()
+        if self._active is None:
+            raise ModelNotReadyError('Initial anomaly model training failed')
+        return self._active
+
+    def defer_bootstrap(self, data_fn):
+        """Load the saved model on first use of `active` instead of at startup"""
+        self._bootstrap_fn = data_fn
+
+    def _load_deferred(self):
+        """Load an existing artifact on first use; with none saved, train one off the calling (request) thread"""
+        with self._bootstrap_lock:
+            # Concurrent first requests under lazy loading: only one of them loads
+            if self._active is not None:
+                return self._active
+            try:
+                if self.load():
+                    return self._active
+            except Exception as e:
+                logger.error(f"Error loading saved model, retraining: {e}")
+            if self.train_in_background(self._bootstrap_fn):
+                logger.info("No saved anomaly model found, training initial version in the background")
+            return None
+
+    def describe(self):
+        """JSON-friendly summary of saved versions and the active one"""
+        active = self._active
+        return {
+            'active_version': active['version'] if active else None,
+            'trained_at': active['trained_at'] if active else None,
+            'features': active['features'] if active else None,
+            'versions': self.list_versions()
+        }
+
+model_registry = ModelRegistry()
+
+if __name__ == '__main__':
+    # Offline training: python model_registry.py
+    from anomaly_detection import anomaly_detector
+    logging.basicConfig(level=logging.INFO)
+    artifact = model_registry.train_and_register(anomaly_detector.generate_sample_data())
+    print(f"Registered anomaly model {artifact['version']} in {model_registry.model_dir}")
@@ -0,0 +1,110 @@
+# backend/ocr.py
+import os
+import shutil
+import subprocess
+
+from document_validation import DOCUMENT_PATTERNS, validate_document, normalize_number
+
+# Kept free of database/app imports: process_document runs inside spawned pool workers
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp'}
+TEXT_EXTENSIONS = {'.txt'}
+
+class OCRBackend:
+    """Turns a document file into text; subclasses register themselves in OCR_BACKENDS"""
+    name = None
+    extensions = set()
+
+    def available(self):
+        return True
+
+    def extract_text(self, path):
+        raise NotImplementedError
+
+class TextBackend(OCRBackend):
+    """Documents that already carry text (e.g. pre-OCR'd .txt uploads)"""
+    name = 'text'
+    extensions = TEXT_EXTENSIONS
+
+    def extract_text(self, path):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return f.read()
+
+class TesseractBackend(OCRBackend):
+    """Local Tesseract, through pytesseract + Pillow when installed, else the tesseract binary"""
+    name = 'tesseract'
+    extensions = IMAGE_EXTENSIONS
+
+    def available(self):
+        return shutil.which('tesseract') is not None
+
+    def decode(self, path):
+        """Grayscale, contrast-stretched and upscaled if small, which helps Tesseract on phone photos"""
+        from PIL import Image, ImageOps
+        image = ImageOps.exif_transpose(Image.open(path))
+        image = ImageOps.autocontrast(image.convert('L'))
+        if image.width < 1000:
+            scale = 1000 / image.width
+            image = image.resize((1000, int(image.height * scale)), Image.LANCZOS)
+        return image
+
+    def extract_text(self, path):
+        try:
+            import pytesseract
+            return pytesseract.image_to_string(self.decode(path))
+        except ImportError:
+            result = subprocess.run(['tesseract', path, 'stdout'], capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                raise RuntimeError(f'tesseract failed: {result.stderr.strip()}')
+            return result.stdout
+
+OCR_BACKENDS = {backend.name: backend for backend in (TextBackend, TesseractBackend)}
+
+def register_backend(backend_class):
+    """Make another OCR backend selectable by name"""
+    OCR_BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+def backend_for(path, preferred=None):
+    """The preferred backend if it handles this file type and is usable, else the first one that is"""
+    extension = os.path.splitext(path)[1].lower()
+    names = [preferred] if preferred else []
+    names += [name for name in OCR_BACKENDS if name != preferred]
+    for name in names:
+        backend = OCR_BACKENDS.get(name)
+        if backend is None:
+            continue
+        backend = backend()
+        if extension in backend.extensions and backend.available():
+            return backend
+    raise RuntimeError(f'No available OCR backend for {extension or "this"} files')
+
+def extract_fields(text):
+    """Candidate document numbers per type, keeping only those that pass the validation rules"""
+    fields = {}
+    upper = text.upper()
+    for document_type, pattern in DOCUMENT_PATTERNS.items():
+        for match in pattern.finditer(upper):
+            normalized, errors = validate_document(document_type, match.group(0))
+            if not errors and normalized not in fields.get(document_type, []):
+                fields.setdefault(document_type, []).append(normalized)
+    return fields
+
+def score_extraction(fields, document_type, declared_number=None):
+    """0.5 for a valid number of the expected type, 1.0 if it also matches the declared number"""
+    found = fields.get(document_type, [])
+    if not found:
+        return 0.0
+    if declared_number and normalize_number(document_type, declared_number) in found:
+        return 1.0
+    return 0.5 if declared_number else 0.75
+
+def process_document(path, backend_name=None):
+    """Pool worker: OCR one file and extract document fields (scoring against a claim happens per request)"""
+    backend = backend_for(path, backend_name)
+    text = backend.extract_text(path)
+    return {
+        'backend': backend.name,
+        'characters': len(text),
+        'fields': extract_fields(text)
+    }
@@ -0,0 +1,120 @@
+# backend/parallel_detection.py
+import sys
+import os
+import atexit
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import joblib
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from features import feature_engine
+from anomaly_detection import anomaly_detector
+
+logger = logging.getLogger(__name__)
+
+# Per-worker model cache, so each process deserializes a model version only once
+_worker_models = {}
+
+def _score_shard(matrix_path, start, stop, model_path, version):
+    """Worker: score rows [start, stop) of the memory-mapped feature matrix"""
+    model = _worker_models.get(version)
+    if model is None:
+        _worker_models.clear()
+        model = _worker_models[version] = joblib.load(model_path)['model']
+    # mmap_mode='r' maps the parent's matrix instead of receiving a pickled copy of it
+    features = np.load(matrix_path, mmap_mode='r')
+    return start, stop, model.decision_function(features[start:stop])
+
+class ParallelDetector:
+    """Shards detection by ticker across a process pool that shares one memory-mapped input"""
+
+    def __init__(self, detector=None, workers=None, min_rows=None):
+        self.detector = detector or anomaly_detector
+        self.workers = workers or config.DETECTION_WORKERS
+        self.min_rows = config.PARALLEL_MIN_ROWS if min_rows is None else min_rows
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded Flask process can copy held locks into the children
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def plan_shards(self, tickers):
+        """Split ticker-sorted rows into contiguous ranges that never cut a ticker in two"""
+        n = len(tickers)
+        # Row offsets where a new ticker starts
+        starts = np.flatnonzero(np.r_[True, tickers[1:] != tickers[:-1]])
+        n_shards = min(len(starts), self.workers * 2)
+        targets = np.linspace(0, n, n_shards + 1)[1:-1]
+        cuts = starts[np.clip(np.searchsorted(starts, targets), 0, len(starts) - 1)]
+        bounds = np.unique(np.r_[0, cuts, n])
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def detect_anomalies(self, data, engine=None):
+        """Same contract as AnomalyDetector.detect_anomalies, fanned out across processes"""
+        if (engine or config.DETECTOR_ENGINE) != 'isolation_forest' or (engine is None and config.DETECTOR_ENGINE_BY_TICKER):
+            # Only the forest is worth sharding; the statistical engines run in-process
+            return self.detector.detect_anomalies(data, engine)
+
+        artifact = self.detector.registry.require()
+
+        model_path = self.detector.registry._model_path(artifact['version'])
+        if self.workers <= 1 or len(data) < max(self.min_rows, 1) or not os.path.exists(model_path):
+            # Keep the caller's engine: run_detection already stamped the rows with its version
+            return self.detector.detect_anomalies(data, engine)
+
+        data = feature_engine.ensure(data, artifact['features'])
+        tickers = data['ticker'].values
+        order = np.argsort(tickers, kind='stable')
+        matrix = np.ascontiguousarray(data[artifact['features']].values[order], dtype=np.float64)
+
+        fd, matrix_path = tempfile.mkstemp(suffix='.npy', dir=config.PARALLEL_SCRATCH_DIR)
+        os.close(fd)
+        try:
+            np.save(matrix_path, matrix)
+            del matrix
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_score_shard, matrix_path, start, stop, model_path, artifact['version'])
+                for start, stop in self.plan_shards(tickers[order])
+            ]
+            sorted_scores = np.empty(len(data))
+            for future in futures:
+                start, stop, shard_scores = future.result()
+                sorted_scores[start:stop] = shard_scores
+        finally:
+            os.remove(matrix_path)
+
+        # Undo the ticker sort so scores line up with the caller's rows
+        scores = np.empty(len(data))
+        scores[order] = sorted_scores
+        return self.detector.apply_scores(data, scores, artifact)
+
+    def score_batch(self, data, engine=None):
+        """Parallel counterpart of AnomalyDetector.score_batch"""
+        scored = self.detect_anomalies(data, engine)
+        scored['risk_level'] = self.detector.get_risk_levels(scored['anomaly_score'].values)
+        return scored
+
+parallel_detector = ParallelDetector()
+atexit.register(parallel_detector.shutdown)
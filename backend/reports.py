@@ -0,0 +1,365 @@
+# backend/reports.py
+import sys
+import os
+import io
+import csv
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+from stats_cache import RISK_LEVELS
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['id', 'ticker', 'anomaly_score', 'risk_level', 'timestamp']
+
+class PDFWriter:
+    """Minimal paged text PDF written object by object, so memory doesn't grow with page count"""
+    LINES_PER_PAGE = 60
+    FONT_SIZE = 8
+    LEADING = 12
+
+    def __init__(self, fileobj, title):
+        self.f = fileobj
+        self.title = title
+        self.offsets = {}
+        self.page_ids = []
+        self.lines = []
+        # 1 = catalog, 2 = page tree, 3 = font; pages are numbered from 4 as they are written
+        self.next_id = 4
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>')
+
+    def _write(self, data):
+        self.f.write(data)
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.f.tell()
+        self._write(f'{obj_id} 0 obj\n'.encode('ascii') + body + b'\nendobj\n')
+
+    def _escape(self, text):
+        text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        return text.encode('latin-1', 'replace')
+
+    def add_line(self, text=''):
+        self.lines.append(text)
+        if len(self.lines) >= self.LINES_PER_PAGE:
+            self._flush_page()
+
+    def _flush_page(self):
+        if not self.lines:
+            return
+        page_number = len(self.page_ids) + 1
+        lines = self.lines + ['', f'{self.title} - page {page_number}']
+        stream = b'BT /F1 %d Tf %d TL 36 806 Td\n' % (self.FONT_SIZE, self.LEADING)
+        stream += b''.join(b'(' + self._escape(line) + b') Tj T*\n' for line in lines) + b'ET'
+
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        self._object(page_id, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                              b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        self.page_ids.append(page_id)
+        self.lines = []
+
+    def close(self):
+        self._flush_page()
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._object(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(self.page_ids))
+
+        xref_offset = self.f.tell()
+        size = self.next_id
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        for obj_id in range(1, size):
+            self._write(b'%010d 00000 n \n' % self.offsets[obj_id])
+        self._write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n' % (size, xref_offset))
+
+class ReportEngine:
+    """Full-period anomaly exports streamed from SQLite into CSV, Parquet or PDF artifacts on disk"""
+    FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet', 'pdf': 'application/pdf'}
+
+    def __init__(self, report_dir=None, chunk_rows=None):
+        self.report_dir = report_dir or config.REPORT_DIR
+        self.chunk_rows = chunk_rows or config.REPORT_CHUNK_ROWS
+
+    def _period_filter(self, start_date=None, end_date=None):
+        clauses, params = [], []
+        if start_date:
+            clauses.append('timestamp >= ?')
+            params.append(start_date)
+        if end_date:
+            # end_date is inclusive of the whole day
+            clauses.append("timestamp < date(?, '+1 day')")
+            params.append(end_date)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def aggregates(self, start_date=None, end_date=None):
+        """Per-risk-level counts and score stats for the period from one GROUP BY"""
+        where, params = self._period_filter(start_date, end_date)
+        with db_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT risk_level, COUNT(*) AS count, AVG(anomaly_score) AS avg_score,
+                       MAX(anomaly_score) AS max_score, COUNT(DISTINCT ticker) AS tickers
+                FROM anomalies{where}
+                GROUP BY risk_level
+            ''', params).fetchall()
+        by_risk = {level: {'count': 0, 'avg_score': None, 'max_score': None, 'tickers': 0} for level in RISK_LEVELS}
+        for row in rows:
+            by_risk[row['risk_level']] = {key: row[key] for key in ('count', 'avg_score', 'max_score', 'tickers')}
+        return {'total': sum(level['count'] for level in by_risk.values()), 'by_risk_level': by_risk}
+
+    def iter_rows(self, start_date=None, end_date=None, job=None, total=None):
+        """Yield lists of at most chunk_rows anomaly rows in timestamp order, fetched incrementally"""
+        where, params = self._period_filter(start_date, end_date)
+        with db_connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT {', '.join(EXPORT_COLUMNS)} FROM anomalies{where}
+                ORDER BY timestamp, id
+            ''', params)
+            done = 0
+            while True:
+                rows = cursor.fetchmany(self.chunk_rows)
+                if not rows:
+                    break
+                done += len(rows)
+                if job and total:
+                    job.progress(0.1 + 0.85 * done / total, f'Exported {done} of {total} rows')
+                yield [tuple(row) for row in rows]
+
+    def iter_csv(self, start_date=None, end_date=None, job=None, total=None):
+        """CSV text in chunks: a header, then one chunk per fetchmany batch"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in self.iter_rows(start_date, end_date, job, total):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def _write_csv(self, path, start_date, end_date, summary, job):
+        with open(path, 'w', newline='') as f:
+            for chunk in self.iter_csv(start_date, end_date, job, summary['total']):
+                f.write(chunk)
+
+    def _write_parquet(self, path, start_date, end_date, summary, job):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+        schema = pa.schema([('id', pa.int64()), ('ticker', pa.string()), ('anomaly_score', pa.float64()),
+                            ('risk_level', pa.string()), ('timestamp', pa.string())])
+        with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+            for rows in self.iter_rows(start_date, end_date, job, summary['total']):
+                # One row group per chunk keeps memory bounded
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+
+    def _write_pdf(self, path, start_date, end_date, summary, job, user):
+        title = f"BrokerMint anomaly report {start_date or 'beginning'} to {end_date or 'now'}"
+        with open(path, 'wb') as f:
+            pdf = PDFWriter(f, title)
+            pdf.add_line('BROKERMINT COMPLIANCE REPORT - FLAGGED TRADES')
+            pdf.add_line(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} by {user['username']}")
+            pdf.add_line(f"Period: {start_date or 'beginning'} to {end_date or 'now'}")
+            pdf.add_line(f"Total anomalies: {summary['total']}")
+            pdf.add_line()
+            for level in RISK_LEVELS:
+                stats = summary['by_risk_level'][level]
+                avg = f"{stats['avg_score']:.4f}" if stats['avg_score'] is not None else '-'
+                pdf.add_line(f"  {level:<9} {stats['count']:>10}  avg score {avg}  tickers {stats['tickers']}")
+            pdf.add_line()
+            pdf.add_line(f"{'ID':>10}  {'TICKER':<10} {'SCORE':>8}  {'RISK':<9} TIMESTAMP")
+            for rows in self.iter_rows(start_date, end_date, job, summary['total']):
+                for row_id, ticker, score, risk_level, timestamp in rows:
+                    pdf.add_line(f'{row_id:>10}  {ticker:<10} {score:>8.4f}  {risk_level:<9} {timestamp}')
+            pdf.close()
+
+    def export(self, fmt, user, start_date=None, end_date=None, job=None, cache_key=None):
+        """Write an artifact for the period and record its metadata in reports; returns that metadata"""
+        if fmt not in self.FORMATS:
+            raise ValueError(f'format must be one of {sorted(self.FORMATS)}')
+
+        started = time.perf_counter()
+        summary = self.aggregates(start_date, end_date)
+        if job:
+            job.progress(0.1, f"Exporting {summary['total']} rows")
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        filename = f"anomalies_{start_date or 'all'}_{end_date or 'now'}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{fmt}"
+        path = os.path.join(self.report_dir, filename)
+        tmp_path = f'{path}.tmp'
+        try:
+            if fmt == 'csv':
+                self._write_csv(tmp_path, start_date, end_date, summary, job)
+            elif fmt == 'parquet':
+                self._write_parquet(tmp_path, start_date, end_date, summary, job)
+            else:
+                self._write_pdf(tmp_path, start_date, end_date, summary, job, user)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with db_connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO reports (user_id, report_type, format, file_path, row_count, size_bytes,
+                                     period_start, period_end, summary, cache_key, generated_at, last_accessed_at)
+                VALUES (?, 'anomaly_export', ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ''', (user['user_id'], fmt, filename, summary['total'], os.path.getsize(path),
+                  start_date, end_date, json.dumps(summary), cache_key))
+            conn.commit()
+            report_id = cursor.lastrowid
+
+        logger.info(f"Exported {summary['total']} anomalies to {filename} in {time.perf_counter() - started:.2f}s")
+        return self.get(report_id)
+
+    def get(self, report_id):
+        """Report metadata (never the artifact or text blob itself)"""
+        with db_connection() as conn:
+            row = conn.execute('''
+                SELECT id, user_id, report_type, format, file_path, row_count, size_bytes,
+                       period_start, period_end, summary, generated_at
+                FROM reports WHERE id = ?
+            ''', (report_id,)).fetchone()
+        if not row:
+            return None
+        report = dict(row)
+        report['summary'] = json.loads(report['summary']) if report['summary'] else None
+        return report
+
+    def list_reports(self, user_id=None, limit=50):
+        with db_connection() as conn:
+            query = '''
+                SELECT id, user_id, report_type, format, row_count, size_bytes, period_start, period_end, generated_at
+                FROM reports {} ORDER BY generated_at DESC, id DESC LIMIT ?
+            '''
+            if user_id is None:
+                rows = conn.execute(query.format(''), (limit,)).fetchall()
+            else:
+                rows = conn.execute(query.format('WHERE user_id = ?'), (user_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def artifact_path(self, report):
+        """Absolute path of a report's artifact, refusing anything outside the report directory"""
+        if not report or not report.get('file_path'):
+            return None
+        path = os.path.realpath(os.path.join(self.report_dir, report['file_path']))
+        if not path.startswith(os.path.realpath(self.report_dir) + os.sep) or not os.path.exists(path):
+            return None
+        return path
+
+class ReportCache:
+    """Content-addressed reuse of stored reports: same parameters over the same data return the same artifact"""
+
+    def __init__(self, engine=None, max_entries=None, max_bytes=None):
+        self.engine = engine or report_engine
+        self.max_entries = max_entries or config.REPORT_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.REPORT_CACHE_MAX_BYTES
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def data_version(self):
+        """Stamp that changes whenever anomalies are inserted, updated or deleted"""
+        with db_connection() as conn:
+            row = conn.execute('''
+                SELECT (SELECT COALESCE(MAX(id), 0) FROM anomalies) AS max_id,
+                       (SELECT COALESCE(SUM(count), 0) FROM anomaly_stats_risk) AS count,
+                       (SELECT revision FROM data_revisions WHERE name = 'anomalies') AS revision
+            ''').fetchone()
+        return f"{row['max_id']}-{row['count']}-{row['revision'] or 0}"
+
+    def key(self, kind, params, stamp):
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f'{kind}:{canonical}:{stamp}'.encode('utf-8')).hexdigest()
+
+    def lookup(self, cache_key):
+        """The stored report for a key, marked as used; None on a miss or if its artifact has gone"""
+        with db_connection() as conn:
+            row = conn.execute('''
+                SELECT id, content, file_path FROM reports WHERE cache_key = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (cache_key,)).fetchone()
+            if not row:
+                return None
+            if row['file_path'] and not self.engine.artifact_path(dict(row)):
+                conn.execute('UPDATE reports SET cache_key = NULL WHERE id = ?', (row['id'],))
+                conn.commit()
+                return None
+            conn.execute('''
+                UPDATE reports SET last_accessed_at = CURRENT_TIMESTAMP, hit_count = hit_count + 1 WHERE id = ?
+            ''', (row['id'],))
+            conn.commit()
+        return row
+
+    def _lock_for(self, cache_key):
+        with self._locks_guard:
+            return self._locks.setdefault(cache_key, threading.Lock())
+
+    def get_or_create(self, kind, params, build):
+        """Return (report id, hit); build(cache_key) must store a report tagged with cache_key and return its id"""
+        cache_key = self.key(kind, params, self.data_version())
+        # Concurrent identical requests in this process build once and share the result
+        try:
+            with self._lock_for(cache_key):
+                row = self.lookup(cache_key)
+                if row:
+                    return row['id'], True
+                report_id = build(cache_key)
+        finally:
+            # Dropped on hits, misses and failed builds alike, so the lock table never grows
+            with self._locks_guard:
+                self._locks.pop(cache_key, None)
+        try:
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error evicting cached reports: {e}")
+        return report_id, False
+
+    def evict(self):
+        """Drop least recently used cache entries beyond max_entries or max_bytes
+
+        Export files are deleted; stored text reports keep their content as history and only leave the cache.
+        """
+        with db_connection() as conn:
+            rows = conn.execute('''
+                SELECT id, file_path, COALESCE(size_bytes, LENGTH(content), 0) AS size
+                FROM reports WHERE cache_key IS NOT NULL
+                ORDER BY COALESCE(last_accessed_at, generated_at) DESC, id DESC
+            ''').fetchall()
+
+            kept_bytes, evicted = 0, []
+            for position, row in enumerate(rows):
+                kept_bytes += row['size']
+                if position >= self.max_entries or kept_bytes > self.max_bytes:
+                    evicted.append(row)
+            if not evicted:
+                return 0
+
+            for row in evicted:
+                path = self.engine.artifact_path(dict(row))
+                if path:
+                    os.remove(path)
+            conn.executemany('''
+                UPDATE reports SET cache_key = NULL, file_path = NULL WHERE id = ?
+            ''', [(row['id'],) for row in evicted])
+            conn.commit()
+        logger.info(f"Evicted {len(evicted)} cached reports")
+        return len(evicted)
+
+report_engine = ReportEngine()
+report_cache = ReportCache(report_engine)
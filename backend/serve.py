@@ -0,0 +1,168 @@
+# backend/serve.py
+"""Production launcher: builds and warms the app once, then serves it from pre-forked worker processes.
+
+Usage: python serve.py [--workers N] [--threads N] [--host 0.0.0.0] [--port 5000]
+
+Each open SSE stream (/api/events, /api/jobs/<id>/events) holds a request thread, so a worker
+accepts at most EVENTS_MAX_STREAMS of them (default --threads // 2) and answers 503 beyond
+that; size --threads at about twice the streams a worker should carry.
+
+Uses gunicorn (preload_app) when it is installed, otherwise a small pre-fork loop around
+werkzeug's threaded server. Either way migrations, the admin seed and the model load happen
+once in the parent and workers inherit them copy-on-write.
+"""
+import sys
+import os
+import time
+import signal
+import logging
+import argparse
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import get_pool
+
+logger = logging.getLogger(__name__)
+
+def load_app():
+    """Build the app and load everything workers share before any fork"""
+    from app import create_app
+    started = time.perf_counter()
+    app = create_app(warm=True)
+    # Connections must not cross a fork; each worker opens its own
+    get_pool().close_all()
+    logger.info(f"App ready in {time.perf_counter() - started:.2f}s (pid {os.getpid()})")
+    return app
+
+def serve_gunicorn(app, args):
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                'bind': f'{args.host}:{args.port}',
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': 'gthread',
+                'preload_app': True,
+                'timeout': 120,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    PreloadedApplication().run()
+
+def make_pool_server(host, port, app, threads):
+    """werkzeug server handling connections on at most `threads` request threads (plain serial when 1)"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer
+
+    if threads <= 1:
+        return BaseWSGIServer(host, port, app)
+
+    class PoolWSGIServer(BaseWSGIServer):
+        # werkzeug's ThreadingMixIn starts a thread per connection; this caps them like gunicorn's gthread
+        multithread = True
+        _pool = None
+
+        _slots = threading.BoundedSemaphore(threads)
+
+        def process_request(self, request, client_address):
+            # Created on first use, i.e. inside the forked worker; threads never survive a fork
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+            # Stop accepting while every thread is busy: further connections wait in the shared listen
+            # backlog, where a sibling worker with a free thread picks them up, not in this pool's queue
+            self._slots.acquire()
+            self._pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self._slots.release()
+
+    return PoolWSGIServer(host, port, app)
+
+def serve_prefork(app, args):
+    """Fork workers that accept on one shared listening socket; dead workers are replaced"""
+    server = make_pool_server(args.host, args.port, app, args.threads)
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"Serving on http://{args.host}:{args.port} with {args.workers} workers {sorted(workers)}")
+
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in workers:
+            workers.pop(pid)
+            logger.warning(f"Worker {pid} exited with status {status}, starting a replacement")
+            spawn()
+        time.sleep(0.2)
+
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    server.server_close()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Serve the BrokerMint API with pre-forked workers')
+    parser.add_argument('--host', default=config.API_HOST)
+    parser.add_argument('--port', type=int, default=config.API_PORT)
+    parser.add_argument('--workers', type=int, default=config.SERVE_WORKERS)
+    parser.add_argument('--threads', type=int, default=config.SERVE_THREADS)
+    parser.add_argument('--no-gunicorn', action='store_true', help='use the built-in pre-fork server')
+    args = parser.parse_args()
+
+    # Stream slots (EVENTS_MAX_STREAMS) are sized from the thread count each worker actually runs
+    config.SERVE_THREADS = args.threads
+    app = load_app()
+    try:
+        if args.no_gunicorn:
+            raise ImportError
+        import gunicorn  # noqa: F401
+    except ImportError:
+        serve_prefork(app, args)
+    else:
+        serve_gunicorn(app, args)
+
+if __name__ == '__main__':
+    main()
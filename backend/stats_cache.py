@@ -0,0 +1,80 @@
+# backend/stats_cache.py
+import sys
+import os
+import time
+import threading
+import logging
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from database import db_connection
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+
+class StatsCache:
+    """TTL cache over the trigger-maintained anomaly summary tables"""
+
+    def __init__(self, ttl=None):
+        self.ttl = config.STATS_CACHE_TTL if ttl is None else ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, loader, fresh=False):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now and not fresh:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self):
+        """Drop cached values, e.g. right after this process inserted anomalies"""
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self, fresh=False):
+        """Anomaly counts per risk level plus the total; fresh=True bypasses (and refreshes) the TTL"""
+        def load():
+            with db_connection() as conn:
+                rows = conn.execute('SELECT risk_level, count FROM anomaly_stats_risk').fetchall()
+            by_risk = {level: 0 for level in RISK_LEVELS}
+            by_risk.update({row['risk_level']: row['count'] for row in rows})
+            return {'total': sum(by_risk.values()), 'by_risk_level': by_risk}
+        return self._cached('summary', load, fresh)
+
+    def by_ticker(self):
+        """Anomaly counts per ticker, broken down by risk level"""
+        def load():
+            with db_connection() as conn:
+                rows = conn.execute('SELECT ticker, risk_level, count FROM anomaly_stats_ticker WHERE count > 0').fetchall()
+            result = {}
+            for row in rows:
+                result.setdefault(row['ticker'], {})[row['risk_level']] = row['count']
+            return result
+        return self._cached('by_ticker', load)
+
+    def by_day(self, days=30):
+        """Anomaly counts per day for the most recent `days` days"""
+        def load():
+            with db_connection() as conn:
+                rows = conn.execute('''
+                    SELECT day, risk_level, count FROM anomaly_stats_daily
+                    WHERE count > 0 AND day IN (
+                        SELECT DISTINCT day FROM anomaly_stats_daily ORDER BY day DESC LIMIT ?
+                    )
+                    ORDER BY day
+                ''', (days,)).fetchall()
+            result = {}
+            for row in rows:
+                result.setdefault(row['day'], {})[row['risk_level']] = row['count']
+            return result
+        return self._cached(('by_day', days), load)
+
+stats_cache = StatsCache()
@@ -0,0 +1,213 @@
+# backend/stream_detection.py
+import sys
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque, OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from anomaly_detection import anomaly_detector
+from anomaly_store import anomaly_store
+from features import FeatureEngine
+
+logger = logging.getLogger(__name__)
+
+class TickerState:
+    """Bounded rolling window of recent ticks for one ticker, with running sums so each tick is O(1)"""
+    __slots__ = ('prices', 'volumes', 'price_sum', 'volume_sum', 'ticks', 'last_timestamp')
+
+    def __init__(self, window):
+        self.prices = deque(maxlen=window)
+        self.volumes = deque(maxlen=window)
+        self.price_sum = 0.0
+        self.volume_sum = 0.0
+        self.ticks = 0
+        self.last_timestamp = None
+
+    def context(self, price, volume):
+        """Deviation of a tick from the rolling window, before the tick is added"""
+        if not self.prices:
+            return {'price_change': 0.0, 'volume_ratio': 1.0}
+        mean_price = self.price_sum / len(self.prices)
+        mean_volume = self.volume_sum / len(self.volumes)
+        return {
+            'price_change': round((price - mean_price) / mean_price, 6) if mean_price else 0.0,
+            'volume_ratio': round(volume / mean_volume, 6) if mean_volume else 1.0
+        }
+
+    def push(self, price, volume, timestamp):
+        if len(self.prices) == self.prices.maxlen:
+            # The deque drops its oldest tick on append; take it out of the sums too
+            self.price_sum -= self.prices[0]
+            self.volume_sum -= self.volumes[0]
+        self.prices.append(price)
+        self.volumes.append(volume)
+        self.price_sum += price
+        self.volume_sum += volume
+        self.ticks += 1
+        self.last_timestamp = timestamp
+        if self.ticks % (self.prices.maxlen * 64) == 0:
+            # Re-sum now and then so floating-point drift from the subtractions can't build up
+            self.price_sum = float(sum(self.prices))
+            self.volume_sum = float(sum(self.volumes))
+
+class StreamingDetector:
+    """Scores a live tick feed in micro-batches against the active model's reference distribution"""
+    _STOP = object()
+
+    def __init__(self, detector=None, batch_size=None, flush_interval=None, window=None, max_tickers=None):
+        self.detector = detector or anomaly_detector
+        self.batch_size = batch_size or config.STREAM_BATCH_SIZE
+        self.flush_interval = flush_interval or config.STREAM_FLUSH_INTERVAL
+        self.window = window or config.STREAM_WINDOW
+        self.max_tickers = max_tickers or config.STREAM_MAX_TICKERS
+        # LRU of per-ticker state so memory stays bounded however many symbols stream past
+        self.states = OrderedDict()
+        # Separate engine so the stream's per-ticker feature windows don't mix with batch callers
+        self.features = FeatureEngine()
+        self.queue = queue.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        self.stats = {'ticks': 0, 'flagged': 0, 'batches': 0}
+        self._thread = None
+        # Arrival times stand in for missing tick timestamps; kept strictly increasing so they stay unique
+        self._next_arrival = pd.Timestamp.min
+        self._arrival_lock = threading.Lock()
+
+    def _state(self, ticker):
+        state = self.states.get(ticker)
+        if state is None:
+            state = self.states[ticker] = TickerState(self.window)
+            if len(self.states) > self.max_tickers:
+                evicted, _ = self.states.popitem(last=False)
+                self.features.forget(evicted)
+        else:
+            self.states.move_to_end(ticker)
+        return state
+
+    def process_batch(self, ticks):
+        """Score one micro-batch, update rolling state and persist flagged ticks"""
+        if not ticks:
+            return []
+
+        artifact = self.detector.registry.require()
+
+        batch = pd.DataFrame.from_records(ticks)
+        if any(feature not in batch.columns for feature in artifact['features']):
+            batch = self.features.update(batch)
+        raw_scores = artifact['model'].decision_function(batch[artifact['features']].values)
+        scores = self.detector.calibrate_scores(raw_scores, artifact)
+        risk_levels = self.detector.get_risk_levels(scores)
+        flagged_mask = raw_scores < 0
+
+        # Reserve one microsecond per tick, so untimed ticks never share a trade_time and overwrite each other
+        with self._arrival_lock:
+            arrival = max(pd.Timestamp(datetime.utcnow()), self._next_arrival)
+            self._next_arrival = arrival + pd.Timedelta(microseconds=len(ticks))
+        flagged = []
+        # Per-tick work here is only O(1) deque updates; scoring above is vectorized
+        for i, tick in enumerate(ticks):
+            state = self._state(tick['ticker'])
+            timestamp = tick.get('timestamp')
+            if not timestamp:
+                timestamp = (arrival + pd.Timedelta(microseconds=i)).strftime('%Y-%m-%d %H:%M:%S.%f')
+            if flagged_mask[i]:
+                record = {
+                    'ticker': tick['ticker'],
+                    'anomaly_score': round(float(scores[i]), 4),
+                    'risk_level': risk_levels[i],
+                    'price': tick['price'],
+                    'volume': tick['volume'],
+                    'timestamp': str(timestamp)
+                }
+                record.update(state.context(tick['price'], tick['volume']))
+                flagged.append(record)
+            state.push(tick['price'], tick['volume'], timestamp)
+
+        self._persist(flagged, f"isolation_forest:{artifact['version']}")
+
+        self.stats['ticks'] += len(ticks)
+        self.stats['flagged'] += len(flagged)
+        self.stats['batches'] += 1
+        return flagged
+
+    def _persist(self, flagged, version):
+        """Upsert flagged ticks into the anomalies table in one transaction"""
+        if not flagged:
+            return
+        frame = pd.DataFrame.from_records(flagged)
+        anomaly_store.save(frame, {ticker: version for ticker in frame['ticker'].unique()})
+
+    def _iter_batches(self, source, stop_event=None):
+        """Group ticks into micro-batches by size, or by flush interval for queue sources"""
+        if not isinstance(source, queue.Queue):
+            batch = []
+            for tick in source:
+                batch.append(tick)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            return
+
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (stop_event and stop_event.is_set()):
+            try:
+                tick = source.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                tick = None
+            if tick is self._STOP:
+                break
+            if tick is not None:
+                batch.append(tick)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    yield batch
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            yield batch
+
+    def run(self, source, stop_event=None):
+        """Consume a generator/iterable or queue.Queue of ticks until exhausted or stopped"""
+        for batch in self._iter_batches(source, stop_event):
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                logger.error(f"Error scoring tick batch of {len(batch)}: {e}")
+        return dict(self.stats)
+
+    def submit(self, ticks, timeout=None):
+        """Queue ticks for the background consumer, starting it if needed; returns the number accepted"""
+        self.start()
+        accepted = 0
+        for tick in ticks:
+            try:
+                self.queue.put(tick, timeout=timeout)
+            except queue.Full:
+                break
+            accepted += 1
+        return accepted
+
+    def start(self):
+        """Start the background consumer over self.queue"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.run, args=(self.queue,), name='stream-detector', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Flush what is queued and stop the background consumer"""
+        if self._thread and self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout)
+
+stream_detector = StreamingDetector()
@@ -0,0 +1,263 @@
+# backend/tick_store.py
+import sys
+import os
+import json
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from features import FeatureEngine
+from anomaly_detection import anomaly_detector
+
+logger = logging.getLogger(__name__)
+
+class TickView:
+    """Zero-copy, read-only slice of one ticker's ticks"""
+    __slots__ = ('ticker', 'code', 'timestamp', 'price', 'volume')
+
+    def __init__(self, ticker, code, timestamp, price, volume):
+        self.ticker = ticker
+        self.code = code
+        self.timestamp = timestamp
+        self.price = price
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.timestamp)
+
+class TickStore:
+    """Append-only fixed-width tick columns per ticker, read back through np.memmap
+
+    Layout: <root>/symbols.json maps ticker -> interned int code, and each code has
+    <root>/<code>/timestamp.i64, price.f64 and volume.i64 kept in timestamp order,
+    so a ticker/time range is a contiguous slice of the mapped files. New codes are
+    assigned under a flock on <root>/symbols.lock, so several processes can ingest at once.
+    """
+    COLUMNS = {'timestamp': np.int64, 'price': np.float64, 'volume': np.int64}
+
+    def __init__(self, root=None):
+        self.root = root or config.TICK_STORE_DIR
+        self._lock = threading.Lock()
+        self._symbols = None
+        # (inode, mtime_ns, size) of symbols.json when last read; every rewrite is a rename, so a new inode
+        self._symbols_stamp = None
+        self._maps = {}
+
+    # Symbol interning
+
+    def _symbols_path(self):
+        return os.path.join(self.root, 'symbols.json')
+
+    def _symbols_changed(self):
+        try:
+            stat = os.stat(self._symbols_path())
+        except FileNotFoundError:
+            return self._symbols_stamp is not None or self._symbols is None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._symbols_stamp
+
+    def _load_symbols(self):
+        try:
+            with open(self._symbols_path()) as f:
+                stat = os.fstat(f.fileno())
+                self._symbols = json.load(f)
+            self._symbols_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            self._symbols, self._symbols_stamp = {}, None
+        return self._symbols
+
+    @property
+    def symbols(self):
+        """Ticker -> code map, re-read whenever symbols.json has changed (e.g. after ingestion.py --ticks)"""
+        if self._symbols_changed():
+            self._load_symbols()
+        return self._symbols
+
+    @contextmanager
+    def _symbols_file_lock(self):
+        """Cross-process lock around code assignment, so two writers never hand out the same code"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, 'symbols.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def code(self, ticker, create=False):
+        """Interned int code for a ticker (None if unknown and create is False)"""
+        code = self.symbols.get(ticker)
+        if code is None and create:
+            with self._symbols_file_lock():
+                # Another process may have added symbols since our last read
+                symbols = self._load_symbols()
+                code = symbols.get(ticker)
+                if code is None:
+                    code = max(symbols.values(), default=-1) + 1
+                    symbols[ticker] = code
+                    tmp_path = f'{self._symbols_path()}.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(symbols, f)
+                    os.replace(tmp_path, self._symbols_path())
+                    self._load_symbols()
+        return code
+
+    def _column_path(self, code, column):
+        suffix = 'f64' if self.COLUMNS[column] == np.float64 else 'i64'
+        return os.path.join(self.root, str(code), f'{column}.{suffix}')
+
+    def _length(self, code):
+        """Complete rows on disk; a torn append leaves columns uneven, so use the shortest"""
+        lengths = []
+        for column, dtype in self.COLUMNS.items():
+            try:
+                lengths.append(os.path.getsize(self._column_path(code, column)) // np.dtype(dtype).itemsize)
+            except FileNotFoundError:
+                return 0
+        return min(lengths)
+
+    # Writing
+
+    def append(self, ticker, timestamp, price, volume):
+        """Append ticks for one ticker; out-of-order batches trigger a one-off merge of that ticker"""
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        if not len(timestamp):
+            return 0
+        order = np.argsort(timestamp, kind='stable')
+        columns = {
+            'timestamp': timestamp[order],
+            'price': np.asarray(price, dtype=np.float64)[order],
+            'volume': np.asarray(volume, dtype=np.int64)[order]
+        }
+
+        with self._lock:
+            code = self.code(ticker, create=True)
+            os.makedirs(os.path.join(self.root, str(code)), exist_ok=True)
+            length = self._length(code)
+            last = self._read_column(code, 'timestamp', length)[-1] if length else None
+
+            if last is not None and columns['timestamp'][0] < last:
+                logger.warning(f"Out-of-order ticks for {ticker}, rewriting its columns")
+                existing = {c: np.array(self._read_column(code, c, length)) for c in self.COLUMNS}
+                merged = {c: np.concatenate([existing[c], columns[c]]) for c in self.COLUMNS}
+                order = np.argsort(merged['timestamp'], kind='stable')
+                for column in self.COLUMNS:
+                    path = self._column_path(code, column)
+                    merged[column][order].tofile(f'{path}.tmp')
+                    os.replace(f'{path}.tmp', path)
+            else:
+                # Truncate any torn tail, then append; timestamp goes last so a crash never exposes a partial row
+                for column in ('price', 'volume', 'timestamp'):
+                    path = self._column_path(code, column)
+                    with open(path, 'ab') as f:
+                        f.truncate(length * np.dtype(self.COLUMNS[column]).itemsize)
+                        f.write(columns[column].tobytes())
+            self._maps.pop(code, None)
+        return len(timestamp)
+
+    # Reading
+
+    def _read_column(self, code, column, length):
+        if length == 0:
+            return np.empty(0, dtype=self.COLUMNS[column])
+        return np.memmap(self._column_path(code, column), dtype=self.COLUMNS[column], mode='r', shape=(length,))
+
+    def _mapped(self, code):
+        """Cached memmaps for a ticker, remapped only after it has grown"""
+        length = self._length(code)
+        cached = self._maps.get(code)
+        if cached is None or cached[0] != length:
+            cached = (length, {c: self._read_column(code, c, length) for c in self.COLUMNS})
+            self._maps[code] = cached
+        return cached[1]
+
+    def view(self, ticker, start=None, end=None):
+        """Zero-copy TickView of ticks with start <= timestamp < end (ns or anything pd.Timestamp accepts)"""
+        code = self.code(ticker)
+        if code is None:
+            empty = {c: np.empty(0, dtype=d) for c, d in self.COLUMNS.items()}
+            return TickView(ticker, None, **empty)
+
+        columns = self._mapped(code)
+        timestamps = columns['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, self._to_ns(start), side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, self._to_ns(end), side='left'))
+        return TickView(ticker, code, **{c: values[lo:hi] for c, values in columns.items()})
+
+    def _to_ns(self, value):
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        return pd.Timestamp(value).value
+
+    def tickers(self):
+        return sorted(self.symbols)
+
+    # Detection
+
+    def iter_feature_chunks(self, view, features, chunk_rows=None):
+        """Yield (offset, matrix) model inputs for a view in bounded-size chunks"""
+        chunk_rows = chunk_rows or config.TICK_SCORE_CHUNK_ROWS
+        raw_only = all(f in ('price', 'volume') for f in features)
+        engine = None if raw_only else FeatureEngine()
+        overlap = 0 if raw_only else engine.window
+
+        for offset in range(0, len(view), chunk_rows):
+            stop = min(offset + chunk_rows, len(view))
+            if raw_only:
+                # Slices are memmap views; only this chunk's model matrix is materialized
+                matrix = np.column_stack([getattr(view, f)[offset:stop] for f in features])
+            else:
+                # Prepend enough history for the rolling windows, then drop it again
+                lo = max(0, offset - overlap)
+                frame = pd.DataFrame({
+                    'ticker': view.ticker,
+                    'timestamp': view.timestamp[lo:stop],
+                    'price': view.price[lo:stop],
+                    'volume': view.volume[lo:stop]
+                })
+                matrix = engine.compute(frame)[features].values[offset - lo:]
+            yield offset, matrix
+
+    def detect_range(self, ticker, start=None, end=None, chunk_rows=None, detector=None):
+        """Flagged ticks in a range, scored chunk by chunk so memory doesn't grow with history"""
+        detector = detector or anomaly_detector
+        artifact = detector.registry.require()
+
+        view = self.view(ticker, start, end)
+        flagged = []
+        for offset, matrix in self.iter_feature_chunks(view, artifact['features'], chunk_rows):
+            raw_scores = artifact['model'].decision_function(matrix)
+            hits = np.flatnonzero(raw_scores < 0)
+            if not len(hits):
+                continue
+            # Calibrated against the training distribution: comparable across chunks, unlike batch min/max
+            scores = detector.calibrate_scores(raw_scores[hits], artifact)
+            rows = offset + hits
+            flagged.append(pd.DataFrame({
+                'ticker': ticker,
+                'timestamp': pd.to_datetime(np.asarray(view.timestamp[rows]), unit='ns'),
+                'price': np.asarray(view.price[rows]),
+                'volume': np.asarray(view.volume[rows]),
+                'anomaly_score': scores,
+                'risk_level': detector.get_risk_levels(scores)
+            }))
+
+        if not flagged:
+            return pd.DataFrame({
+                'ticker': pd.Series(dtype=object),
+                'timestamp': pd.Series(dtype='datetime64[ns]'),
+                'price': pd.Series(dtype=np.float64),
+                'volume': pd.Series(dtype=np.int64),
+                'anomaly_score': pd.Series(dtype=np.float64),
+                'risk_level': pd.Series(dtype=object)
+            })
+        return pd.concat(flagged, ignore_index=True)
+
+tick_store = TickStore()
@@ -0,0 +1,58 @@
+# benchmarks/bench_auth.py
+"""Per-request authentication overhead: JWT verify (cold vs cached) and bcrypt cost.
+
+Usage: python benchmarks/bench_auth.py --iterations 20000 --rounds 10 12
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Keep benchmark writes out of the real database
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import bcrypt
+
+from auth import AuthSystem
+from database import init_database
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 12])
+    args = parser.parse_args()
+
+    init_database()
+    auth = AuthSystem()
+    token = auth.generate_token({'id': 1, 'username': 'bench', 'role': 'user'})
+
+    def cold():
+        auth.token_cache.discard(auth.token_digest(token))
+        auth.verify_token(token)
+
+    cold_us = per_call_us(cold, args.iterations)
+    auth.verify_token(token)
+    warm_us = per_call_us(lambda: auth.verify_token(token), args.iterations)
+
+    print(f"{'operation':<32}{'us/call':>12}")
+    print(f"{'verify_token (jwt.decode)':<32}{cold_us:>12.1f}")
+    print(f"{'verify_token (cached)':<32}{warm_us:>12.1f}")
+    print(f"{'speedup':<32}{cold_us / warm_us:>11.1f}x")
+
+    password = b'benchmark-password'
+    for rounds in args.rounds:
+        hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+        iterations = max(1, 2 ** (14 - rounds))
+        check_us = per_call_us(lambda: bcrypt.checkpw(password, hashed), iterations)
+        print(f"{f'bcrypt checkpw (rounds={rounds})':<32}{check_us:>12.1f}")
+
+if __name__ == '__main__':
+    main()
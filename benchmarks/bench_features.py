@@ -0,0 +1,79 @@
+# benchmarks/bench_features.py
+"""Compare the raw price/volume detector path against the rolling-feature path.
+
+Usage: python benchmarks/bench_features.py --rows 100000 --tickers 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from features import FeatureEngine
+from model_registry import ModelRegistry
+
+def make_frame(rows, tickers, seed=42):
+    """Random-walk ticks, generated in one vectorized pass"""
+    rng = np.random.default_rng(seed)
+    per_ticker = rows // tickers
+    ticker = np.repeat([f'T{i:04d}' for i in range(tickers)], per_ticker)
+    base = np.repeat(rng.uniform(100, 500, tickers), per_ticker)
+    steps = rng.normal(0, 0.01, per_ticker * tickers).reshape(tickers, per_ticker)
+    price = base * np.exp(np.cumsum(steps, axis=1).ravel())
+    return pd.DataFrame({
+        'timestamp': np.tile(np.arange(per_ticker), tickers),
+        'ticker': ticker,
+        'price': price.round(2),
+        'volume': rng.integers(1_000_000, 5_000_000, per_ticker * tickers)
+    })
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--tickers', type=int, default=50)
+    args = parser.parse_args()
+
+    data = make_frame(args.rows, args.tickers)
+    registry = ModelRegistry()
+    engine = FeatureEngine()
+    raw_features = ['price', 'volume']
+    all_features = raw_features + FeatureEngine.FEATURES
+
+    raw_artifact, raw_fit = timed(lambda: registry.train(data, raw_features))
+    _, raw_score = timed(lambda: raw_artifact['model'].decision_function(data[raw_features].values))
+
+    featured, feature_time = timed(lambda: engine.compute(data))
+    feature_artifact, feature_fit = timed(lambda: registry.train(featured, all_features))
+    _, feature_score = timed(lambda: feature_artifact['model'].decision_function(featured[all_features].values))
+
+    # One new tick per ticker: incremental update against the cached tails vs recomputing everything
+    engine.update(data)
+    next_ticks = data.groupby('ticker').tail(1).assign(timestamp=lambda f: f['timestamp'] + 1)
+    _, incremental = timed(lambda: engine.update(next_ticks))
+    _, recompute = timed(lambda: FeatureEngine().compute(pd.concat([data, next_ticks])))
+
+    rows = len(data)
+    print(f"rows={rows} tickers={args.tickers}")
+    print(f"{'stage':<32}{'seconds':>10}{'rows/s':>14}")
+    for name, seconds in [
+        ('two-column fit', raw_fit),
+        ('two-column score', raw_score),
+        ('feature compute', feature_time),
+        ('feature fit', feature_fit),
+        ('feature score', feature_score),
+    ]:
+        print(f"{name:<32}{seconds:>10.4f}{rows / seconds:>14,.0f}")
+    print(f"{'incremental update (1/ticker)':<32}{incremental:>10.4f}")
+    print(f"{'full recompute (same rows)':<32}{recompute:>10.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+# benchmarks/run.py
+"""Backend benchmark suite: hot-path throughput and latency as JSON, with regression checks against a baseline.
+
+Usage:
+    python benchmarks/run.py --size small --output benchmarks/baseline.json
+    python benchmarks/run.py --size small --baseline benchmarks/baseline.json --tolerance 0.25
+    python benchmarks/run.py --only detector auth --rows 200000
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+# Everything the suite writes (database, models, stores) goes to a scratch directory
+SCRATCH_DIR = tempfile.mkdtemp(prefix='brokermint-bench-')
+os.environ['DATABASE_PATH'] = os.path.join(SCRATCH_DIR, 'bench.db')
+for name in ('MODEL_DIR', 'TRADE_STORE_DIR', 'TICK_STORE_DIR', 'REPORT_DIR'):
+    os.environ[name] = os.path.join(SCRATCH_DIR, name.lower())
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from bench_features import make_frame, timed
+from bench_auth import per_call_us
+from bench_detectors import make_detector, evaluate
+
+# Each size preset can be overridden per run from the command line
+SIZES = {
+    'small': {'rows': 20_000, 'tickers': 20, 'risk_rows': 100_000, 'audit_events': 5_000,
+              'audit_threads': 4, 'audit_table_sizes': [1_000, 10_000], 'jwt_iterations': 5_000,
+              'http_requests': 20, 'serve_workers': 2},
+    'medium': {'rows': 200_000, 'tickers': 50, 'risk_rows': 1_000_000, 'audit_events': 50_000,
+               'audit_threads': 8, 'audit_table_sizes': [1_000, 10_000, 100_000], 'jwt_iterations': 20_000,
+               'http_requests': 50, 'serve_workers': 4},
+    'large': {'rows': 1_000_000, 'tickers': 200, 'risk_rows': 5_000_000, 'audit_events': 200_000,
+              'audit_threads': 16, 'audit_table_sizes': [10_000, 100_000, 1_000_000], 'jwt_iterations': 50_000,
+              'http_requests': 100, 'serve_workers': 8},
+}
+
+def metric(value, unit, better):
+    """One result; 'better' says which direction is an improvement ('higher' or 'lower')"""
+    return {'value': round(float(value), 6), 'unit': unit, 'better': better}
+
+def latency_ms(fn, repeats):
+    """Median and 95th-percentile wall time of fn in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+def bench_detector(size):
+    """AnomalyDetector.train_model / detect_anomalies throughput"""
+    from anomaly_detection import AnomalyDetector
+    from model_registry import ModelRegistry
+
+    data = make_frame(size['rows'], size['tickers'])
+    detector = AnomalyDetector(registry=ModelRegistry(os.path.join(SCRATCH_DIR, 'detector-models')))
+    trained, train_time = timed(lambda: detector.train_model(data))
+    if not trained:
+        raise RuntimeError('train_model failed')
+    _, detect_time = timed(lambda: detector.detect_anomalies(data))
+    return {
+        'train_rows_per_s': metric(len(data) / train_time, 'rows/s', 'higher'),
+        'detect_rows_per_s': metric(len(data) / detect_time, 'rows/s', 'higher'),
+    }
+
+def bench_engines(size):
+    """Each detector engine's throughput and precision/recall on generated data with injected anomalies"""
+    from anomaly_detection import DETECTOR_ENGINES
+    from market_data import MarketDataGenerator
+
+    detector = make_detector(size['tickers'], '1min')
+    data = MarketDataGenerator(42).generate(size['tickers'], size['rows'] // size['tickers'], '1min',
+                                            anomaly_rate=0.001)
+    results = {}
+    for engine in sorted(DETECTOR_ENGINES):
+        result = evaluate(detector, data, engine)
+        results[f'{engine}_rows_per_s'] = metric(result['rows_per_s'], 'rows/s', 'higher')
+        for key in ('precision', 'recall', 'f1'):
+            results[f'{engine}_{key}'] = metric(result[key], 'ratio', 'higher')
+    return results
+
+def bench_risk_level(size):
+    """Per-row cost of get_risk_level, and of the vectorized get_risk_levels it is batched through"""
+    from anomaly_detection import AnomalyDetector
+
+    detector = AnomalyDetector()
+    scores = np.random.default_rng(0).random(size['risk_rows'])
+    _, scalar_time = timed(lambda: [detector.get_risk_level(score) for score in scores.tolist()])
+    _, vector_time = timed(lambda: detector.get_risk_levels(scores))
+    return {
+        'scalar_ns_per_row': metric(scalar_time / len(scores) * 1e9, 'ns/row', 'lower'),
+        'vectorized_ns_per_row': metric(vector_time / len(scores) * 1e9, 'ns/row', 'lower'),
+    }
+
+def bench_audit_write(size):
+    """AuditTrail.record_action throughput from concurrent threads, measured until everything is committed"""
+    from audit_trail import AuditTrail, AuditWriter
+
+    trail = AuditTrail(AuditWriter())
+    threads = size['audit_threads']
+    per_thread = size['audit_events'] // threads
+
+    def worker(thread_id):
+        for i in range(per_thread):
+            trail.record_action(thread_id, 'bench_write', {'seq': i})
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    enqueued = time.perf_counter() - start
+    trail.writer.flush(timeout=300)
+    committed = time.perf_counter() - start
+    trail.writer.stop()
+
+    events = per_thread * threads
+    return {
+        'enqueue_per_s': metric(events / enqueued, 'events/s', 'higher'),
+        'committed_per_s': metric(events / committed, 'events/s', 'higher'),
+    }
+
+def bench_anomaly_store(size):
+    """Upserts of one flagged detection run into the anomalies table: fresh, repeated unchanged, and re-scored"""
+    from anomaly_store import AnomalyStore
+    from database import db_connection
+    from market_data import MarketDataGenerator
+
+    with db_connection() as conn:
+        conn.execute('DELETE FROM anomalies')
+        conn.commit()
+    data = MarketDataGenerator(0).generate(size['tickers'], size['rows'] // size['tickers'], '1min')
+    scored = data.assign(anomaly_score=np.random.default_rng(0).random(len(data)), is_anomaly=True,
+                         risk_level='High')
+    versions = {ticker: 'bench' for ticker in data['ticker'].unique()}
+    store = AnomalyStore()
+
+    results = {}
+    for label, frame in (('insert', scored), ('unchanged', scored),
+                         ('update', scored.assign(anomaly_score=scored['anomaly_score'] / 2, risk_level='Low'))):
+        start = time.perf_counter()
+        store.save(frame, versions)
+        results[f'{label}_rows_per_s'] = metric(len(frame) / (time.perf_counter() - start), 'rows/s', 'higher')
+    return results
+
+def bench_audit_read(size):
+    """get_audit_log(100) latency as the audit table grows"""
+    from audit_trail import AuditTrail
+    from database import db_connection
+
+    trail = AuditTrail()
+    results = {}
+    # Scratch database: start from an empty table so each size is exact
+    with db_connection() as conn:
+        conn.execute('DELETE FROM audit_trail')
+        conn.commit()
+    current = 0
+    for table_size in sorted(size['audit_table_sizes']):
+        missing = table_size - current
+        if missing > 0:
+            with db_connection() as conn:
+                conn.executemany('''
+                    INSERT INTO audit_trail (user_id, action_type, details, timestamp)
+                    VALUES (?, ?, ?, datetime('now', ?))
+                ''', ((i % 50, 'bench_read', '{"seq": %d}' % i, f'-{i} seconds') for i in range(missing)))
+                conn.commit()
+            current = table_size
+        median, p95 = latency_ms(lambda: trail.get_audit_log(100), 50)
+        results[f'get_audit_log_ms_{table_size}'] = metric(median, 'ms', 'lower')
+        results[f'get_audit_log_p95_ms_{table_size}'] = metric(p95, 'ms', 'lower')
+    return results
+
+def bench_auth(size):
+    """JWT verification (uncached and cached) and bcrypt check cost at the configured rounds"""
+    import bcrypt
+    from auth import AuthSystem
+    from config import config
+
+    auth = AuthSystem()
+    token = auth.generate_token({'id': 1, 'username': 'bench', 'role': 'user'})
+
+    def cold():
+        auth.token_cache.discard(auth.token_digest(token))
+        auth.verify_token(token)
+
+    iterations = size['jwt_iterations']
+    cold_us = per_call_us(cold, iterations)
+    auth.verify_token(token)
+    warm_us = per_call_us(lambda: auth.verify_token(token), iterations)
+
+    password = b'benchmark-password'
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS))
+    checks = max(1, 2 ** (14 - config.BCRYPT_ROUNDS))
+    bcrypt_us = per_call_us(lambda: bcrypt.checkpw(password, hashed), checks)
+    return {
+        'jwt_verify_us': metric(cold_us, 'us', 'lower'),
+        'jwt_verify_cached_us': metric(warm_us, 'us', 'lower'),
+        f'bcrypt_check_ms_rounds_{config.BCRYPT_ROUNDS}': metric(bcrypt_us / 1000, 'ms', 'lower'),
+    }
+
+def bench_http(size):
+    """End-to-end Flask test-client latency for the dashboard and detection endpoints"""
+    from app import create_app
+    from auth import auth_system
+
+    client = create_app().test_client()
+    token = auth_system.generate_token({'id': 1, 'username': 'admin', 'role': 'admin'})
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {'tickers': ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN']}
+
+    def get(path):
+        response = client.get(path, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path} returned {response.status_code}')
+
+    def post(path):
+        response = client.post(path, json=body, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'POST {path} returned {response.status_code}')
+
+    # First requests pay for lazy setup (pools, caches); keep them out of the numbers
+    get('/api/dashboard')
+    post('/api/anomalies/detect')
+    results = {}
+    for name, call in [('dashboard', lambda: get('/api/dashboard')),
+                       ('detect', lambda: post('/api/anomalies/detect'))]:
+        median, p95 = latency_ms(call, size['http_requests'])
+        results[f'{name}_ms'] = metric(median, 'ms', 'lower')
+        results[f'{name}_p95_ms'] = metric(p95, 'ms', 'lower')
+    return results
+
+STARTUP_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+app.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported, 'warm_up': warmed - created}))
+'''
+
+def memory_kb(pid):
+    """Rss, Pss and private (unshared) kB of a process from /proc/<pid>/smaps_rollup (Linux only)"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(':') in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # Field 4 is the parent pid; split after the parenthesised command name
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+def bench_startup(size):
+    """Cold start of a fresh interpreter (import, create_app, warm-up) and of serve.py, plus per-worker memory"""
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=BACKEND_DIR, env=os.environ,
+                            capture_output=True, text=True, check=True).stdout
+    phases = json.loads(output.strip().splitlines()[-1])
+    results = {f'{phase}_s': metric(seconds, 's', 'lower') for phase, seconds in phases.items()}
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    workers = size['serve_workers']
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+                               '--workers', str(workers)], cwd=BACKEND_DIR, env=os.environ,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f'serve.py exited with status {server.returncode}')
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.05)
+            if time.perf_counter() - started > 120:
+                raise RuntimeError('serve.py did not become ready within 120s')
+        results['serve_ready_s'] = metric(time.perf_counter() - started, 's', 'lower')
+
+        # Let every worker come up and take some traffic before measuring
+        time.sleep(0.5)
+        for _ in range(workers * 10):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=5).read()
+        if os.path.exists(f'/proc/{server.pid}/smaps_rollup'):
+            rss, pss, private = memory_kb(server.pid)
+            results['parent_rss_mb'] = metric(rss / 1024, 'MB', 'lower')
+            worker_memory = [memory_kb(pid) for pid in child_pids(server.pid)]
+            if worker_memory:
+                for index, name in enumerate(('rss', 'pss', 'private')):
+                    average = sum(sample[index] for sample in worker_memory) / len(worker_memory) / 1024
+                    results[f'worker_{name}_mb'] = metric(average, 'MB', 'lower')
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return results
+
+BENCHMARKS = {
+    'detector': bench_detector,
+    'engines': bench_engines,
+    'risk_level': bench_risk_level,
+    'anomaly_store': bench_anomaly_store,
+    'audit_write': bench_audit_write,
+    'audit_read': bench_audit_read,
+    'auth': bench_auth,
+    'http': bench_http,
+    'startup': bench_startup,
+}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(names, size):
+    from database import init_database
+    init_database()
+
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        results[name] = BENCHMARKS[name](size)
+        print(f"  {name} took {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Rows of (benchmark, metric, baseline, current, relative change, regressed) for metrics in both runs"""
+    rows = []
+    for name, metrics in results.items():
+        for key, current in metrics.items():
+            previous = baseline.get('results', {}).get(name, {}).get(key)
+            if not previous or not previous['value']:
+                continue
+            change = (current['value'] - previous['value']) / previous['value']
+            # A positive 'worse' is a slowdown whichever direction the metric runs
+            worse = -change if current['better'] == 'higher' else change
+            rows.append((name, key, previous['value'], current['value'], change, worse > tolerance))
+    return rows
+
+def print_comparison(rows, tolerance):
+    print(f"{'benchmark':<14}{'metric':<34}{'baseline':>14}{'current':>14}{'change':>10}", file=sys.stderr)
+    for name, key, previous, current, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<14}{key:<34}{previous:>14.4g}{current:>14.4g}{change:>+10.1%}{flag}", file=sys.stderr)
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"{regressions} regression(s) beyond {tolerance:.0%}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--rows', type=int, help='override the detector frame size')
+    parser.add_argument('--audit-events', type=int, help='override the number of concurrent audit writes')
+    parser.add_argument('--http-requests', type=int, help='override the requests timed per endpoint')
+    parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+    parser.add_argument('--baseline', help='compare against a previous JSON result and exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before failing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    size = dict(SIZES[args.size])
+    for key in ('rows', 'audit_events', 'http_requests'):
+        if getattr(args, key) is not None:
+            size[key] = getattr(args, key)
+
+    names = args.only or list(BENCHMARKS)
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'size': args.size,
+            'parameters': size,
+        },
+        'results': run(names, size),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('size') != args.size:
+            print(f"warning: baseline was recorded at size {baseline.get('meta', {}).get('size')}", file=sys.stderr)
+        rows = compare(report['results'], baseline, args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
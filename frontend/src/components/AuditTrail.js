@@ -1,20 +1,35 @@
 import React, { useState, useEffect } from 'react';
 import { Container, Row, Col, Card, Table, Button, Spinner, Badge } from 'react-bootstrap';
-import { complianceAPI } from '../services/api';
+import { complianceAPI, openEventStream } from '../services/api';
 
 const AuditTrail = () => {
   const [auditLogs, setAuditLogs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAuditTrail();
+
+    const events = openEventStream(['audit']);
+    events.addEventListener('audit', (e) => {
+      const entries = JSON.parse(e.data).reverse();
+      setAuditLogs((logs) => {
+        const seen = new Set(logs.map((log) => log.id));
+        return [...entries.filter((entry) => !seen.has(entry.id)), ...logs];
+      });
+    });
+    events.addEventListener('resync', () => fetchAuditTrail());
+
+    return () => events.close();
   }, []);
 
   const fetchAuditTrail = async () => {
     try {
       const response = await complianceAPI.getAuditTrail(50);
       setAuditLogs(response.data.entries);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       setError('Failed to fetch audit trail');
     } finally {
@@ -22,6 +37,19 @@ const AuditTrail = () => {
     }
   };
 
+  const fetchMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await complianceAPI.getAuditTrail(50, nextCursor);
+      setAuditLogs((logs) => [...logs, ...response.data.entries]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError('Failed to fetch audit trail');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatTimestamp = (timestamp) => {
     return new Date(timestamp).toLocaleString();
   };
@@ -93,8 +121,8 @@ const AuditTrail = () => {
                   </tr>
                 </thead>
                 <tbody>
-                  {auditLogs.map((log, index) => (
-                    <tr key={index}>
+                  {auditLogs.map((log) => (
+                    <tr key={log.id}>
                       <td>{formatTimestamp(log.timestamp)}</td>
                       <td>{log.username || 'System'}</td>
                       <td>
@@ -117,6 +145,14 @@ const AuditTrail = () => {
                   No audit logs found
                 </div>
               )}
+
+              {nextCursor && (
+                <div className="text-center">
+                  <Button variant="outline-secondary" size="sm" onClick={fetchMore} disabled={loadingMore}>
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </Button>
+                </div>
+              )}
             </Card.Body>
           </Card>
         </Col>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Container, Row, Col, Card, Alert, Badge, Table, Spinner } from 'react-bootstrap';
-import { complianceAPI } from '../services/api';
+import { complianceAPI, openEventStream } from '../services/api';
 
 const Dashboard = () => {
   const [dashboardData, setDashboardData] = useState(null);
@@ -9,6 +9,30 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchDashboardData();
+
+    // Live updates pushed by the server instead of re-running /dashboard
+    const events = openEventStream(['anomalies', 'stats']);
+    events.addEventListener('anomalies', (e) => {
+      const rows = JSON.parse(e.data);
+      setDashboardData((data) => data && {
+        ...data,
+        anomalies: [...rows.reverse(), ...(data.anomalies || [])].slice(0, 5),
+      });
+    });
+    events.addEventListener('stats', (e) => {
+      const { total, by_risk_level: byRisk } = JSON.parse(e.data);
+      setDashboardData((data) => data && {
+        ...data,
+        stats: {
+          total_checks: total,
+          anomalies_found: byRisk.High + byRisk.Critical,
+          high_risk_count: byRisk.High,
+        },
+      });
+    });
+    events.addEventListener('resync', () => fetchDashboardData());
+
+    return () => events.close();
   }, []);
 
   const fetchDashboardData = async () => {
@@ -40,8 +40,17 @@ export const complianceAPI = {
   getDashboard: () => api.get('/dashboard'),
   detectAnomalies: (tickers) => api.post('/anomalies/detect', { tickers }),
   verifyIdentity: (data) => api.post('/ekyc/verify', data),
-  getAuditTrail: (limit) => api.get(`/audit/trail?limit=${limit}`),
+  getAuditTrail: (limit, cursor) => api.get('/audit/trail', { params: { limit, cursor } }),
   generateReport: () => api.get('/reports/compliance'),
 };
 
+// EventSource can't send an Authorization header, so the token goes in the query string
+export const openEventStream = (channels) => {
+  const params = new URLSearchParams({
+    token: localStorage.getItem('token') || '',
+    channels: channels.join(','),
+  });
+  return new EventSource(`${API_BASE_URL}/events?${params}`);
+};
+
 export default api;
\ No newline at end of file
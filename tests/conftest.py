@@ -0,0 +1,34 @@
+# tests/conftest.py
+"""Shared pytest setup: every test runs against a scratch database and scratch stores, never shared_data."""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Set before any backend import: config reads these once at import time
+SCRATCH_DIR = tempfile.mkdtemp(prefix='brokermint-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(SCRATCH_DIR, 'test.db')
+for name in ('MODEL_DIR', 'TRADE_STORE_DIR', 'TICK_STORE_DIR', 'REPORT_DIR'):
+    os.environ[name] = os.path.join(SCRATCH_DIR, name.lower())
+# Cheap hashes; the cost factor is not what these tests cover
+os.environ['BCRYPT_ROUNDS'] = '4'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    from database import init_database
+    init_database()
+
+@pytest.fixture
+def user_factory():
+    """Create users with unique names; returns (user row dict, bearer headers)"""
+    from auth import auth_system
+
+    def create(role='user'):
+        name = f'{role}_{uuid.uuid4().hex[:12]}'
+        user_id = auth_system.create_user(name, f'{name}@example.com', 'password', name, role)
+        user = {'id': user_id, 'username': name, 'role': role}
+        return user, {'Authorization': f'Bearer {auth_system.generate_token(user)}'}
+    return create
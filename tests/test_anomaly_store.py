@@ -0,0 +1,118 @@
+# tests/test_anomaly_store.py
+"""Detection-run upserts: natural-key idempotency, trigger-maintained stats and the report data version."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_store import AnomalyStore
+from config import config
+from database import db_connection
+from reports import report_cache
+
+@pytest.fixture
+def store():
+    with db_connection() as conn:
+        conn.execute('DELETE FROM anomalies')
+        conn.commit()
+    return AnomalyStore()
+
+def scored_run(rows=40, risk_level='High'):
+    return pd.DataFrame({
+        'ticker': np.where(np.arange(rows) % 2, 'AAPL', 'MSFT'),
+        'timestamp': pd.date_range('2026-01-05 09:15', periods=rows, freq='1min'),
+        'price': np.linspace(100, 140, rows),
+        'volume': np.arange(rows) * 1000 + 1,
+        'anomaly_score': np.linspace(0.5, 0.99, rows),
+        'risk_level': risk_level,
+        'is_anomaly': np.arange(rows) % 4 != 3
+    })
+
+VERSIONS = {'AAPL': 'isolation_forest:v1', 'MSFT': 'isolation_forest:v1'}
+
+def table_counts():
+    with db_connection() as conn:
+        rows = dict(conn.execute('SELECT risk_level, COUNT(*) FROM anomalies GROUP BY risk_level').fetchall())
+        stats = {row['risk_level']: row['count']
+                 for row in conn.execute('SELECT risk_level, count FROM anomaly_stats_risk WHERE count > 0')}
+    return rows, stats
+
+def test_only_flagged_rows_are_stored(store):
+    result = store.save(scored_run(), VERSIONS)
+    assert result['rows'] == result['written'] == 30
+    with db_connection() as conn:
+        stored = conn.execute('SELECT run_id, trade_time, model_version, price, volume FROM anomalies').fetchall()
+    assert len(stored) == 30
+    assert {row['run_id'] for row in stored} == {result['run_id']}
+    assert stored[0]['trade_time'] == '2026-01-05 09:15:00'
+    assert stored[0]['model_version'] == 'isolation_forest:v1'
+
+def test_rerun_is_a_no_op(store):
+    run = scored_run()
+    store.save(run, VERSIONS)
+    version = report_cache.data_version()
+
+    again = store.save(run, VERSIONS)
+
+    assert again['written'] == 0
+    assert report_cache.data_version() == version
+    rows, stats = table_counts()
+    assert rows == stats == {'High': 30}
+
+def test_changed_results_update_in_place(store):
+    store.save(scored_run(), VERSIONS)
+    version = report_cache.data_version()
+
+    result = store.save(scored_run(risk_level='Low'), VERSIONS)
+
+    assert result['written'] == 30
+    assert report_cache.data_version() != version
+    rows, stats = table_counts()
+    assert rows == stats == {'Low': 30}
+
+def test_model_version_is_part_of_the_key(store):
+    store.save(scored_run(), VERSIONS)
+    store.save(scored_run(), {ticker: 'mad' for ticker in VERSIONS})
+    rows, stats = table_counts()
+    assert rows == stats == {'High': 60}
+
+def test_unseeded_sample_data_is_not_stored(store, monkeypatch):
+    monkeypatch.setattr(config, 'SAMPLE_DATA_SEED', None)
+    assert store.save(scored_run(), VERSIONS, sample=True) == {'run_id': None, 'rows': 0, 'written': 0}
+
+    monkeypatch.setattr(config, 'SAMPLE_DATA_SEED', 7)
+    assert store.save(scored_run(), VERSIONS, sample=True)['written'] == 30
+
+def test_sub_second_trade_times_key_separately(store):
+    run = scored_run(rows=4).assign(
+        timestamp=pd.to_datetime(['2026-01-05 09:15:00', '2026-01-05 09:15:00.250',
+                                  '2026-01-05 09:15:00.500', '2026-01-05 09:15:01'], format='ISO8601'),
+        ticker='AAPL', is_anomaly=True)
+    assert store.save(run, VERSIONS)['written'] == 4
+    with db_connection() as conn:
+        times = [row[0] for row in conn.execute('SELECT trade_time FROM anomalies ORDER BY trade_time')]
+    assert times == ['2026-01-05 09:15:00', '2026-01-05 09:15:00.250000',
+                     '2026-01-05 09:15:00.500000', '2026-01-05 09:15:01']
+
+def test_rows_without_trade_time_do_not_overwrite_each_other(store):
+    run = scored_run(rows=8).drop(columns='timestamp').assign(ticker='AAPL', is_anomaly=True)
+    assert store.save(run, VERSIONS)['written'] == 8
+    assert store.save(run, VERSIONS)['written'] == 8
+    rows, _ = table_counts()
+    assert rows == {'High': 16}
+
+def test_untimed_stream_ticks_are_all_stored(store, tmp_path):
+    from anomaly_detection import AnomalyDetector
+    from model_registry import ModelRegistry
+    from stream_detection import StreamingDetector
+
+    detector = AnomalyDetector(registry=ModelRegistry(str(tmp_path)))
+    assert detector.train_model(detector.generate_sample_data(seed=1))
+    # Wild prices and volumes, all for one ticker and none with a timestamp
+    ticks = [{'ticker': 'AAPL', 'price': 10.0 ** (i % 5), 'volume': 10 ** (i % 7 + 1)} for i in range(40)]
+
+    flagged = StreamingDetector(detector).process_batch(ticks)
+
+    assert len(flagged) > 1
+    assert len({record['timestamp'] for record in flagged}) == len(flagged)
+    with db_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM anomalies').fetchone()[0] == len(flagged)
@@ -0,0 +1,82 @@
+# tests/test_audit_trail.py
+"""Keyset pagination of the audit trail: cursors, tie-breaking on id, filters and bad input."""
+import pytest
+
+from audit_trail import AuditTrail, AuditWriter
+from database import db_connection
+
+@pytest.fixture
+def trail():
+    with db_connection() as conn:
+        conn.execute('DELETE FROM audit_trail')
+        conn.commit()
+    writer = AuditWriter()
+    # Several events share a timestamp so paging has to break ties on id
+    events = [(1 if i % 3 else 2, 'login' if i % 2 else 'export', None, f'2026-01-05 10:00:{i // 4:02d}')
+              for i in range(23)]
+    writer._write(events)
+    yield AuditTrail(writer)
+    writer.stop()
+
+def all_pages(trail, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page = trail.get_audit_page(limit, cursor=cursor, **filters)
+        pages.append(page['entries'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+def test_pages_cover_every_row_once_newest_first(trail):
+    pages = all_pages(trail, 5)
+    entries = [entry for page in pages for entry in page]
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert len({entry['id'] for entry in entries}) == 23
+    keys = [(entry['timestamp'], entry['id']) for entry in entries]
+    assert keys == sorted(keys, reverse=True)
+
+def test_exact_multiple_has_no_empty_trailing_page(trail):
+    pages = all_pages(trail, 23)
+    assert [len(page) for page in pages] == [23]
+
+def test_filters_apply_across_pages(trail):
+    entries = [entry for page in all_pages(trail, 4, user_id=2, action_type='export') for entry in page]
+    assert entries
+    assert all(entry['user_id'] == 2 and entry['action_type'] == 'export' for entry in entries)
+    with db_connection() as conn:
+        expected = conn.execute(
+            "SELECT COUNT(*) FROM audit_trail WHERE user_id = 2 AND action_type = 'export'").fetchone()[0]
+    assert len(entries) == expected
+
+def test_cursor_round_trip(trail):
+    entry = {'timestamp': '2026-01-05 10:00:03', 'id': 42}
+    assert trail.decode_cursor(trail.encode_cursor(entry)) == ('2026-01-05 10:00:03', 42)
+
+@pytest.mark.parametrize('cursor', ['garbage', 'WzFd'])
+def test_invalid_cursor_is_rejected(trail, cursor):
+    with pytest.raises(ValueError):
+        trail.get_audit_page(5, cursor=cursor)
+
+def test_failed_batches_are_spilled_and_replayed(tmp_path):
+    with db_connection() as conn:
+        conn.execute('DELETE FROM audit_trail')
+        conn.commit()
+    writer = AuditWriter(flush_interval=60, spill_path=str(tmp_path / 'spill.jsonl'))
+    trail = AuditTrail(writer)
+    insert, database_down = writer._insert, [True]
+    writer._insert = lambda events: not database_down[0] and insert(events)
+
+    for i in range(3):
+        trail.record_action(1, 'spill_test', {'seq': i})
+    assert writer.flush() is False
+    assert len((tmp_path / 'spill.jsonl').read_text().splitlines()) == 3
+
+    database_down[0] = False
+    trail.record_action(1, 'spill_test', {'seq': 3})
+    assert writer.flush() is True
+    assert not (tmp_path / 'spill.jsonl').exists()
+    with db_connection() as conn:
+        details = [row[0] for row in conn.execute("SELECT details FROM audit_trail WHERE action_type = 'spill_test'")]
+    assert sorted(details) == [f'{{"seq": {i}}}' for i in range(4)]
+    writer.stop()
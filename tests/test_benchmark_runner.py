@@ -0,0 +1,67 @@
+# tests/test_benchmark_runner.py
+"""Benchmark harness: JSON output, baseline comparison and the regression exit status of benchmarks/run.py."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'run.py')
+
+@pytest.fixture(scope='module')
+def runner():
+    """benchmarks/run.py as a module; its import-time scratch environment is undone afterwards"""
+    import importlib.util
+    environ, path = dict(os.environ), list(sys.path)
+    spec = importlib.util.spec_from_file_location('benchmark_runner', RUNNER)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+        sys.path[:] = path
+    return module
+
+def result(value, better):
+    return {'value': value, 'unit': 'x', 'better': better}
+
+def test_compare_flags_slowdowns_in_either_direction(runner):
+    baseline = {'results': {'bench': {'throughput': result(100, 'higher'), 'latency': result(10, 'lower')}}}
+    current = {'bench': {'throughput': result(70, 'higher'), 'latency': result(13, 'lower')}}
+
+    rows = {row[1]: row for row in runner.compare(current, baseline, tolerance=0.2)}
+
+    assert rows['throughput'][4] == pytest.approx(-0.3) and rows['throughput'][5]
+    assert rows['latency'][4] == pytest.approx(0.3) and rows['latency'][5]
+    assert not any(row[5] for row in runner.compare(current, baseline, tolerance=0.5))
+
+def test_compare_skips_metrics_missing_from_the_baseline(runner):
+    baseline = {'results': {'bench': {'zero': result(0, 'lower')}}}
+    current = {'bench': {'zero': result(5, 'lower'), 'new': result(1, 'lower')}, 'other': {'x': result(1, 'lower')}}
+    assert runner.compare(current, baseline, tolerance=0.2) == []
+
+def run_suite(tmp_path, *args):
+    env = dict(os.environ)
+    for name in ('DATABASE_PATH', 'MODEL_DIR', 'TRADE_STORE_DIR', 'TICK_STORE_DIR', 'REPORT_DIR'):
+        env.pop(name, None)
+    return subprocess.run([sys.executable, RUNNER, '--only', 'risk_level', *args], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+def test_output_and_baseline_regression_exit_status(tmp_path):
+    output = tmp_path / 'baseline.json'
+    first = run_suite(tmp_path, '--output', str(output))
+    assert first.returncode == 0, first.stderr
+    report = json.loads(output.read_text())
+    assert report['meta']['size'] == 'small'
+    assert set(report['results']) == {'risk_level'}
+    assert report['results']['risk_level']['vectorized_ns_per_row']['better'] == 'lower'
+
+    # A baseline 100x faster than anything achievable must fail the run
+    for entry in report['results']['risk_level'].values():
+        entry['value'] /= 100
+    output.write_text(json.dumps(report))
+    regressed = run_suite(tmp_path, '--output', str(tmp_path / 'current.json'), '--baseline', str(output))
+    assert regressed.returncode == 1
+    assert 'REGRESSION' in regressed.stderr
@@ -0,0 +1,41 @@
+# tests/test_detection_window.py
+"""Detection without a start date reads a bounded window of the partitioned trade store, not every partition."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from config import config
+from ingestion import TradeStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = TradeStore(str(tmp_path))
+    for date in ('2025-06-30', '2025-12-01', '2025-12-31', '2026-01-15'):
+        for ticker in ('AAPL', 'MSFT'):
+            if ticker == 'MSFT' and date == '2026-01-15':
+                continue
+            store.write_part(date, ticker, {
+                'timestamp': np.array([pd.Timestamp(date).value]),
+                'price': np.array([100.0]),
+                'volume': np.array([1000])
+            }, 0)
+    monkeypatch.setattr(app, 'trade_store', store)
+    monkeypatch.setattr(config, 'DETECTION_DEFAULT_DAYS', 30)
+    return store
+
+def test_latest_date_is_per_ticker(store):
+    assert store.latest_date(['AAPL']) == '2026-01-15'
+    assert store.latest_date(['MSFT']) == '2025-12-31'
+    assert store.latest_date(['TSLA']) is None
+
+def test_default_window_ends_at_the_newest_partition(store):
+    assert app.detection_window(['AAPL']) == ('2025-12-17', None)
+    assert app.detection_window(['MSFT']) == ('2025-12-02', None)
+    start, end = app.detection_window(['AAPL', 'MSFT'])
+    assert sorted(store.read(['AAPL', 'MSFT'], start, end)['date'].unique()) == ['2025-12-31', '2026-01-15']
+
+def test_explicit_dates_are_respected(store):
+    assert app.detection_window(['AAPL'], end_date='2025-12-31') == ('2025-12-02', '2025-12-31')
+    assert app.detection_window(['AAPL'], start_date='2025-01-01') == ('2025-01-01', None)
+    assert app.detection_window(['TSLA']) == (None, None)
@@ -0,0 +1,93 @@
+# tests/test_document_pipeline.py
+"""Document uploads: jobs only read files stored under their content hash and record results for the submitter."""
+import hashlib
+import io
+
+import pytest
+
+import app  # Registers the job handlers
+from database import db_connection
+from document_pipeline import document_pipeline
+from jobs import job_manager
+from ocr import process_document
+
+PAN_TEXT = b'INCOME TAX DEPARTMENT\nPermanent Account Number\nABCPE1234F\n'
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_pipeline, 'upload_dir', str(tmp_path))
+    return tmp_path
+
+def store(content, filename='pan.txt'):
+    path, file_hash = document_pipeline.store_upload(io.BytesIO(content), filename)
+    # Prime the OCR cache in-process so no test waits on the spawn pool
+    document_pipeline._store(file_hash, process_document(path))
+    return path, file_hash
+
+def verifications(user_id):
+    with db_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM ekyc_verifications WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+def finished(job):
+    for update in job_manager.watch(job['id'], interval=0.05, timeout=30):
+        pass
+    return job_manager.get(job['id'], include_result=True)
+
+def test_resolve_upload_accepts_only_stored_hash_names(uploads):
+    path, file_hash = store(PAN_TEXT)
+    assert document_pipeline.resolve_upload(f'{file_hash}.txt') == (path, file_hash)
+
+    outside = uploads.parent / 'outside.txt'
+    outside.write_bytes(PAN_TEXT)
+    for name in (str(outside), '../outside.txt', f'../{uploads.name}/{file_hash}.txt', f'{file_hash}.exe',
+                 f'{file_hash.upper()}.txt', '0' * 64 + '.txt', None):
+        with pytest.raises(ValueError):
+            document_pipeline.resolve_upload(name)
+
+def test_resolve_upload_rejects_content_that_no_longer_matches(uploads):
+    path, file_hash = store(PAN_TEXT)
+    with open(path, 'ab') as f:
+        f.write(b'tampered')
+    with pytest.raises(ValueError, match='does not match'):
+        document_pipeline.resolve_upload(f'{file_hash}.txt')
+
+def test_job_cannot_read_outside_files_or_record_for_another_user(uploads, user_factory):
+    submitter, _ = user_factory()
+    victim, _ = user_factory('admin')
+    outside = uploads.parent / 'secret.txt'
+    outside.write_bytes(PAN_TEXT)
+
+    job, _ = job_manager.submit('document_extraction', {
+        'file': str(outside), 'file_hash': hashlib.sha256(PAN_TEXT).hexdigest(),
+        'document_type': 'pan', 'user_id': victim['id']
+    }, submitter['id'])
+
+    job = finished(job)
+    assert job['status'] == 'failed'
+    assert job['result'] is None
+    assert verifications(victim['id']) == verifications(submitter['id']) == 0
+
+def test_job_records_the_verification_for_its_submitter(uploads, user_factory):
+    submitter, _ = user_factory()
+    other, _ = user_factory('admin')
+    _, file_hash = store(PAN_TEXT)
+
+    job, _ = job_manager.submit('document_extraction', {
+        'file': f'{file_hash}.txt', 'document_type': 'pan', 'user_id': other['id']
+    }, submitter['id'])
+
+    assert finished(job)['status'] == 'succeeded'
+    assert verifications(submitter['id']) == 1
+    assert verifications(other['id']) == 0
+
+def test_upload_route_verifies_cached_documents_for_the_uploader(uploads, user_factory):
+    user, headers = user_factory()
+    store(PAN_TEXT)
+
+    response = app.create_app().test_client().post('/api/ekyc/documents', headers=headers, data={
+        'file': (io.BytesIO(PAN_TEXT), 'scan.txt'), 'document_type': 'pan', 'number': 'ABCPE1234F'
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['fields']['pan'] == ['ABCPE1234F']
+    assert verifications(user['id']) == 1
@@ -0,0 +1,66 @@
+# tests/test_document_validation.py
+"""Document number rules, the Aadhaar Verhoeff checksum and bulk eKYC validation."""
+import pytest
+
+from database import db_connection
+from document_validation import VERHOEFF_D, VERHOEFF_P, validate_batch, validate_document, verhoeff_valid
+from ekyc import ekyc_verifier
+
+VERHOEFF_INV = [0, 4, 3, 2, 1, 5, 6, 7, 8, 9]
+
+def with_check_digit(digits):
+    """Append the Verhoeff check digit (reference algorithm, independent of verhoeff_valid)"""
+    check = 0
+    for position, digit in enumerate(reversed(digits)):
+        check = VERHOEFF_D[check][VERHOEFF_P[(position + 1) % 8][int(digit)]]
+    return digits + str(VERHOEFF_INV[check])
+
+@pytest.mark.parametrize('number', ['2363', '234567890124', with_check_digit('98765432101')])
+def test_verhoeff_accepts_valid_numbers(number):
+    assert verhoeff_valid(number)
+
+def test_verhoeff_catches_single_digit_errors_and_transpositions():
+    number = with_check_digit('23456789012')
+    for position in range(len(number)):
+        for digit in '0123456789':
+            if digit != number[position]:
+                assert not verhoeff_valid(number[:position] + digit + number[position + 1:])
+    for position in range(len(number) - 1):
+        if number[position] != number[position + 1]:
+            swapped = number[:position] + number[position + 1] + number[position] + number[position + 2:]
+            assert not verhoeff_valid(swapped)
+
+@pytest.mark.parametrize('document_type, number, normalized, errors', [
+    ('aadhaar', '2345 6789 0124', '234567890124', []),
+    ('aadhaar', '2345-6789-0125', '234567890125', ['Aadhaar checksum (Verhoeff) failed']),
+    ('aadhaar', '1345 6789 0124', '134567890124', ['Malformed aadhaar number']),
+    ('pan', 'abcpe1234f', 'ABCPE1234F', []),
+    ('pan', 'ABCXE1234F', 'ABCXE1234F', ['Malformed pan number']),
+    ('passport', 'J8369854', 'J8369854', []),
+    ('passport', 'Q8369854', 'Q8369854', ['Malformed passport number']),
+    ('pan', '', None, ['Document number is missing']),
+    ('voter_id', 'ABC1234567', None, ['Unsupported document type: voter_id']),
+])
+def test_validate_document(document_type, number, normalized, errors):
+    assert validate_document(document_type, number) == (normalized, errors)
+
+def test_bulk_validation_matches_single_validation():
+    items = [('aadhaar', with_check_digit(str(n))) for n in range(23456789000, 23456795000)]
+    items += [('pan', 'ABCPE1234F'), ('pan', 'bad'), ('passport', None)]
+    assert ekyc_verifier.validate_many(items) == validate_batch(items) == [validate_document(*item) for item in items]
+
+def test_verify_documents_writes_one_record_per_valid_item(user_factory):
+    user, _ = user_factory()
+    results = ekyc_verifier.verify_documents(user['id'], [
+        {'document_type': 'aadhaar', 'document_data': {'number': with_check_digit('29876543210')}},
+        {'document_type': 'pan', 'document_data': {'number': 'NOTAPAN'}},
+        {'document_data': {'number': 'ABCPE1234F'}},
+    ])
+
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert results[0]['status'] == 'verified' and results[0]['errors'] == []
+    assert results[1]['status'] != 'verified' and results[1]['errors'] == ['Malformed pan number']
+    assert results[2] == {'index': 2, 'success': False, 'error': 'document_type is required'}
+    with db_connection() as conn:
+        count = conn.execute('SELECT COUNT(*) FROM ekyc_verifications WHERE user_id = ?', (user['id'],)).fetchone()[0]
+    assert count == 2
@@ -0,0 +1,75 @@
+# tests/test_event_streams.py
+"""SSE streams take a bounded number of request threads, and the pre-fork server never runs more than --threads."""
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from config import config
+from events import stream_slots
+from jobs import job_manager
+
+@pytest.fixture
+def client(monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(config, 'EVENTS_MAX_STREAMS', 2)
+    yield create_app().test_client()
+    assert stream_slots.open == 0
+
+def test_default_cap_is_half_the_request_threads(monkeypatch):
+    monkeypatch.setattr(config, 'EVENTS_MAX_STREAMS', 0)
+    monkeypatch.setattr(config, 'SERVE_THREADS', 8)
+    assert stream_slots.max_streams() == 4
+
+def test_streams_beyond_the_cap_get_503_until_one_closes(client, user_factory):
+    user, headers = user_factory()
+    job, _ = job_manager.submit('report', {'report_type': 'compliance', 'user': {
+        'user_id': user['id'], 'username': user['username'], 'role': 'user'}}, user['id'])
+
+    first = client.get('/api/events', headers=headers, buffered=False)
+    second = client.get(f"/api/jobs/{job['id']}/events", headers=headers, buffered=False)
+    assert first.status_code == second.status_code == 200
+
+    refused = client.get('/api/events', headers=headers)
+    assert refused.status_code == 503
+    assert client.get(f"/api/jobs/{job['id']}/events", headers=headers).status_code == 503
+
+    # Closed newest-first: the test client runs every stream on this one thread
+    second.close()
+    third = client.get('/api/events', headers=headers, buffered=False)
+    assert third.status_code == 200
+    third.close()
+    first.close()
+
+def test_pool_server_runs_at_most_threads_requests_at_once():
+    from serve import make_pool_server
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def app(environ, start_response):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    server = make_pool_server('127.0.0.1', 0, app, 2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/'
+    try:
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(urllib.request.urlopen(url, timeout=10).status))
+                   for _ in range(6)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert results == [200] * 6
+    assert peak[0] == 2
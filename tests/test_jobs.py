@@ -0,0 +1,80 @@
+# tests/test_jobs.py
+"""Background jobs: per-user dedup of in-flight submissions and submitter-or-admin access to results."""
+import threading
+
+import pytest
+
+from jobs import job_manager
+
+release = threading.Event()
+
+def wait_for_release(params, job):
+    release.wait(10)
+    return {'echo': params}
+
+job_manager.register('test_wait', wait_for_release)
+
+@pytest.fixture
+def client():
+    from app import create_app
+    release.clear()
+    yield create_app().test_client()
+    # Let the in-flight jobs finish so they don't hold JOB_MAX_PER_USER slots
+    release.set()
+
+def test_identical_submissions_dedup_per_user(client, user_factory):
+    alice, _ = user_factory()
+    bob, _ = user_factory()
+    params = {'window': '2026-01'}
+
+    first, created = job_manager.submit('test_wait', params, alice['id'])
+    again, created_again = job_manager.submit('test_wait', params, alice['id'])
+    other, created_other = job_manager.submit('test_wait', params, bob['id'])
+
+    assert created and not created_again
+    assert again['id'] == first['id']
+    assert created_other and other['id'] != first['id']
+    assert job_manager.dedup_key('test_wait', params, alice['id']) != job_manager.dedup_key('test_wait', params, bob['id'])
+
+def test_only_submitter_or_admin_can_read_a_job(client, user_factory):
+    owner, owner_headers = user_factory()
+    _, other_headers = user_factory()
+    _, admin_headers = user_factory('admin')
+    job, _ = job_manager.submit('test_wait', {'report': 'mine'}, owner['id'])
+
+    assert client.get(f"/api/jobs/{job['id']}", headers=owner_headers).status_code == 200
+    assert client.get(f"/api/jobs/{job['id']}", headers=admin_headers).status_code == 200
+    assert client.get(f"/api/jobs/{job['id']}", headers=other_headers).status_code == 403
+    assert client.get(f"/api/jobs/{job['id']}/events", headers=other_headers).status_code == 403
+    assert client.post(f"/api/jobs/{job['id']}/cancel", headers=other_headers).status_code == 403
+    assert client.get('/api/jobs/does-not-exist', headers=owner_headers).status_code == 404
+
+def test_result_is_returned_to_the_owner(client, user_factory):
+    owner, owner_headers = user_factory()
+    job, _ = job_manager.submit('test_wait', {'report': 'done'}, owner['id'])
+    release.set()
+
+    for update in job_manager.watch(job['id'], interval=0.05, timeout=10):
+        pass
+    body = client.get(f"/api/jobs/{job['id']}", headers=owner_headers).get_json()
+    assert body['status'] == 'succeeded'
+    assert body['result'] == {'echo': {'report': 'done'}}
+
+@pytest.mark.parametrize('kind', ['document_extraction', 'test_wait', None])
+def test_only_user_job_kinds_can_be_submitted(client, user_factory, kind):
+    _, headers = user_factory()
+    response = client.post('/api/jobs', headers=headers, json={'kind': kind, 'params': {'file': '/etc/hostname'}})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('params', [{'engine': 'no_such_engine'}, {'tickers': 'AAPL'}, ['AAPL']])
+def test_bad_detection_params_are_rejected_up_front(client, user_factory, params):
+    _, headers = user_factory()
+    response = client.post('/api/jobs', headers=headers, json={'kind': 'anomaly_detection', 'params': params})
+    assert response.status_code == 400
+    if isinstance(params, dict):
+        assert client.post('/api/anomalies/detect', headers=headers, json=params).status_code == 400
+
+def test_detection_params_are_rebuilt_server_side():
+    from app import detection_params
+    params = detection_params({'tickers': ['AAPL'], 'engine': 'mad', 'user_id': 1, 'file': '/etc/passwd'})
+    assert params == {'tickers': ['AAPL'], 'start_date': None, 'end_date': None, 'format': 'records', 'engine': 'mad'}
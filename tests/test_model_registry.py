@@ -0,0 +1,44 @@
+# tests/test_model_registry.py
+"""Model bootstrap: first requests during initial training get ModelNotReadyError instead of blocking on it."""
+import threading
+import time
+
+import pytest
+
+from anomaly_detection import AnomalyDetector
+from model_registry import ModelNotReadyError, ModelRegistry
+
+def test_requests_during_background_bootstrap_do_not_block(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    release = threading.Event()
+
+    def slow_data():
+        release.wait(10)
+        return AnomalyDetector(registry).generate_sample_data(seed=1)
+
+    # What create_app() plus warm_up(background=True) do on the dev server
+    registry.defer_bootstrap(slow_data)
+    warm_up = threading.Thread(target=registry.bootstrap, args=(slow_data,))
+    warm_up.start()
+    time.sleep(0.1)
+
+    started = time.perf_counter()
+    with pytest.raises(ModelNotReadyError, match='still being trained'):
+        registry.require()
+    assert time.perf_counter() - started < 1
+
+    release.set()
+    warm_up.join(30)
+    assert registry.require()['version'] in registry.list_versions()
+    # One initial version, however many callers asked for it
+    assert len(registry.list_versions()) == 1
+
+def test_bootstrap_loads_a_saved_model_without_training(tmp_path):
+    saved = ModelRegistry(str(tmp_path))
+    artifact = saved.train_and_register(AnomalyDetector(saved).generate_sample_data(seed=1))
+
+    def no_training():
+        raise AssertionError('should load the saved model')
+
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.bootstrap(no_training)['version'] == artifact['version']
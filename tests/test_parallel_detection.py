@@ -0,0 +1,34 @@
+# tests/test_parallel_detection.py
+"""Sharded detection: every in-process fallback scores with the engine the caller asked for."""
+import pandas as pd
+import pytest
+
+from anomaly_detection import AnomalyDetector
+from config import config
+from model_registry import ModelRegistry
+from parallel_detection import ParallelDetector
+
+@pytest.fixture(scope='module')
+def detector(tmp_path_factory):
+    detector = AnomalyDetector(registry=ModelRegistry(str(tmp_path_factory.mktemp('models'))))
+    assert detector.train_model(detector.generate_sample_data(seed=1))
+    return detector
+
+@pytest.mark.parametrize('workers, min_rows, drop_model_file', [
+    (1, 0, False),            # single worker
+    (2, 10 ** 9, False),      # fewer rows than PARALLEL_MIN_ROWS
+    (2, 0, True),             # saved model file missing
+])
+def test_fallbacks_keep_the_requested_engine(detector, monkeypatch, tmp_path, workers, min_rows, drop_model_file):
+    monkeypatch.setattr(config, 'DETECTOR_ENGINE', 'mad')
+    monkeypatch.setattr(config, 'DETECTOR_ENGINE_BY_TICKER', {})
+    if drop_model_file:
+        monkeypatch.setattr(detector.registry, '_model_path', lambda version: str(tmp_path / 'missing.joblib'))
+    data = detector.generate_sample_data(seed=2)
+
+    scored = ParallelDetector(detector, workers=workers, min_rows=min_rows).detect_anomalies(data, 'isolation_forest')
+
+    expected = detector.detect_anomalies(data, 'isolation_forest')
+    pd.testing.assert_series_equal(scored['anomaly_score'], expected['anomaly_score'])
+    pd.testing.assert_series_equal(scored['is_anomaly'], expected['is_anomaly'])
+    assert not scored['is_anomaly'].equals(detector.detect_anomalies(data, 'mad')['is_anomaly'])
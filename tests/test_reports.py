@@ -0,0 +1,98 @@
+# tests/test_reports.py
+"""Report cache: hits and misses keyed on the anomalies data version, lock cleanup and LRU eviction."""
+import os
+
+import pytest
+
+from database import db_connection
+from reports import ReportCache, report_engine
+
+@pytest.fixture
+def cache():
+    with db_connection() as conn:
+        conn.execute('DELETE FROM anomalies')
+        conn.execute('DELETE FROM reports')
+        conn.commit()
+    return ReportCache(report_engine, max_entries=2)
+
+def builder(content, builds):
+    def build(cache_key):
+        builds.append(cache_key)
+        with db_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO reports (user_id, report_type, content, cache_key) VALUES (1, 'compliance', ?, ?)",
+                (content, cache_key))
+            conn.commit()
+            return cursor.lastrowid
+    return build
+
+def add_anomaly():
+    with db_connection() as conn:
+        conn.execute("INSERT INTO anomalies (ticker, anomaly_score, risk_level) VALUES ('AAPL', 0.9, 'High')")
+        conn.commit()
+
+def test_second_request_is_a_hit(cache):
+    builds = []
+    first = cache.get_or_create('text', {'report_type': 'compliance'}, builder('v1', builds))
+    second = cache.get_or_create('text', {'report_type': 'compliance'}, builder('v1', builds))
+
+    assert first == (first[0], False)
+    assert second == (first[0], True)
+    assert len(builds) == 1
+    assert cache._locks == {}
+
+def test_parameters_and_data_changes_miss(cache):
+    builds = []
+    cache.get_or_create('text', {'report_type': 'compliance'}, builder('a', builds))
+    cache.get_or_create('text', {'report_type': 'audit'}, builder('b', builds))
+    add_anomaly()
+    _, hit = cache.get_or_create('text', {'report_type': 'compliance'}, builder('c', builds))
+
+    assert not hit
+    assert len(builds) == 3
+
+def test_failed_build_releases_its_lock(cache):
+    def failing(cache_key):
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create('text', {'report_type': 'compliance'}, failing)
+    assert cache._locks == {}
+
+def test_eviction_drops_least_recently_used_but_keeps_text(cache):
+    builds = []
+    oldest, _ = cache.get_or_create('text', {'n': 1}, builder('one', builds))
+    cache.get_or_create('text', {'n': 2}, builder('two', builds))
+    with db_connection() as conn:
+        # Make the ordering explicit rather than relying on sub-second timestamps
+        conn.execute("UPDATE reports SET last_accessed_at = '2000-01-01' WHERE id = ?", (oldest,))
+        conn.commit()
+    cache.get_or_create('text', {'n': 3}, builder('three', builds))
+
+    with db_connection() as conn:
+        rows = {row['id']: row for row in conn.execute('SELECT id, content, cache_key FROM reports')}
+    assert rows[oldest]['cache_key'] is None
+    assert rows[oldest]['content'] == 'one'
+    assert sum(row['cache_key'] is not None for row in rows.values()) == 2
+
+    _, hit = cache.get_or_create('text', {'n': 1}, builder('one again', builds))
+    assert not hit
+
+def test_evicted_export_files_are_deleted(cache):
+    os.makedirs(report_engine.report_dir, exist_ok=True)
+    paths = []
+    for n in range(3):
+        name = f'export_{n}.csv'
+        paths.append(os.path.join(report_engine.report_dir, name))
+        with open(paths[-1], 'w') as f:
+            f.write('ticker\n')
+        with db_connection() as conn:
+            conn.execute('''
+                INSERT INTO reports (user_id, report_type, format, file_path, size_bytes, cache_key, last_accessed_at)
+                VALUES (1, 'export', 'csv', ?, 7, ?, ?)
+            ''', (name, f'key{n}', f'2026-01-0{n + 1}'))
+            conn.commit()
+
+    assert cache.evict() == 1
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1]) and os.path.exists(paths[2])
@@ -0,0 +1,22 @@
+# tests/test_stream_detection.py
+"""Streaming detector state: rolling-window context from running sums matches a full re-sum."""
+import numpy as np
+import pytest
+
+from stream_detection import TickerState
+
+def test_running_sums_match_the_window():
+    rng = np.random.default_rng(0)
+    state = TickerState(window=5)
+    assert state.context(100.0, 10) == {'price_change': 0.0, 'volume_ratio': 1.0}
+
+    for price, volume in zip(rng.uniform(50, 150, 1000), rng.integers(1, 10_000, 1000)):
+        expected_price, expected_volume = np.mean(state.prices or [price]), np.mean(state.volumes or [volume])
+        context = state.context(float(price), int(volume))
+        if state.prices:
+            assert context['price_change'] == pytest.approx((price - expected_price) / expected_price, abs=1e-6)
+            assert context['volume_ratio'] == pytest.approx(volume / expected_volume, abs=1e-6)
+        state.push(float(price), int(volume), None)
+
+    assert state.price_sum == pytest.approx(sum(state.prices))
+    assert state.volume_sum == pytest.approx(sum(state.volumes))
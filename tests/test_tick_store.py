@@ -0,0 +1,48 @@
+# tests/test_tick_store.py
+"""Tick store symbol table: other processes' new tickers become visible and codes are never handed out twice."""
+import multiprocessing
+
+import numpy as np
+
+from tick_store import TickStore
+
+def append_tickers(root, tickers):
+    store = TickStore(str(root))
+    for ticker in tickers:
+        store.append(ticker, [1, 2, 3], [10.0, 11.0, 12.0], [100, 200, 300])
+
+def test_symbols_added_elsewhere_are_picked_up(tmp_path):
+    reader, writer = TickStore(str(tmp_path)), TickStore(str(tmp_path))
+    assert reader.tickers() == []
+
+    writer.append('AAPL', [1, 2], [10.0, 11.0], [100, 200])
+
+    assert reader.tickers() == ['AAPL']
+    assert len(reader.view('AAPL')) == 2
+
+def test_stale_writers_do_not_reuse_codes(tmp_path):
+    first, second = TickStore(str(tmp_path)), TickStore(str(tmp_path))
+    assert first.symbols == second.symbols == {}
+
+    first.append('AAPL', [1], [10.0], [100])
+    second.append('MSFT', [1], [20.0], [200])
+
+    assert TickStore(str(tmp_path)).symbols == {'AAPL': 0, 'MSFT': 1}
+    assert first.view('AAPL').price.tolist() == [10.0]
+    assert first.view('MSFT').price.tolist() == [20.0]
+
+def test_concurrent_processes_get_distinct_codes(tmp_path):
+    context = multiprocessing.get_context('fork')
+    groups = [[f'T{process}{n:02d}' for n in range(20)] for process in range(4)]
+    workers = [context.Process(target=append_tickers, args=(tmp_path, tickers)) for tickers in groups]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    store = TickStore(str(tmp_path))
+    assert sorted(store.symbols.values()) == list(range(80))
+    for tickers in groups:
+        for ticker in tickers:
+            assert np.array_equal(store.view(ticker).volume, [100, 200, 300])